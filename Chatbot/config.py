@@ -14,16 +14,147 @@ DEALERSHIP_URL = os.getenv("DEALERSHIP_URL", "https://www.stevenscreekchevy.com"
 
 # --- Model Configuration ---
 EMBED_MODEL = "text-embedding-3-small"
+EMBED_DIMENSION = 1536 # Output size of EMBED_MODEL
 CHAT_MODEL = "gpt-4o-mini"
 TOP_K = 3
 
+# Graph routing mode: "two_step" (rephrase call, then classify call) or
+# "combined" (one structured-output call that rewrites, classifies and extracts)
+GRAPH_MODE = os.getenv("GRAPH_MODE", "two_step")
+
+# Local rule-based intent classifier tried before the LLM classifier.
+# Tune the threshold with local_debug_mode/intent_replay.py
+FAST_INTENT_ENABLED = os.getenv("FAST_INTENT_ENABLED", "true").lower() == "true"
+FAST_INTENT_THRESHOLD = float(os.getenv("FAST_INTENT_THRESHOLD", 0.8))
+
 TTS_MODEL = "tts-1"
 TTS_VOICE = "alloy"
 
+# --- OpenAI Client (llm/openai_client.py) ---
+# One pooled HTTP client for every OpenAI call (chat, embeddings, STT, TTS)
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 100))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 20))
+OPENAI_KEEPALIVE_SECONDS = float(os.getenv("OPENAI_KEEPALIVE_SECONDS", 30)) # Idle connections are closed after this
+OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", 3))
+OPENAI_CHAT_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CHAT_TIMEOUT_SECONDS", 20)) # Streams: longest gap between chunks
+OPENAI_EMBED_TIMEOUT_SECONDS = float(os.getenv("OPENAI_EMBED_TIMEOUT_SECONDS", 5))
+OPENAI_AUDIO_TIMEOUT_SECONDS = float(os.getenv("OPENAI_AUDIO_TIMEOUT_SECONDS", 30)) # STT uploads and TTS streams
+# Retries on 429 / 5xx / timeouts / dropped connections, with jittered exponential backoff
+# (Retry-After is honored when the API sends it, up to OPENAI_RETRY_MAX_SECONDS)
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))
+OPENAI_RETRY_BASE_SECONDS = float(os.getenv("OPENAI_RETRY_BASE_SECONDS", 0.25))
+OPENAI_RETRY_MAX_SECONDS = float(os.getenv("OPENAI_RETRY_MAX_SECONDS", 4))
+# Hedged chat completions: if a completion (or a stream's first chunk) takes longer than the
+# recent p95, send a second identical request and use whichever answers first
+OPENAI_HEDGE_ENABLED = os.getenv("OPENAI_HEDGE_ENABLED", "false").lower() == "true"
+OPENAI_HEDGE_PERCENTILE = float(os.getenv("OPENAI_HEDGE_PERCENTILE", 0.95))
+OPENAI_HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("OPENAI_HEDGE_DEFAULT_DELAY_SECONDS", 2.0)) # Until enough latencies are observed
+OPENAI_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("OPENAI_HEDGE_MIN_DELAY_SECONDS", 0.3))
+OPENAI_HEDGE_MAX_RATIO = float(os.getenv("OPENAI_HEDGE_MAX_RATIO", 0.1)) # Share of recent requests that may be hedged
+
+# --- Vector Store ---
+# "pinecone" or "local" (memory-mapped NumPy index published by the ingestion service
+# under LOCAL_VECTOR_STORE_DIR and opened read-only here)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")
+LOCAL_VECTOR_STORE_DIR = os.getenv("LOCAL_VECTOR_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "local_vector_store"))
+LOCAL_VECTOR_STORE_REFRESH_SECONDS = int(os.getenv("LOCAL_VECTOR_STORE_REFRESH_SECONDS", 30)) # How often replicas look for a new snapshot
+
+# --- Voice Pipeline ---
+# Sentence-pipelined TTS for /voice_chat: speak each sentence while later ones are still being generated
+VOICE_TTS_PIPELINE = os.getenv("VOICE_TTS_PIPELINE", "true").lower() == "true"
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", 3)) # Sentences synthesized in parallel
+TTS_MIN_SENTENCE_CHARS = int(os.getenv("TTS_MIN_SENTENCE_CHARS", 20)) # Shorter fragments are merged with the next sentence
+
+# Reply audio (voice/audio_output.py): the format is negotiated per request from the
+# `audio_format` form field / query parameter or the Accept header (mp3, opus, aac, wav, pcm)
+AUDIO_DEFAULT_FORMAT = os.getenv("AUDIO_DEFAULT_FORMAT", "mp3") # When the client doesn't ask for a supported format
+AUDIO_FLUSH_MS = int(os.getenv("AUDIO_FLUSH_MS", 200)) # Largest network write, in audio time; the first write is sent as soon as audio exists
+AUDIO_MAX_HOLD_MS = int(os.getenv("AUDIO_MAX_HOLD_MS", 40)) # Buffered audio is never held back longer than this
+AUDIO_TIMING_SAMPLES = int(os.getenv("AUDIO_TIMING_SAMPLES", 500)) # Recent replies per format behind the /health percentiles
+
+# On-disk LRU cache of synthesized audio, keyed by provider/model/voice/format/text (voice/tts_cache.py).
+# Warm it with: python -m voice.tts_cache
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tts_cache"))
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", 512))
+TTS_WARMUP_PHRASES_FILE = os.getenv("TTS_WARMUP_PHRASES_FILE") # Extra canned phrases, one per line (optional)
+
+# Speech providers behind voice/providers.py: "openai" (Whisper + OpenAI TTS) or "local"
+# (a text-in / text-out stand-in for tests and runs without API access)
+VOICE_PROVIDER = os.getenv("VOICE_PROVIDER", "openai")
+STT_MODEL = "whisper-1"
+
+# WebSocket voice endpoint (/voice/ws): per-utterance audio buffering and end-of-utterance detection
+VOICE_WS_SPOOL_MEMORY_BYTES = int(os.getenv("VOICE_WS_SPOOL_MEMORY_BYTES", 1024 * 1024)) # Longer utterances spill to a temp file
+VOICE_WS_MAX_UTTERANCE_BYTES = int(os.getenv("VOICE_WS_MAX_UTTERANCE_BYTES", 10 * 1024 * 1024)) # Whisper accepts up to 25 MB
+VOICE_WS_SILENCE_MS = int(os.getenv("VOICE_WS_SILENCE_MS", 700)) # pcm16: trailing silence that ends an utterance
+VOICE_WS_IDLE_GAP_MS = int(os.getenv("VOICE_WS_IDLE_GAP_MS", 1200)) # Any format: gap between frames that ends an utterance
+VOICE_WS_ENERGY_THRESHOLD = float(os.getenv("VOICE_WS_ENERGY_THRESHOLD", 500)) # pcm16 RMS level counted as speech
+
 # --- Database Configuration ---
 # For Cloud Run, DB_FILE will be set to /tmp/embeddings.db via env var
 # For local, it will default to a file in the script's directory
 DB_FILE = os.getenv("DB_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "local_embeddings.db"))
+DB_BUSY_TIMEOUT_SECONDS = float(os.getenv("DB_BUSY_TIMEOUT_SECONDS", 5)) # Wait for the write lock before failing
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", 16384)) # Page cache per connection
+DB_MMAP_SIZE_MB = int(os.getenv("DB_MMAP_SIZE_MB", 128)) # Memory-mapped reads (0 disables)
+
+# Session history cache: recent turns served from memory, appends flushed to SQLite in
+# batches (write-behind). Per process, so multi-instance deployments need session affinity.
+HISTORY_CACHE_ENABLED = os.getenv("HISTORY_CACHE_ENABLED", "true").lower() == "true"
+HISTORY_CACHE_MAX_SESSIONS = int(os.getenv("HISTORY_CACHE_MAX_SESSIONS", 5000))
+HISTORY_CACHE_IDLE_TTL_SECONDS = int(os.getenv("HISTORY_CACHE_IDLE_TTL_SECONDS", 1800))
+HISTORY_CACHE_MESSAGES = int(os.getenv("HISTORY_CACHE_MESSAGES", 24)) # Per session; loads of more go to SQLite
+HISTORY_FLUSH_INTERVAL_SECONDS = float(os.getenv("HISTORY_FLUSH_INTERVAL_SECONDS", 1.0))
+HISTORY_FLUSH_MAX_BATCH = int(os.getenv("HISTORY_FLUSH_MAX_BATCH", 500)) # Flush early once this many rows wait
+
+# Appointment availability (database/availability.py)
+APPOINTMENT_MAX_DURATION_MINUTES = int(os.getenv("APPOINTMENT_MAX_DURATION_MINUTES", 480)) # Bounds the overlap index scan
+APPOINTMENT_SLOT_STEP_MINUTES = int(os.getenv("APPOINTMENT_SLOT_STEP_MINUTES", 30)) # Grid for suggested alternatives
+APPOINTMENT_SUGGESTION_HORIZON_DAYS = int(os.getenv("APPOINTMENT_SUGGESTION_HORIZON_DAYS", 14))
+APPOINTMENT_SUGGESTIONS = int(os.getenv("APPOINTMENT_SUGGESTIONS", 3)) # Alternatives offered when a slot is taken
+DEALERSHIP_TIMEZONE = os.getenv("DEALERSHIP_TIMEZONE", "America/Los_Angeles") # "now" for relative times like "tomorrow at 3"
+TIME_PARSER_CACHE_SIZE = int(os.getenv("TIME_PARSER_CACHE_SIZE", 4096)) # Memoized phrases (langgraph_flow/time_parser.py)
+
+# Appointment replies are rendered from the templates in llm/templates.py. Set
+# APPOINTMENT_REPLY_PARAPHRASE=true to have the LLM reword them (one chat completion per reply).
+REPLY_LOCALE = os.getenv("REPLY_LOCALE", "en") # "en" or "es"
+APPOINTMENT_REPLY_PARAPHRASE = os.getenv("APPOINTMENT_REPLY_PARAPHRASE", "false").lower() == "true"
+
+# Query-embedding cache: in-process LRU in front of a SQLite file shared by all workers
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_FILE = os.getenv("EMBED_CACHE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "local_embedding_cache.db"))
+EMBED_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBED_CACHE_MEMORY_ENTRIES", 2048))
+EMBED_CACHE_DISK_ENTRIES = int(os.getenv("EMBED_CACHE_DISK_ENTRIES", 50000))
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float16") # float16 halves the blob size; float32 is lossless
+
+# Semantic answer cache for the RAG node, invalidated whenever ingestion bumps the content version
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0.95)) # Cosine similarity needed for a hit
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", 3600))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 1000))
+# The ingestion service stores the content version as a marker record in this Pinecone namespace
+CONTENT_VERSION_NAMESPACE = os.getenv("CONTENT_VERSION_NAMESPACE", "meta")
+CONTENT_VERSION_ID = "content-version"
+CONTENT_VERSION_REFRESH_SECONDS = int(os.getenv("CONTENT_VERSION_REFRESH_SECONDS", 60))
+
+# --- Observability ---
+# Leveled, structured logs (observability/log.py) written by a background thread.
+# DEBUG adds per-node progress and answer previews; "json" emits one object per line.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text") # "text" or "json"
+# Request tracing (observability/tracing.py): one span per request or voice turn, child
+# spans per graph node and provider call, exported as OTLP/JSON by a background thread.
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none") # "none", "file" (TRACE_FILE) or "otlp" (TRACE_OTLP_ENDPOINT)
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl") # One OTLP/JSON export request per line
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces") # OTLP/HTTP collector
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "chatbot-api")
+# Fraction of requests traced; unsampled requests cost one context lookup per span.
+# A caller's W3C traceparent header overrides it (its sampled flag is followed).
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", 1.0))
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", 512)) # Spans per export request
+TRACE_EXPORT_INTERVAL_SECONDS = float(os.getenv("TRACE_EXPORT_INTERVAL_SECONDS", 5.0))
+TRACE_MAX_QUEUE = int(os.getenv("TRACE_MAX_QUEUE", 4096)) # Finished spans awaiting export; beyond this they are dropped
 
 # --- Debug Flag ---
 DEBUG_MODE = False 
\ No newline at end of file
@@ -0,0 +1,147 @@
+# database/availability.py
+import asyncio
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from config import APPOINTMENT_MAX_DURATION_MINUTES, APPOINTMENT_SLOT_STEP_MINUTES, APPOINTMENT_SUGGESTION_HORIZON_DAYS
+from database.crud import get_conn, immediate_transaction, to_epoch, from_epoch
+
+# Appointment times are stored as sortable integer wall-clock seconds (start_epoch /
+# end_epoch, see crud.to_epoch) next to the ISO text, so overlap checks are integer
+# range comparisons that can use the (agent_id, start_epoch) index. Durations are capped
+# at APPOINTMENT_MAX_DURATION_MINUTES, which bounds how far back an overlapping
+# appointment can start.
+_MAX_DURATION_SECONDS = APPOINTMENT_MAX_DURATION_MINUTES * 60
+
+
+def _slot_bounds(start: datetime, duration_minutes: int) -> Tuple[int, int]:
+    if not 0 < duration_minutes <= APPOINTMENT_MAX_DURATION_MINUTES:
+        raise ValueError(f"Appointment duration must be between 1 and {APPOINTMENT_MAX_DURATION_MINUTES} minutes.")
+    start_epoch = to_epoch(start)
+    return start_epoch, start_epoch + duration_minutes * 60
+
+def _within_day(start: datetime, duration_minutes: int) -> Optional[Tuple[str, str]]:
+    """'HH:MM' bounds of the slot for the work-hours comparison, or None if it crosses midnight."""
+    end = start + timedelta(minutes=duration_minutes)
+    if end.date() != start.date() and end.time() != datetime.min.time():
+        return None
+    end_hhmm = "24:00" if end.date() != start.date() else end.strftime("%H:%M")
+    return start.strftime("%H:%M"), end_hhmm
+
+# One set-based query: agents of the role whose hours contain the slot and who have no
+# overlapping appointment. The start_epoch lower bound keeps the NOT EXISTS probe a
+# short range scan of idx_appointments_agent_epoch.
+_FREE_AGENTS_SQL = """
+SELECT ag.id, ag.name FROM agents ag
+WHERE ag.role = ?
+  AND ag.work_start <= ? AND ? <= ag.work_end
+  AND NOT EXISTS (
+      SELECT 1 FROM appointments ap
+      WHERE ap.agent_id = ag.id
+        AND ap.start_epoch > ? AND ap.start_epoch < ?
+        AND ap.end_epoch > ?
+  )
+ORDER BY ag.id
+"""
+
+def find_free_agents(role: str, start: datetime, duration_minutes: int) -> List[Tuple[int, str]]:
+    """Agents of `role` that are working and free for [start, start + duration)."""
+    start_epoch, end_epoch = _slot_bounds(start, duration_minutes)
+    hours = _within_day(start, duration_minutes)
+    if hours is None:
+        return []
+    return get_conn().execute(_FREE_AGENTS_SQL, (
+        role, hours[0], hours[1], start_epoch - _MAX_DURATION_SECONDS, end_epoch, start_epoch
+    )).fetchall()
+
+def book_first_free(role: str, start: datetime, duration_minutes: int, customer_name: str, appt_type: str,
+                    preferred_agent_ids: Optional[List[int]] = None) -> Optional[Tuple[int, str]]:
+    """Atomically books the first free agent of `role` for [start, start + duration) and
+    returns (agent_id, name), or None if every agent is taken. Agents in
+    `preferred_agent_ids` are tried first, in that order; if they were booked by someone
+    else in the meantime, the booking falls back to the remaining free agents.
+
+    The free-agent query and the insert run in one BEGIN IMMEDIATE transaction, so no
+    other booking can slip in between them; the appointments_no_overlap trigger guards
+    every other write path."""
+    start_epoch, end_epoch = _slot_bounds(start, duration_minutes)
+    hours = _within_day(start, duration_minutes)
+    if hours is None:
+        return None
+    with immediate_transaction() as conn:
+        free = conn.execute(_FREE_AGENTS_SQL, (
+            role, hours[0], hours[1], start_epoch - _MAX_DURATION_SECONDS, end_epoch, start_epoch
+        )).fetchall()
+        if not free:
+            return None
+        rank = {agent_id: i for i, agent_id in enumerate(preferred_agent_ids or [])}
+        agent_id, agent_name = min(free, key=lambda agent: rank.get(agent[0], len(rank)))
+        conn.execute("""INSERT INTO appointments (agent_id, customer_name, start_time, duration_minutes, type, start_epoch, end_epoch)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                     (agent_id, customer_name, start.isoformat(), duration_minutes, appt_type, start_epoch, end_epoch))
+    return agent_id, agent_name
+
+async def abook_first_free(role: str, start: datetime, duration_minutes: int, customer_name: str, appt_type: str,
+                           preferred_agent_ids: Optional[List[int]] = None) -> Optional[Tuple[int, str]]:
+    """Async variant of book_first_free."""
+    return await asyncio.to_thread(book_first_free, role, start, duration_minutes, customer_name, appt_type, preferred_agent_ids)
+
+def agent_has_conflict(agent_id: int, start_epoch: int, end_epoch: int) -> bool:
+    """True if the agent has an appointment overlapping [start_epoch, end_epoch)."""
+    return get_conn().execute("""
+        SELECT 1 FROM appointments
+        WHERE agent_id = ? AND start_epoch > ? AND start_epoch < ? AND end_epoch > ?
+        LIMIT 1
+    """, (agent_id, start_epoch - _MAX_DURATION_SECONDS, end_epoch, start_epoch)).fetchone() is not None
+
+def next_free_slots(role: str, after: datetime, duration_minutes: int, n: int = 3,
+                    step_minutes: int = APPOINTMENT_SLOT_STEP_MINUTES,
+                    horizon_days: int = APPOINTMENT_SUGGESTION_HORIZON_DAYS) -> List[Tuple[datetime, int, str]]:
+    """The first `n` slot starts (on the step grid, at or after `after`) where some agent
+    of `role` is free, as (start, agent_id, agent_name). Reads the role's agents and their
+    appointments in the horizon once, then walks the grid with per-agent interval lookups."""
+    conn = get_conn()
+    agents = conn.execute("SELECT id, name, work_start, work_end FROM agents WHERE role = ? ORDER BY id", (role,)).fetchall()
+    if not agents or n <= 0:
+        return []
+    _slot_bounds(after, duration_minutes) # Validates the duration
+
+    step = step_minutes * 60
+    first = -(-to_epoch(after) // step) * step # Round up to the grid
+    horizon = first + horizon_days * 86400
+    busy: Dict[int, List[Tuple[int, int]]] = defaultdict(list) # agent_id -> sorted (start, end)
+    placeholders = ",".join("?" * len(agents))
+    for agent_id, start_epoch, end_epoch in conn.execute(f"""
+        SELECT agent_id, start_epoch, end_epoch FROM appointments
+        WHERE agent_id IN ({placeholders}) AND start_epoch > ? AND start_epoch < ?
+        ORDER BY agent_id, start_epoch
+    """, (*[agent[0] for agent in agents], first - _MAX_DURATION_SECONDS, horizon + duration_minutes * 60)):
+        busy[agent_id].append((start_epoch, end_epoch))
+    starts = {agent_id: [interval[0] for interval in intervals] for agent_id, intervals in busy.items()}
+
+    def is_free(agent_id: int, start_epoch: int, end_epoch: int) -> bool:
+        intervals = busy.get(agent_id, [])
+        # Only appointments starting before end_epoch can overlap; check back to the longest duration
+        i = bisect_left(starts.get(agent_id, []), end_epoch) - 1
+        while i >= 0 and intervals[i][0] > start_epoch - _MAX_DURATION_SECONDS:
+            if intervals[i][1] > start_epoch:
+                return False
+            i -= 1
+        return True
+
+    slots = []
+    for start_epoch in range(first, horizon, step):
+        start = from_epoch(start_epoch)
+        hours = _within_day(start, duration_minutes)
+        if hours is None:
+            continue
+        end_epoch = start_epoch + duration_minutes * 60
+        for agent_id, agent_name, work_start, work_end in agents:
+            if work_start <= hours[0] and hours[1] <= work_end and is_free(agent_id, start_epoch, end_epoch):
+                slots.append((start.replace(tzinfo=after.tzinfo), agent_id, agent_name))
+                break
+        if len(slots) >= n:
+            break
+    return slots
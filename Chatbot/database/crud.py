@@ -1,119 +1,243 @@
 # database/crud.py
+import asyncio
+import calendar
 import sqlite3
-from typing import List, Dict, Tuple
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, List, Dict, Tuple
 import os
 
 # Import DB_FILE from config
-from config import DB_FILE
+from config import DB_FILE, DB_BUSY_TIMEOUT_SECONDS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE_MB, APPOINTMENT_MAX_DURATION_MINUTES
+from observability.log import get_logger
 
-# Global connection and cursor (managed carefully for thread-safety in FastAPI)
-# For production, consider using a connection pool or dependency injection per request.
-# For SQLite with check_same_thread=False, this is generally okay for simple apps.
-conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-cur = conn.cursor()
+log = get_logger("db")
 
-def setup_db():
-    """Creates tables and seeds initial data if they don't exist."""
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS agents (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        role TEXT NOT NULL,
-        work_start TEXT DEFAULT '09:00',
-        work_end TEXT DEFAULT '17:00'
-    )
-    """)
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS appointments (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        agent_id INTEGER,
-        customer_name TEXT,
-        start_time TEXT,
-        duration_minutes INTEGER DEFAULT 30,
-        type TEXT,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY(agent_id) REFERENCES agents(id)
-    )
-    """)
-
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS conversations (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        session_id TEXT,
-        role TEXT,
-        content TEXT,
-        created_at TEXT DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
+# One connection per thread: the async wrappers below run these functions on the
+# event loop's worker threads, and each keeps its connection for reuse. WAL lets the
+# readers proceed while another thread writes; SQLite still allows one writer at a
+# time, and a writer waits up to DB_BUSY_TIMEOUT_SECONDS for the lock.
+_local = threading.local()
+
+def get_conn() -> sqlite3.Connection:
+    """Returns this thread's connection, opening and tuning it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_FILE, timeout=DB_BUSY_TIMEOUT_SECONDS)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # Durable at checkpoints; safe against corruption with WAL
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}") # Negative = KiB
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE_MB * 1024 * 1024}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        _local.conn = conn
+    return conn
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """Runs the block in one transaction on this thread's connection (commit or rollback)."""
+    conn = get_conn()
+    with conn:
+        yield conn
+
+@contextmanager
+def immediate_transaction() -> Iterator[sqlite3.Connection]:
+    """Like transaction(), but takes SQLite's write lock up front (BEGIN IMMEDIATE), so reads
+    inside the block can't be invalidated by another writer before the block's own writes.
+    Concurrent callers queue on the lock for up to DB_BUSY_TIMEOUT_SECONDS."""
+    conn = get_conn()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
     conn.commit()
 
+def to_epoch(value) -> int:
+    """Wall-clock seconds for a datetime or ISO-8601 string. Appointment times are dealership
+    local times, so any tzinfo is dropped rather than converted; the result only has to
+    sort and subtract consistently."""
+    dt = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return calendar.timegm(dt.replace(tzinfo=None).timetuple())
+
+def from_epoch(seconds: int) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(seconds=seconds)
+
+def _add_column_if_missing(conn: sqlite3.Connection, table: str, column: str, definition: str):
+    """Adds a column to an existing table (databases created before the column existed)."""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def _backfill_appointment_epochs(conn: sqlite3.Connection):
+    """Fills start_epoch/end_epoch for appointments written before the columns existed."""
+    rows = conn.execute("SELECT id, start_time, duration_minutes FROM appointments WHERE start_epoch IS NULL").fetchall()
+    updates = []
+    for appointment_id, start_time, duration_minutes in rows:
+        try:
+            start_epoch = to_epoch(start_time)
+        except (TypeError, ValueError):
+            log.warning("Unparseable appointment start_time; left out of availability",
+                        appointment_id=appointment_id, start_time=start_time)
+            continue
+        updates.append((start_epoch, start_epoch + (duration_minutes or 30) * 60, appointment_id))
+    conn.executemany("UPDATE appointments SET start_epoch = ?, end_epoch = ? WHERE id = ?", updates)
+
+def setup_db():
+    """Creates tables and indexes and seeds initial data if they don't exist."""
+    with transaction() as conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS agents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            role TEXT NOT NULL,
+            work_start TEXT DEFAULT '09:00',
+            work_end TEXT DEFAULT '17:00'
+        )
+        """)
+
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agent_id INTEGER,
+            customer_name TEXT,
+            start_time TEXT,
+            duration_minutes INTEGER DEFAULT 30,
+            type TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(agent_id) REFERENCES agents(id)
+        )
+        """)
+
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            role TEXT,
+            content TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+
+        # load_history: last N rows of one session
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_session_id ON conversations(session_id, id)")
+        # Sortable integer copies of the appointment interval (see to_epoch)
+        _add_column_if_missing(conn, "appointments", "start_epoch", "INTEGER")
+        _add_column_if_missing(conn, "appointments", "end_epoch", "INTEGER")
+        _backfill_appointment_epochs(conn)
+        # Conflict checks: one agent's appointments in a start range (database/availability.py)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_agent_epoch ON appointments(agent_id, start_epoch, end_epoch)")
+        # get_upcoming_appointments: ordered by start time across agents
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_appointments_start_epoch ON appointments(start_epoch)")
+        # Superseded by the epoch indexes above
+        conn.execute("DROP INDEX IF EXISTS idx_appointments_start")
+        conn.execute("DROP INDEX IF EXISTS idx_appointments_agent_start")
+        # Exclusion guard: no insert may overlap another appointment of the same agent, whichever
+        # code path writes it. Recreated on startup so the range bound follows the config.
+        conn.execute("DROP TRIGGER IF EXISTS appointments_no_overlap")
+        conn.execute(f"""
+        CREATE TRIGGER appointments_no_overlap BEFORE INSERT ON appointments
+        WHEN NEW.start_epoch IS NOT NULL AND EXISTS (
+            SELECT 1 FROM appointments
+            WHERE agent_id = NEW.agent_id
+              AND start_epoch > NEW.start_epoch - {APPOINTMENT_MAX_DURATION_MINUTES * 60}
+              AND start_epoch < NEW.end_epoch AND end_epoch > NEW.start_epoch
+        )
+        BEGIN
+            SELECT RAISE(ABORT, 'appointment overlaps an existing booking for this agent');
+        END
+        """)
+        # Free-agent lookups by role
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_agents_role ON agents(role)")
+
     seed_agents()
 
 def seed_agents():
     """Seeds initial agent data if the agents table is empty."""
-    cur.execute("SELECT COUNT(*) FROM agents")
-    if cur.fetchone()[0] == 0:
-        agents = [
-            ("Sarah Johnson", "sales", "09:00", "17:00"),
-            ("Mike Rodriguez", "sales", "09:00", "17:00"),
-            ("Jennifer Chen", "sales", "10:00", "18:00"),
-            ("Tom Wilson", "service", "08:00", "16:00"),
-            ("Lisa Martinez", "service", "09:00", "17:00"),
-            ("David Park", "service", "10:00", "18:00")
-        ]
-        cur.executemany("INSERT INTO agents (name, role, work_start, work_end) VALUES (?, ?, ?, ?)", agents)
-        conn.commit()
+    with transaction() as conn:
+        if conn.execute("SELECT COUNT(*) FROM agents").fetchone()[0] == 0:
+            agents = [
+                ("Sarah Johnson", "sales", "09:00", "17:00"),
+                ("Mike Rodriguez", "sales", "09:00", "17:00"),
+                ("Jennifer Chen", "sales", "10:00", "18:00"),
+                ("Tom Wilson", "service", "08:00", "16:00"),
+                ("Lisa Martinez", "service", "09:00", "17:00"),
+                ("David Park", "service", "10:00", "18:00")
+            ]
+            conn.executemany("INSERT INTO agents (name, role, work_start, work_end) VALUES (?, ?, ?, ?)", agents)
 
 def append_history(session_id: str, role: str, content: str):
     """Appends a message to the conversation history."""
-    cur.execute("INSERT INTO conversations (session_id, role, content) VALUES (?, ?, ?)",
-                (session_id, role, content))
-    conn.commit()
+    append_history_batch([(session_id, role, content)])
+
+def append_history_batch(messages: List[Tuple[str, str, str]]):
+    """Appends (session_id, role, content) messages in a single transaction."""
+    with transaction() as conn:
+        conn.executemany("INSERT INTO conversations (session_id, role, content) VALUES (?, ?, ?)", messages)
 
 def load_history(session_id: str, last_n: int = 10) -> List[Dict[str, str]]:
     """Loads the last N messages from conversation history."""
-    cur.execute("""
+    rows = get_conn().execute("""
     SELECT role, content FROM conversations
     WHERE session_id = ?
     ORDER BY id DESC LIMIT ?
-    """, (session_id, last_n))
-    rows = cur.fetchall()
+    """, (session_id, last_n)).fetchall()
     rows = list(reversed(rows))
     return [{"role": r, "content": c} for r, c in rows]
 
 def get_agent_work_hours(agent_id: int) -> Tuple[str, str]:
     """Retrieves work hours for a given agent."""
-    cur.execute("SELECT work_start, work_end FROM agents WHERE id = ?", (agent_id,))
-    return cur.fetchone()
+    return get_conn().execute("SELECT work_start, work_end FROM agents WHERE id = ?", (agent_id,)).fetchone()
 
 def get_agent_by_role(role: str) -> List[Tuple[int, str]]:
     """Retrieves agents by their role."""
-    cur.execute("SELECT id, name FROM agents WHERE role = ?", (role,))
-    return cur.fetchall()
+    return get_conn().execute("SELECT id, name FROM agents WHERE role = ?", (role,)).fetchall()
 
 def get_conflicting_appointments(agent_id: int, start_time: str, end_time: str) -> List[Tuple[str, int]]:
     """Checks for conflicting appointments for a given agent and time slot."""
-    cur.execute("""
+    # Overlap on the integer interval (existing.start < end AND existing.end > start); the
+    # lower bound on start_epoch keeps it a short range scan of idx_appointments_agent_epoch
+    start_epoch = to_epoch(start_time)
+    return get_conn().execute("""
         SELECT start_time, duration_minutes FROM appointments
-        WHERE agent_id = ?
-        AND (
-            (start_time <= ? AND ? < start_time + duration_minutes * 60) OR
-            (? <= start_time AND start_time < ?)
-        )
-    """, (agent_id, start_time, start_time, end_time, end_time))
-    return cur.fetchall()
+        WHERE agent_id = ? AND start_epoch > ? AND start_epoch < ? AND end_epoch > ?
+    """, (agent_id, start_epoch - APPOINTMENT_MAX_DURATION_MINUTES * 60, to_epoch(end_time), start_epoch)).fetchall()
 
 def create_appointment(agent_id: int, customer_name: str, start_time: str, duration_minutes: int, appt_type: str):
     """Creates a new appointment record."""
-    cur.execute("INSERT INTO appointments (agent_id, customer_name, start_time, duration_minutes, type) VALUES (?, ?, ?, ?, ?)",
-                (agent_id, customer_name, start_time, duration_minutes, appt_type))
-    conn.commit()
+    start_epoch = to_epoch(start_time)
+    with transaction() as conn:
+        conn.execute("""INSERT INTO appointments (agent_id, customer_name, start_time, duration_minutes, type, start_epoch, end_epoch)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                     (agent_id, customer_name, start_time, duration_minutes, appt_type, start_epoch, start_epoch + duration_minutes * 60))
 
 def get_upcoming_appointments(limit: int = 5) -> List[Tuple[str, str]]:
     """Retrieves a list of upcoming appointments."""
-    cur.execute("SELECT a.start_time, ag.name FROM appointments a JOIN agents ag ON a.agent_id = ag.id ORDER BY a.start_time LIMIT ?", (limit,))
-    return cur.fetchall()
+    return get_conn().execute(
+        "SELECT a.start_time, ag.name FROM appointments a JOIN agents ag ON a.agent_id = ag.id ORDER BY a.start_epoch LIMIT ?", (limit,)
+    ).fetchall()
+
+# --- Async wrappers (non-blocking access from the async graph nodes / endpoints) ---
+async def aappend_history(session_id: str, role: str, content: str):
+    """Async variant of append_history that runs the write in a worker thread."""
+    await asyncio.to_thread(append_history, session_id, role, content)
+
+async def aappend_history_batch(messages: List[Tuple[str, str, str]]):
+    """Async variant of append_history_batch."""
+    await asyncio.to_thread(append_history_batch, messages)
+
+async def aload_history(session_id: str, last_n: int = 10) -> List[Dict[str, str]]:
+    """Async variant of load_history that runs the query in a worker thread."""
+    return await asyncio.to_thread(load_history, session_id, last_n)
+
+async def aget_upcoming_appointments(limit: int = 5) -> List[Tuple[str, str]]:
+    """Async variant of get_upcoming_appointments."""
+    return await asyncio.to_thread(get_upcoming_appointments, limit)
+
+async def acreate_appointment(agent_id: int, customer_name: str, start_time: str, duration_minutes: int, appt_type: str):
+    """Async variant of create_appointment."""
+    await asyncio.to_thread(create_appointment, agent_id, customer_name, start_time, duration_minutes, appt_type)
 
 # Initialize DB on module import
 setup_db()
\ No newline at end of file
@@ -0,0 +1,177 @@
+# database/history_cache.py
+import asyncio
+import functools
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from config import (
+    HISTORY_CACHE_ENABLED, HISTORY_CACHE_MAX_SESSIONS, HISTORY_CACHE_IDLE_TTL_SECONDS,
+    HISTORY_CACHE_MESSAGES, HISTORY_FLUSH_INTERVAL_SECONDS, HISTORY_FLUSH_MAX_BATCH
+)
+from database import crud
+from observability.log import get_logger
+
+log = get_logger("history_cache")
+
+
+class _Session:
+    __slots__ = ("messages", "last_access", "unflushed")
+
+    def __init__(self, messages: List[Dict[str, str]], keep: int):
+        self.messages: Deque[Dict[str, str]] = deque(messages, maxlen=keep)
+        self.last_access = time.monotonic()
+        self.unflushed = 0 # Messages of this session still waiting in the write buffer
+
+
+class SessionHistoryCache:
+    """Recent conversation turns of active sessions, kept in memory in front of SQLite.
+
+    load() serves the last `keep_messages` messages of a session from memory after the
+    first read. append() updates the cached session and, once start() has been called,
+    buffers the rows; a background task writes the buffer in one transaction every
+    `flush_interval` seconds (sooner if `max_batch` rows are waiting) and at stop().
+    Without start() (CLI, scripts) appends are written through immediately.
+
+    Sessions are evicted least recently used beyond `max_sessions`, or after
+    `idle_ttl` seconds without access, but never while they have unflushed messages,
+    so a reload from SQLite always sees every message. Everything runs on the event
+    loop; only the SQLite reads/writes go to worker threads.
+    """
+
+    def __init__(self, enabled: bool = HISTORY_CACHE_ENABLED, max_sessions: int = HISTORY_CACHE_MAX_SESSIONS,
+                 idle_ttl: float = HISTORY_CACHE_IDLE_TTL_SECONDS, keep_messages: int = HISTORY_CACHE_MESSAGES,
+                 flush_interval: float = HISTORY_FLUSH_INTERVAL_SECONDS, max_batch: int = HISTORY_FLUSH_MAX_BATCH):
+        self.enabled = enabled
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.keep_messages = keep_messages
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._buffer: List[Tuple[str, str, str]] = [] # (session_id, role, content) not yet in SQLite
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_now: Optional[asyncio.Event] = None
+        self._flush_lock = asyncio.Lock() # One flush at a time keeps rows in append order
+        self._write: Optional[asyncio.Task] = None # Batch write still running after its flush was cancelled
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "flushes": 0, "flushed_messages": 0, "flush_errors": 0}
+
+    # --- Reads ---
+    async def load(self, session_id: str, last_n: int = 10) -> List[Dict[str, str]]:
+        """Returns the last `last_n` messages of a session, oldest first."""
+        if not self.enabled or last_n > self.keep_messages:
+            await self.flush()
+            return await crud.aload_history(session_id, last_n)
+        session = self._sessions.get(session_id)
+        if session is None:
+            self.stats["misses"] += 1
+            messages = await crud.aload_history(session_id, self.keep_messages)
+            session = self._sessions.get(session_id) # Another request may have loaded it meanwhile
+            if session is None:
+                session = _Session(messages, self.keep_messages)
+                self._sessions[session_id] = session
+        else:
+            self.stats["hits"] += 1
+        session.last_access = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        self._evict()
+        return list(session.messages)[-last_n:] if last_n > 0 else []
+
+    # --- Writes ---
+    async def append(self, session_id: str, messages: List[Tuple[str, str]]):
+        """Appends (role, content) messages to a session."""
+        rows = [(session_id, role, content) for role, content in messages]
+        if not self.enabled:
+            await crud.aappend_history_batch(rows)
+            return
+        if session_id not in self._sessions:
+            await self.load(session_id, 0)
+        session = self._sessions[session_id]
+        session.messages.extend({"role": role, "content": content} for role, content in messages)
+        session.last_access = time.monotonic()
+
+        if self._flush_task is None:
+            await crud.aappend_history_batch(rows) # Write-through when the flusher isn't running
+            return
+        session.unflushed += len(rows)
+        self._buffer.extend(rows)
+        if len(self._buffer) >= self.max_batch:
+            self._flush_now.set()
+
+    async def flush(self):
+        """Writes every buffered message to SQLite in one transaction. Cancelling the caller
+        (shutdown) doesn't abandon the write: it runs to completion and its batch is settled
+        by _settle, or put back in the buffer if it failed."""
+        async with self._flush_lock:
+            if self._write is not None: # A cancelled flush's write must land before the next batch
+                await asyncio.wait([self._write])
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            self._write = asyncio.ensure_future(crud.aappend_history_batch(batch))
+            self._write.add_done_callback(functools.partial(self._settle, batch))
+            await asyncio.wait([self._write]) # Unlike awaiting the task, cancelling this wait leaves the write running
+
+    def _settle(self, batch: List[Tuple[str, str, str]], write: asyncio.Task):
+        if self._write is write:
+            self._write = None
+        if write.cancelled() or write.exception() is not None:
+            self._buffer = batch + self._buffer # Keep order; retried on the next flush
+            self.stats["flush_errors"] += 1
+            error = "cancelled" if write.cancelled() else str(write.exception())
+            log.error("History flush failed; retried on the next flush", messages=len(batch), error=error)
+            return
+        self.stats["flushes"] += 1
+        self.stats["flushed_messages"] += len(batch)
+        for session_id, _, _ in batch:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.unflushed -= 1
+
+    # --- Eviction ---
+    def _evict(self):
+        now = time.monotonic()
+        for session_id in list(self._sessions):
+            session = self._sessions[session_id]
+            over_capacity = len(self._sessions) > self.max_sessions
+            idle = now - session.last_access > self.idle_ttl
+            if not over_capacity and not idle:
+                break # Sessions are in LRU order; the rest are more recent
+            if session.unflushed == 0:
+                del self._sessions[session_id]
+                self.stats["evictions"] += 1
+
+    # --- Background flusher ---
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self.flush()
+            self._evict()
+
+    def start(self):
+        """Starts write-behind flushing on the running event loop (FastAPI startup)."""
+        if self.enabled and self._flush_task is None:
+            self._flush_now = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stops the flusher and writes whatever is still buffered (FastAPI shutdown)."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await asyncio.shield(self.flush()) # Finishes even if shutdown cancels stop() itself
+
+    def snapshot_stats(self):
+        return {**self.stats, "sessions": len(self._sessions), "buffered_messages": len(self._buffer)}
+
+
+# Instantiate globally for the API service
+history_cache = SessionHistoryCache()
@@ -1,10 +1,20 @@
 # langgraph_flow/graph.py
+import functools
+import inspect
+import time
+
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 
+from config import GRAPH_MODE
+from observability.metrics import GRAPH_NODE_SECONDS, current_intent
+from observability.tracing import tracer
+
 # Import nodes and state
 from langgraph_flow.nodes import (
     node_rephrase_query,
     node_classify_intent,
+    node_route_and_rewrite,
     node_rag,
     node_appointment,
     node_chitchat,
@@ -12,22 +22,56 @@ from langgraph_flow.nodes import (
 )
 from langgraph_flow.state import AgentState
 
-def build_graph():
-    workflow = StateGraph(AgentState)
+def instrumented(name: str, node):
+    """Wraps a node so its duration lands in the per-node histogram and in a trace span,
+    and the LLM calls it makes are counted under the turn's intent ("routing" until the
+    intent is known). The intent a routing node decides is put on the request's span."""
+    takes_config = "config" in inspect.signature(node).parameters
 
-    workflow.add_node("rephrase", node_rephrase_query)
-    workflow.add_node("classify", node_classify_intent)
-    workflow.add_node("rag", node_rag)
-    workflow.add_node("appointment", node_appointment)
-    workflow.add_node("chitchat", node_chitchat)
-    workflow.add_node("update_history", node_update_history)
+    @functools.wraps(node)
+    async def wrapper(state: AgentState, config: RunnableConfig = None):
+        intent_token = current_intent.set(state.get("intent") or "routing")
+        started = time.perf_counter()
+        try:
+            with tracer.span(f"node {name}", attributes={"node": name, "session_id": state.get("session_id"),
+                                                         "intent": state.get("intent") or None}) as span:
+                result = await (node(state, config) if takes_config else node(state))
+                if span.recording and isinstance(result, dict) and result.get("intent"):
+                    span.set_attribute("intent", result["intent"])
+                    span.root.set_attribute("intent", result["intent"])
+                return result
+        finally:
+            GRAPH_NODE_SECONDS.observe(time.perf_counter() - started, node=name)
+            current_intent.reset(intent_token)
+    return wrapper
+
+def build_graph(mode: str = GRAPH_MODE):
+    """Compiles the chat graph.
+
+    mode="two_step" runs the rephrase and classify nodes as separate LLM calls;
+    mode="combined" replaces both with a single route-and-rewrite call.
+    """
+    workflow = StateGraph(AgentState)
+    add_node = lambda name, node: workflow.add_node(name, instrumented(name, node))
 
-    workflow.set_entry_point("rephrase")
+    if mode == "combined":
+        router = "route"
+        add_node("route", node_route_and_rewrite)
+        workflow.set_entry_point("route")
+    else:
+        router = "classify"
+        add_node("rephrase", node_rephrase_query)
+        add_node("classify", node_classify_intent)
+        workflow.set_entry_point("rephrase")
+        workflow.add_edge("rephrase", "classify")
 
-    workflow.add_edge("rephrase", "classify")
+    add_node("rag", node_rag)
+    add_node("appointment", node_appointment)
+    add_node("chitchat", node_chitchat)
+    add_node("update_history", node_update_history)
 
     workflow.add_conditional_edges(
-        "classify",
+        router,
         lambda state: state["intent"],
         {
             "RAG": "rag",
@@ -1,78 +1,84 @@
 # langgraph_flow/nodes.py
+import asyncio
+import hashlib
 import json
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Tuple
 
 # Import from other modules
-from llm.helper import llm_helper
+from llm.helper import llm_helper, ANSWER_HISTORY_TURNS
+from llm.fast_intent import fast_intent_classifier
+from config import (
+    FAST_INTENT_ENABLED, ANSWER_CACHE_ENABLED, APPOINTMENT_MAX_DURATION_MINUTES, APPOINTMENT_SUGGESTIONS,
+    APPOINTMENT_REPLY_PARAPHRASE
+)
+from llm.templates import reply_renderer
 from llm.prompts import RAG_SYSTEM_PROMPT, APPOINTMENT_SYSTEM_PROMPT, CHITCHAT_SYSTEM_PROMPT, CLASSIFY_EXTRACT_PROMPT
-from rag.retrieval import retrieve_top_k
-from database.crud import load_history, append_history, get_agent_work_hours, get_agent_by_role, get_conflicting_appointments, create_appointment, get_upcoming_appointments
+from rag.retrieval import retrieve_top_k, embed_text, get_content_version
+from rag.answer_cache import answer_cache
+from database.history_cache import history_cache
+from database.crud import aget_upcoming_appointments
+from database.availability import find_free_agents, next_free_slots, abook_first_free
 from langgraph_flow.state import AgentState
+from langchain_core.runnables import RunnableConfig
+from observability.log import get_logger
 
 # For date parsing in appointment node
-from dateutil import parser
-from dateutil.relativedelta import relativedelta
-from datetime import UTC # Ensure this is imported if used
+from langgraph_flow.time_parser import parse_time_preference
 
-# UTIL: Appointment Helpers (moved from main.py)
-def parse_time_preference(text: str) -> Optional[datetime]:
-    try:
-        dt = parser.parse(text, fuzzy_with_tokens=True)[0]
-        if not any(attr in text for attr in ['year', 'month', 'day', 'today', 'tomorrow', 'yesterday']):
-            dt = dt.replace(year=datetime.now(UTC).year, month=datetime.now(UTC).month, day=datetime.now(UTC).day)
-            if dt < datetime.now(UTC):
-                dt += timedelta(days=1)
-        return dt.replace(second=0, microsecond=0)
-    except Exception:
-        return None
-
-def is_slot_available(agent_id: int, proposed_start_time: datetime, duration_minutes: int) -> bool:
-    proposed_end_time = proposed_start_time + timedelta(minutes=duration_minutes)
-
-    agent_hours = get_agent_work_hours(agent_id)
-    if agent_hours:
-        work_start_str, work_end_str = agent_hours
-        work_start_dt = proposed_start_time.replace(hour=int(work_start_str.split(':')[0]), minute=int(work_start_str.split(':')[1]))
-        work_end_dt = proposed_start_time.replace(hour=int(work_end_str.split(':')[0]), minute=int(work_end_str.split(':')[1]))
-
-        if not (work_start_dt <= proposed_start_time < work_end_dt and work_start_dt < proposed_end_time <= work_end_dt):
-            print(f"Slot {proposed_start_time} to {proposed_end_time} is outside agent's working hours ({work_start_dt} to {work_end_dt}).")
-            return False
-
-    conflicting_appointments = get_conflicting_appointments(agent_id, proposed_start_time.isoformat(), proposed_end_time.isoformat())
-    if conflicting_appointments:
-        print(f"Slot {proposed_start_time} to {proposed_end_time} conflicts with existing appointments.")
-        return False
-    return True
+log = get_logger("graph")
 
+# UTIL: Appointment Helpers (moved from main.py)
 def find_available_agents(role: str, proposed_start_time: datetime, duration_minutes: int) -> List[Tuple[int, str]]:
-    all_agents = get_agent_by_role(role)
-    available_agents = []
-    for agent_id, agent_name in all_agents:
-        if is_slot_available(agent_id, proposed_start_time, duration_minutes):
-            available_agents.append((agent_id, agent_name))
-    return available_agents
+    # One set-based query for the whole role (working hours + overlap check)
+    return find_free_agents(role, proposed_start_time, duration_minutes)
+
+
+# UTIL: Token streaming
+# When the graph runs behind /chat/stream, the endpoint passes an asyncio.Queue as
+# config["configurable"]["token_queue"] and the answer nodes push ("token", text) items
+# onto it as the LLM produces them. Without a queue the nodes behave exactly as before.
+def get_token_queue(config: Optional[RunnableConfig]) -> Optional[asyncio.Queue]:
+    return ((config or {}).get("configurable") or {}).get("token_queue")
+
+async def generate_answer(config: Optional[RunnableConfig], system_prompt: str, user_query: str, context_chunks: List[str], history: List[Dict[str, str]]) -> str:
+    token_queue = get_token_queue(config)
+    if token_queue is None:
+        return await llm_helper.chat_with_context(system_prompt, user_query, context_chunks, history)
+
+    parts = []
+    async for token in llm_helper.stream_chat_with_context(system_prompt, user_query, context_chunks, history):
+        parts.append(token)
+        await token_queue.put(("token", token))
+    return "".join(parts).strip()
 
 
 # LangGraph Nodes
-def node_rephrase_query(state: AgentState) -> Dict[str, Any]:
+async def node_rephrase_query(state: AgentState) -> Dict[str, Any]:
     user_query = state["user_query"]
     history = state["conversation_history"]
     try:
-        rewritten = llm_helper.rephrase_query(user_query, history)
-        print(f"[rephrase] Rewritten query: {rewritten}")
+        rewritten = await llm_helper.rephrase_query(user_query, history)
+        log.debug("Rewrote query", node="rephrase", query=rewritten)
     except Exception as e:
-        print(f"[rephrase] error: {e}")
+        log.warning("Rephrase failed, using the original query", node="rephrase", error=str(e))
         rewritten = user_query
     return {"rewritten_query": rewritten}
 
-def node_classify_intent(state: AgentState) -> Dict[str, Any]:
+async def node_classify_intent(state: AgentState) -> Dict[str, Any]:
     rewritten_query = state["rewritten_query"]
     extracted_appointment_details = None
 
+    if FAST_INTENT_ENABLED:
+        fast_result = fast_intent_classifier.classify(rewritten_query)
+        if fast_result:
+            intent, extracted_appointment_details = fast_result
+            log.info("Classified intent", node="classify", intent=intent, fast_path=True)
+            return {"intent": intent, "extracted_appointment_details": extracted_appointment_details}
+
     try:
-        resp = llm_helper.client.chat.completions.create( # Use llm_helper.client
+        resp = await llm_helper.provider.chat( # Retried / hedged like the helper's own calls
+            kind="classify",
             model=llm_helper.chat_model, # Use llm_helper.chat_model
             messages=[{"role": "system", "content": CLASSIFY_EXTRACT_PROMPT},
                       {"role": "user", "content": f"User query: {rewritten_query}"}],
@@ -80,7 +86,7 @@ def node_classify_intent(state: AgentState) -> Dict[str, Any]:
             temperature=0
         )
         llm_output = resp.choices[0].message.content.strip()
-        print(f"[classify] Raw LLM output: {llm_output}")
+        log.debug("Classifier output", node="classify", output=llm_output)
 
         lines = llm_output.split('\n')
         intent = lines[0].strip().upper()
@@ -89,9 +95,9 @@ def node_classify_intent(state: AgentState) -> Dict[str, Any]:
             try:
                 json_str = "\n".join(lines[1:]).strip()
                 extracted_appointment_details = json.loads(json_str)
-                print(f"[classify] Extracted details: {extracted_appointment_details}")
+                log.debug("Extracted appointment details", node="classify", details=extracted_appointment_details)
             except json.JSONDecodeError:
-                print(f"[classify] Warning: Could not parse JSON details for APPOINTMENT intent: {json_str}")
+                log.warning("Could not parse appointment details", node="classify", output=json_str)
                 extracted_appointment_details = None
 
         if "APPOINT" in intent:
@@ -101,100 +107,147 @@ def node_classify_intent(state: AgentState) -> Dict[str, Any]:
         else:
             intent = "CHAT"
 
-        print(f"[classify] Final Intent: {intent}")
+        log.info("Classified intent", node="classify", intent=intent, fast_path=False)
 
     except Exception as e:
-        print(f"[classify] error: {e}")
+        log.error("Classification failed", node="classify", error=str(e))
         intent = "RAG"
         extracted_appointment_details = None
 
     return {"intent": intent, "extracted_appointment_details": extracted_appointment_details}
 
-def node_rag(state: AgentState) -> Dict[str, Any]:
-    print("[RAG Node] Starting execution.")
+async def node_route_and_rewrite(state: AgentState) -> Dict[str, Any]:
+    """Combined replacement for node_rephrase_query + node_classify_intent (GRAPH_MODE=combined)."""
+    user_query = state["user_query"]
+    history = state["conversation_history"]
+
+    # Without history there is nothing to rewrite, so a confident local decision saves the call entirely.
+    if FAST_INTENT_ENABLED and not history:
+        fast_result = fast_intent_classifier.classify(user_query)
+        if fast_result:
+            intent, extracted_appointment_details = fast_result
+            log.info("Classified intent", node="route", intent=intent, fast_path=True)
+            return {"rewritten_query": user_query, "intent": intent, "extracted_appointment_details": extracted_appointment_details}
+
+    try:
+        result = await llm_helper.route_and_rewrite(user_query, history)
+        rewritten = result["rewritten_query"]
+        intent = str(result.get("intent", "")).upper()
+        if intent not in ("RAG", "APPOINTMENT", "CHAT"):
+            intent = "CHAT"
+        extracted_appointment_details = result.get("appointment") if intent == "APPOINTMENT" else None
+        log.debug("Rewrote query", node="route", query=rewritten)
+        log.info("Classified intent", node="route", intent=intent, fast_path=False, details=extracted_appointment_details)
+    except Exception as e:
+        log.error("Routing failed", node="route", error=str(e))
+        rewritten = user_query
+        intent = "RAG"
+        extracted_appointment_details = None
+
+    return {"rewritten_query": rewritten, "intent": intent, "extracted_appointment_details": extracted_appointment_details}
+
+def history_digest(history: List[Dict[str, str]]) -> str:
+    """Digest of the earlier turns answer generation sees ("" with no history); part of the answer cache key."""
+    window = [(h["role"], h["content"]) for h in (history or [])[-ANSWER_HISTORY_TURNS:]]
+    if not window:
+        return ""
+    return hashlib.sha256(json.dumps(window, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+async def node_rag(state: AgentState, config: RunnableConfig = None) -> Dict[str, Any]:
     rewritten_query = state["rewritten_query"]
     history = state["conversation_history"]
 
     try:
-        print("[RAG Node] Retrieving top K documents from Pinecone...")
-        top = retrieve_top_k(rewritten_query) # k is already in config
+        query_embedding = None
+        content_version = None
+        # The answer also depends on the earlier turns in the prompt, so they are part of the key:
+        # a follow-up is only served an answer generated after the same turns
+        conversation = history_digest(history)
+        if ANSWER_CACHE_ENABLED:
+            query_embedding = await embed_text(rewritten_query)
+            content_version = await get_content_version()
+            cached_answer = answer_cache.lookup(query_embedding, content_version, conversation)
+            if cached_answer is not None:
+                log.debug("Served from semantic answer cache", node="rag")
+                return {"answer": cached_answer}
+
+        top = await retrieve_top_k(rewritten_query, query_embedding=query_embedding) # k is already in config
         context_chunks = [f"Source: {url}\n{chunk[:2000]}" for score, chunk, url in top]
-        print(f"[RAG Node] Found {len(context_chunks)} context chunks.")
+        log.debug("Retrieved context", node="rag", chunks=len(context_chunks))
 
         system_prompt = RAG_SYSTEM_PROMPT
-        print("[RAG Node] Calling chat_with_context...")
-        answer = llm_helper.chat_with_context(system_prompt, rewritten_query, context_chunks, history)
-        print(f"[RAG Node] Answer generated: {answer[:100]}...")
-        print("[RAG Node] Execution complete.")
+        answer = await generate_answer(config, system_prompt, rewritten_query, context_chunks, history)
+        log.debug("Answer generated", node="rag", preview=answer[:100])
+        if ANSWER_CACHE_ENABLED and top:
+            answer_cache.store(query_embedding, answer, content_version, conversation)
         return {"answer": answer}
     except Exception as e:
-        print(f"[RAG Node] ERROR during execution: {e}")
+        log.exception("RAG node failed", node="rag")
         return {"answer": f"An error occurred while processing your RAG query: {e}"}
 
-def node_appointment(state: AgentState) -> Dict[str, Any]:
-    rewritten_query = state["rewritten_query"]
+async def appointment_reply(config: Optional[RunnableConfig], text: str, history: List[Dict[str, str]]) -> str:
+    """Returns a rendered template reply as is, or reworded by the LLM when APPOINTMENT_REPLY_PARAPHRASE is on."""
+    if APPOINTMENT_REPLY_PARAPHRASE:
+        return await generate_answer(config, APPOINTMENT_SYSTEM_PROMPT, text, [], history)
+    reply_renderer.count_avoided()
+    return text
+
+async def suggest_alternatives(role: str, proposed_time: datetime, duration_minutes: int) -> str:
+    alternatives = await asyncio.to_thread(next_free_slots, role, proposed_time, duration_minutes, APPOINTMENT_SUGGESTIONS)
+    if alternatives:
+        return reply_renderer.render("suggest_slots", slots=reply_renderer.slots(alternatives))
+    return reply_renderer.render("try_another_time")
+
+async def node_appointment(state: AgentState, config: RunnableConfig = None) -> Dict[str, Any]:
     history = state["conversation_history"]
-    extracted_details = state.get("extracted_appointment_details", {})
+    extracted_details = state.get("extracted_appointment_details") or {}
 
     answer = ""
 
-    print(f"[Appointment Node] Received extracted details: {extracted_details}")
+    log.debug("Appointment request", node="appointment", details=extracted_details)
 
     action = extracted_details.get("action")
     appointment_type = extracted_details.get("appointment_type")
     customer_name = extracted_details.get("customer_name", "Guest")
     time_preference_str = extracted_details.get("time_preference")
-    duration_minutes = extracted_details.get("duration_minutes", 30)
+    duration_minutes = int(extracted_details.get("duration_minutes") or 30) # Extraction returns null when unspecified
     agent_name_pref = extracted_details.get("agent_name")
 
     if action == "check_availability":
-        print("[Appointment Node] Action: Check Availability.")
-        rows = get_upcoming_appointments(limit=5)
+        log.debug("Checking upcoming appointments", node="appointment")
+        rows = await aget_upcoming_appointments(limit=5)
         if not rows:
-            answer = "No upcoming appointments are scheduled."
+            answer = reply_renderer.render("no_upcoming")
         else:
-            lines = [f"{r[1]} at {r[0]}" for r in rows]
-            answer = "Upcoming appointments:\n" + "\n".join(lines)
-        print(f"[Appointment] Answer: {answer[:100]}...")
+            lines = [reply_renderer.render("upcoming_line", agent=r[1], when=reply_renderer.format_datetime(datetime.fromisoformat(r[0])))
+                     for r in rows]
+            answer = reply_renderer.render("upcoming", lines="\n".join(lines))
+        log.debug("Answer generated", node="appointment", preview=answer[:100])
         return {"answer": answer}
 
     elif action == "book":
-        print("[Appointment Node] Action: Book Appointment.")
-
-        ADDITIONAL_APPOINTMENT_CONDITION = f"""To book an appointment, below are the necessary details,
-
-            - appointment type - SALES or SERVICE
-            - customer name
-            - time preference
-
-        Input details are given below. If any of the above details are not present, ask and get it from the user.
-
-        **Input details:**
-            - appointment_type: {appointment_type}
-            - customer_name: {customer_name}
-            - time_preference_str: {time_preference_str}
-        """
 
-        if not appointment_type or not time_preference_str or not customer_name:
-            answer = llm_helper.chat_with_context(
-                APPOINTMENT_SYSTEM_PROMPT,
-                ADDITIONAL_APPOINTMENT_CONDITION,
-                [], history
-            )
-            print("[Appointment Node] Missing appointment type.")
+        missing = [field for field, value in (("appointment_type", appointment_type), ("customer_name", customer_name),
+                                              ("time_preference", time_preference_str)) if not value]
+        if missing:
+            text = reply_renderer.render("missing_details", missing=reply_renderer.join([reply_renderer.term(field) for field in missing]))
+            answer = await appointment_reply(config, text, history)
+            log.info("Booking needs more details", node="appointment", missing=missing)
             return {"answer": answer}
 
         proposed_time = parse_time_preference(time_preference_str)
         if not proposed_time:
-            answer = llm_helper.chat_with_context(
-                APPOINTMENT_SYSTEM_PROMPT,
-                f"I couldn't understand the date and time you mentioned. Could you please specify it clearly, for example, 'tomorrow at 2 PM' or 'next Monday at 10 AM'?",
-                [], history
-            )
-            print("[Appointment Node] Failed to parse time preference.")
+            answer = await appointment_reply(config, reply_renderer.render("unparseable_time"), history)
+            log.info("Unparseable time preference", node="appointment", time_preference=time_preference_str)
             return {"answer": answer}
 
-        available_agents = find_available_agents(appointment_type, proposed_time, duration_minutes)
+        if duration_minutes > APPOINTMENT_MAX_DURATION_MINUTES:
+            text = reply_renderer.render("duration_too_long", max_hours=APPOINTMENT_MAX_DURATION_MINUTES // 60)
+            answer = await appointment_reply(config, text, history)
+            return {"answer": answer}
+
+        available_agents = await asyncio.to_thread(find_available_agents, appointment_type, proposed_time, duration_minutes)
+        when = reply_renderer.format_datetime(proposed_time)
 
         selected_agent_id = None
         selected_agent_name = None
@@ -206,83 +259,78 @@ def node_appointment(state: AgentState) -> Dict[str, Any]:
                     selected_agent_name = agent_name
                     break
             if not selected_agent_id:
-                answer = llm_helper.chat_with_context(
-                    APPOINTMENT_SYSTEM_PROMPT,
-                    f"I'm sorry, {agent_name_pref} is not available at {proposed_time.strftime('%I:%M %p')} on {proposed_time.strftime('%A, %B %d')}. There are no other agents available at that time either. Please try a different time.",
-                    [], history
-                )
-                print(f"[Appointment Node] Preferred agent not available, no other agents.")
+                text = reply_renderer.render("agent_unavailable", agent=agent_name_pref, when=when)
+                if available_agents:
+                    key = "others_available_one" if len(available_agents) == 1 else "others_available_many"
+                    text += " " + reply_renderer.render(key, agents=reply_renderer.join([agent_name for _, agent_name in available_agents]))
+                else:
+                    text += " " + await suggest_alternatives(appointment_type, proposed_time, duration_minutes)
+                answer = await appointment_reply(config, text, history)
+                log.info("Preferred agent unavailable", node="appointment", agent=agent_name_pref, start=proposed_time)
                 return {"answer": answer}
         elif available_agents:
             selected_agent_id, selected_agent_name = available_agents[0]
         else:
-            answer = llm_helper.chat_with_context(
-                APPOINTMENT_SYSTEM_PROMPT,
-                f"I'm sorry, I couldn't find any {appointment_type} agents available at {proposed_time.strftime('%I:%M %p')} on {proposed_time.strftime('%A, %B %d')}. Would you like to try a different time or day?",
-                [], history
-            )
-            print(f"[Appointment Node] No agents available for {appointment_type} at {proposed_time}.")
+            text = reply_renderer.render("no_agents", appointment_type=reply_renderer.term(appointment_type), when=when)
+            text += " " + await suggest_alternatives(appointment_type, proposed_time, duration_minutes)
+            answer = await appointment_reply(config, text, history)
+            log.info("No agents available", node="appointment", role=appointment_type, start=proposed_time)
             return {"answer": answer}
 
         try:
-            create_appointment(selected_agent_id, customer_name, proposed_time.isoformat(), duration_minutes, appointment_type)
-            answer = f"Great! Your {appointment_type} appointment with {selected_agent_name} on {proposed_time.strftime('%A, %B %d at %I:%M %p')} has been successfully booked for {customer_name}. We look forward to seeing you!"
-            print(f"[Appointment Node] Appointment booked: {selected_agent_name} at {proposed_time}.")
-        except Exception as e:
-            answer = llm_helper.chat_with_context(
-                APPOINTMENT_SYSTEM_PROMPT,
-                f"I encountered an error while trying to book your appointment: {e}. Please try again.",
-                [], history
-            )
-            print(f"[Appointment Node] Error during booking: {e}")
-
-        print(f"[Appointment] Answer: {answer[:100]}...")
+            # Check and insert happen atomically; if the chosen agent was taken since the lookup
+            # above, this books the next free agent instead.
+            booked = await abook_first_free(appointment_type, proposed_time, duration_minutes, customer_name,
+                                            appointment_type, preferred_agent_ids=[selected_agent_id])
+        except Exception:
+            answer = await appointment_reply(config, reply_renderer.render("booking_error"), history)
+            log.exception("Booking failed", node="appointment", role=appointment_type, start=proposed_time)
+            return {"answer": answer}
+
+        if booked is None:
+            text = reply_renderer.render("slot_taken", when=when)
+            text += " " + await suggest_alternatives(appointment_type, proposed_time, duration_minutes)
+            answer = await appointment_reply(config, text, history)
+            log.info("Slot taken before booking completed", node="appointment", role=appointment_type, start=proposed_time)
+            return {"answer": answer}
+
+        booked_agent_id, booked_agent_name = booked
+        answer = reply_renderer.render("booked", appointment_type=reply_renderer.term(appointment_type),
+                                       agent=booked_agent_name, when=when, customer_name=customer_name)
+        if booked_agent_id != selected_agent_id:
+            answer = reply_renderer.render("booked_fallback", preferred=selected_agent_name, agent=booked_agent_name) + " " + answer
+        log.info("Appointment booked", node="appointment", agent=booked_agent_name, start=proposed_time, fallback=booked_agent_id != selected_agent_id)
+        log.debug("Answer generated", node="appointment", preview=answer[:100])
         return {"answer": answer}
 
     else: # If intent was APPOINTMENT but no action or details were extracted
-        print("[Appointment Node] No clear action or details extracted for appointment.")
-        answer = llm_helper.chat_with_context(
-            APPOINTMENT_SYSTEM_PROMPT,
-            f"Sure, I can help you with appointments. Please tell me your name and what type of appointment you're looking for (sales or service), and what date and time works best for you.",
-            [], history
-        )
-        print(f"[Appointment] Answer: {answer[:100]}...")
+        log.debug("No booking action extracted", node="appointment")
+        answer = await appointment_reply(config, reply_renderer.render("appointment_help"), history)
+        log.debug("Answer generated", node="appointment", preview=answer[:100])
         return {"answer": answer}
 
-
-def node_chitchat(state: AgentState) -> Dict[str, Any]:
-    print("[ChitChat Node] Starting execution.")
+async def node_chitchat(state: AgentState, config: RunnableConfig = None) -> Dict[str, Any]:
     rewritten_query = state["rewritten_query"]
     history = state["conversation_history"]
     system_prompt = CHITCHAT_SYSTEM_PROMPT
-    answer = llm_helper.chat_with_context(system_prompt, rewritten_query, [], history)
-    print(f"[ChitChat] Answer: {answer[:100]}...")
-    print("[ChitChat Node] Execution complete.")
+    answer = await generate_answer(config, system_prompt, rewritten_query, [], history)
+    log.debug("Answer generated", node="chitchat", preview=answer[:100])
     return {"answer": answer}
 
-def node_update_history(state: AgentState) -> Dict[str, Any]:
-    print("[Update History Node] Starting execution.")
+async def node_update_history(state: AgentState) -> Dict[str, Any]:
     session_id = state["session_id"]
     user_query = state["user_query"]
     answer = state["answer"]
 
     try:
-        print(f"[Update History Node] Attempting to append user message: {user_query[:50]}...")
-        append_history(session_id, "user", user_query)
-        print("[Update History Node] User message appended successfully.")
-
-        print(f"[Update History Node] Attempting to append assistant message: {answer[:50]}...")
-        append_history(session_id, "assistant", answer)
-        print("[Update History Node] Assistant message appended successfully.")
+        await history_cache.append(session_id, [("user", user_query), ("assistant", answer)])
 
-        print("[Update History Node] Attempting to reload conversation history...")
-        updated_history = load_history(session_id, last_n=12)
-        print(f"[Update History Node] History reloaded. Length: {len(updated_history)}")
+        updated_history = await history_cache.load(session_id, last_n=12)
+        log.debug("History updated", node="update_history", session_id=session_id, messages=len(updated_history))
 
-        print("[Update History Node] All operations successful. About to return.")
         return {"conversation_history": updated_history}
 
     except Exception as e:
-        print(f"[Update History Node] CRITICAL ERROR during execution: {e}")
+        log.exception("History update failed", node="update_history", session_id=session_id)
         return {"conversation_history": state["conversation_history"], "error_in_history_update": str(e)}
 
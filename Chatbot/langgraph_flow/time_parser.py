@@ -0,0 +1,258 @@
+# langgraph_flow/time_parser.py
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from dateutil import parser as dateutil_parser
+
+from config import DEALERSHIP_TIMEZONE, TIME_PARSER_CACHE_SIZE
+
+# Appointment times are dealership wall-clock times; "now" is taken in this zone unless
+# the caller passes its own timezone-aware now.
+DEALERSHIP_TZ = ZoneInfo(DEALERSHIP_TIMEZONE)
+
+_DEFAULT_TIME = time(9, 0) # A date without a time means the start of the business day
+_PART_OF_DAY = {"morning": time(9, 0), "afternoon": time(14, 0), "evening": time(17, 0),
+                "night": time(18, 0), "tonight": time(18, 0)}
+_WEEKDAYS = {"mon": 0, "monday": 0, "tue": 1, "tues": 1, "tuesday": 1, "wed": 2, "wednesday": 2,
+             "thu": 3, "thur": 3, "thurs": 3, "thursday": 3, "fri": 4, "friday": 4,
+             "sat": 5, "saturday": 5, "sun": 6, "sunday": 6}
+_MONTHS = {name: i + 1 for i, names in enumerate((
+    ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"), ("may",), ("jun", "june"),
+    ("jul", "july"), ("aug", "august"), ("sep", "sept", "september"), ("oct", "october"),
+    ("nov", "november"), ("dec", "december"))) for name in names}
+_NUMBER_WORDS = {"forty five": 45, "forty-five": 45, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+                 "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "fifteen": 15, "twenty": 20,
+                 "thirty": 30}
+
+_WEEKDAY = "|".join(sorted(_WEEKDAYS, key=len, reverse=True))
+_MONTH = "|".join(sorted(_MONTHS, key=len, reverse=True))
+_ORD = r"(?:st|nd|rd|th)?"
+
+# --- Grammar: compiled once, tried in order; each matched span is blanked out so the
+# time rules only see what the date rules left over ---
+_ISO = re.compile(r"^\d{4}-\d{2}-\d{2}([t ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?(?:z|[+-]\d{2}:?\d{2})?$")
+_OFFSET = re.compile(r"\bin\s+(an?|half an|\d+(?:\.5)?)\s+(minutes?|mins?|hours?|hrs?|days?|weeks?)\b")
+_RELATIVE_DAY = re.compile(r"\b(day after tomorrow|tomorrow|tmrw|tmr|today|tonight|next week)\b")
+_WEEKDAY_RE = re.compile(rf"\b(?:(this|next|coming|on)\s+)?({_WEEKDAY})\b")
+_MONTH_DAY = re.compile(rf"\b({_MONTH})\.?\s+(\d{{1,2}}){_ORD}(?:,?\s+(\d{{4}}))?\b")
+_DAY_MONTH = re.compile(rf"\b(?:the\s+)?(\d{{1,2}}){_ORD}\s+(?:of\s+)?({_MONTH})\b(?:,?\s+(\d{{4}}))?")
+_NUMERIC_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b|\b(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b")
+_DAY_OF_MONTH = re.compile(r"\b(?:on\s+)?(?:the\s+)?(\d{1,2})(?:st|nd|rd|th)\b")
+
+_NOON = re.compile(r"\b(noon|midday|midnight)\b")
+_PAST_TO = re.compile(r"\b(half past|quarter past|quarter to)\s+(\d{1,2})(?:\s*(am|pm))?\b")
+_CLOCK = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)\b|\b(\d{1,2})[:.](\d{2})\b")
+_AT_HOUR = re.compile(r"\b(?:at|@|around|about|by)\s+(\d{1,2})(?:\s*o'?clock)?\b|\b(\d{1,2})\s*o'?clock\b")
+_PART_OF_DAY_RE = re.compile(r"\b(morning|afternoon|evening|tonight|night)\b")
+_BARE_HOUR = re.compile(r"^\D*?\b(\d{1,2})\b\D*$")
+
+
+class _Spec(NamedTuple):
+    """What a phrase says, independent of when it is parsed."""
+    offset: Optional[timedelta] = None # "in 2 hours": relative to now, nothing else applies
+    date_kind: Optional[str] = None # days | weekday | month_day | day_of_month
+    date_args: Tuple = ()
+    clock: Optional[time] = None
+
+
+@lru_cache(maxsize=TIME_PARSER_CACHE_SIZE)
+def _normalize(text: str) -> str:
+    text = text.lower().strip()
+    text = re.sub(r"\b([ap])\.\s?m\.?", r"\1m", text) # p.m. -> pm
+    for word, number in _NUMBER_WORDS.items():
+        if word in text:
+            text = re.sub(rf"\b{word}\b", str(number), text)
+    return re.sub(r"[,!?;]+|\s+", " ", text).strip()
+
+def _hour(hour: int, minute: int, meridiem: Optional[str], part_of_day: Optional[str]) -> Optional[time]:
+    """Resolves a clock reading. Without am/pm, the part of day decides; otherwise
+    1-7 are taken as afternoon hours (nobody books a 3 AM appointment)."""
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    elif hour <= 12:
+        if part_of_day in ("afternoon", "evening", "night", "tonight") and hour < 12:
+            hour += 12
+        elif part_of_day is None and 1 <= hour <= 7:
+            hour += 12
+    if hour > 23 or minute > 59:
+        return None
+    return time(hour, minute)
+
+def _blank(text: str, match: re.Match) -> str:
+    return text[:match.start()] + " " * (match.end() - match.start()) + text[match.end():]
+
+def _match_date(text: str) -> Tuple[Optional[str], Tuple, str]:
+    match = _RELATIVE_DAY.search(text)
+    if match:
+        days = {"day after tomorrow": 2, "tomorrow": 1, "tmrw": 1, "tmr": 1, "next week": 7}.get(match.group(1), 0)
+        return "days", (days,), _blank(text, match)
+    match = _WEEKDAY_RE.search(text)
+    if match:
+        return "weekday", (_WEEKDAYS[match.group(2)], match.group(1) == "next"), _blank(text, match)
+    match = _MONTH_DAY.search(text)
+    if match:
+        return "month_day", (_MONTHS[match.group(1)], int(match.group(2)), int(match.group(3) or 0)), _blank(text, match)
+    match = _DAY_MONTH.search(text)
+    if match:
+        return "month_day", (_MONTHS[match.group(2)], int(match.group(1)), int(match.group(3) or 0)), _blank(text, match)
+    match = _NUMERIC_DATE.search(text)
+    if match:
+        if match.group(1):
+            year, month, day = int(match.group(1)), int(match.group(2)), int(match.group(3))
+        else:
+            month, day, year = int(match.group(4)), int(match.group(5)), int(match.group(6) or 0)
+            year += 2000 if 0 < year < 100 else 0
+        return "month_day", (month, day, year), _blank(text, match)
+    match = _DAY_OF_MONTH.search(text)
+    if match:
+        return "day_of_month", (int(match.group(1)),), _blank(text, match)
+    return None, (), text
+
+def _match_time(text: str, date_matched: bool) -> Tuple[Optional[time], bool]:
+    """(clock time, whether the text was understood); (None, True) when no time was given."""
+    match = _PART_OF_DAY_RE.search(text)
+    part_of_day = match.group(1) if match else None
+    match = _NOON.search(text)
+    if match:
+        return (time(0, 0) if match.group(1) == "midnight" else time(12, 0)), True
+    match = _PAST_TO.search(text)
+    if match:
+        hour = int(match.group(2))
+        minute = {"half past": 30, "quarter past": 15, "quarter to": 45}[match.group(1)]
+        hour = hour - 1 if match.group(1) == "quarter to" else hour
+        return _hour(hour % 12 or 12, minute, match.group(3), part_of_day), True
+    match = _CLOCK.search(text)
+    if match:
+        if match.group(1):
+            clock = _hour(int(match.group(1)), int(match.group(2) or 0), match.group(3), part_of_day)
+        else:
+            clock = _hour(int(match.group(4)), int(match.group(5)), None, part_of_day)
+        return clock, clock is not None
+    # A lone number is an hour only next to a date or a part of day ("3 in the afternoon")
+    match = _AT_HOUR.search(text) or (_BARE_HOUR.search(text) if date_matched or part_of_day else None)
+    if match:
+        clock = _hour(int(next(group for group in match.groups() if group)), 0, None, part_of_day)
+        return clock, clock is not None
+    if part_of_day:
+        return _PART_OF_DAY[part_of_day], True
+    return None, True
+
+@lru_cache(maxsize=TIME_PARSER_CACHE_SIZE)
+def _spec(text: str) -> Optional[_Spec]:
+    """Runs the grammar over a normalized phrase; None when no rule matched (-> fallback)."""
+    match = _OFFSET.search(text)
+    if match:
+        amount = {"a": 1, "an": 1, "half an": 0.5}.get(match.group(1)) or float(match.group(1))
+        unit = match.group(2)[0]
+        if unit in ("m", "h"):
+            return _Spec(offset=timedelta(minutes=amount) if unit == "m" else timedelta(hours=amount))
+        rest = _blank(text, match)
+        clock, ok = _match_time(rest, True)
+        days = int(amount * (7 if unit == "w" else 1))
+        return _Spec(date_kind="days", date_args=(days,), clock=clock) if ok else None
+
+    date_kind, date_args, rest = _match_date(text)
+    clock, ok = _match_time(rest, date_kind is not None)
+    if not ok or (date_kind is None and clock is None):
+        return None
+    if "tonight" in text and clock is None:
+        clock = _PART_OF_DAY["tonight"]
+    return _Spec(date_kind=date_kind, date_args=date_args, clock=clock)
+
+def _resolve_date(spec: _Spec, today: date) -> Tuple[Optional[date], int]:
+    """The date a spec refers to, seen from `today`, and how many days to roll forward
+    if the resulting time has already passed (time-only phrases, "friday" said on a Friday)."""
+    kind, args = spec.date_kind, spec.date_args
+    if kind is None:
+        return today, 1
+    if kind == "days":
+        return today + timedelta(days=args[0]), 0
+    if kind == "weekday":
+        weekday, is_next = args
+        ahead = (weekday - today.weekday()) % 7
+        if ahead == 0:
+            return (today + timedelta(days=7), 0) if is_next else (today, 7)
+        return today + timedelta(days=ahead), 0
+    if kind == "month_day":
+        month, day, year = args
+        for candidate_year in ([year] if year else [today.year, today.year + 1]):
+            try:
+                resolved = date(candidate_year, month, day)
+            except ValueError:
+                return None, 0
+            if year or resolved >= today:
+                return resolved, 0
+        return None, 0
+    if kind == "day_of_month":
+        year, month = today.year, today.month
+        for _ in range(13): # The next month that has this day
+            try:
+                resolved = date(year, month, args[0])
+                if resolved >= today:
+                    return resolved, 0
+            except ValueError:
+                pass
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return None, 0
+    return None, 0
+
+@lru_cache(maxsize=TIME_PARSER_CACHE_SIZE)
+def _candidate(text: str, today: date) -> Optional[Tuple[datetime, int]]:
+    """Memoized per (phrase, day): the wall-clock datetime a phrase means on `today`,
+    plus the roll-forward days to apply if it is already in the past."""
+    spec = _spec(text)
+    if spec is None:
+        try: # Fuzzy dateutil parsing only for phrases the grammar doesn't cover
+            parsed, _ = dateutil_parser.parse(text, fuzzy_with_tokens=True, default=datetime.combine(today, time()))
+        except (ValueError, OverflowError):
+            return None
+        parsed = parsed.replace(tzinfo=None, second=0, microsecond=0)
+        return parsed, 1 if parsed.date() == today else 0
+    resolved, roll_days = _resolve_date(spec, today)
+    if resolved is None:
+        return None
+    return datetime.combine(resolved, spec.clock or _DEFAULT_TIME), roll_days
+
+def parse_time_preference(text: Optional[str], now: Optional[datetime] = None) -> Optional[datetime]:
+    """Parses a booking time expression ("next tuesday at 3", "tomorrow morning",
+    "the 15th at 10:30", "in 2 hours", ISO timestamps) relative to `now`, a
+    timezone-aware datetime (default: now in DEALERSHIP_TIMEZONE). Returns an aware
+    datetime in now's timezone, or None if the phrase isn't a time or names one that
+    has already passed (an explicit past date, "today at 9" said at 10)."""
+    if not text or not text.strip():
+        return None
+    now = now or datetime.now(DEALERSHIP_TZ)
+    result = _parse(_normalize(text), now)
+    if result is None or result < now.replace(second=0, microsecond=0):
+        return None
+    return result
+
+def _parse(normalized: str, now: datetime) -> Optional[datetime]:
+    iso = _ISO.match(normalized)
+    if iso:
+        try: # The pattern admits impossible dates such as 2026-02-30
+            if not iso.group(1): # Date only: the start of the business day, like other date-only phrases
+                return datetime.combine(date.fromisoformat(normalized[:10]), _DEFAULT_TIME, tzinfo=now.tzinfo)
+            parsed = datetime.fromisoformat(normalized.upper().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return (parsed.astimezone(now.tzinfo) if parsed.tzinfo else parsed.replace(tzinfo=now.tzinfo)).replace(second=0, microsecond=0)
+
+    spec = _spec(normalized)
+    if spec is not None and spec.offset is not None:
+        return (now + spec.offset).replace(second=0, microsecond=0)
+    candidate = _candidate(normalized, now.date())
+    if candidate is None:
+        return None
+    result, roll_days = candidate
+    if roll_days and result <= now.replace(tzinfo=None):
+        result += timedelta(days=roll_days)
+    return result.replace(tzinfo=now.tzinfo)
+
+def cache_info():
+    return {name: fn.cache_info()._asdict() for name, fn in (("normalize", _normalize), ("spec", _spec), ("candidate", _candidate))}
@@ -0,0 +1,120 @@
+# llm/fast_intent.py
+import re
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from config import FAST_INTENT_THRESHOLD
+
+# Weighted rules per intent. A rule matching contributes its weight to that intent's score;
+# confidence is the winning score relative to the runner-up (see FastIntentClassifier.score).
+_RULES = {
+    "CHAT": [
+        # The whole message is a greeting / thanks / goodbye
+        (r"^(hi|hello|hey|hiya|howdy|yo|good (morning|afternoon|evening))( there)?( chevy connect)?[\s!.,]*$", 4.0),
+        (r"^(thanks|thank you|thank you so much|thanks a lot|thx|cheers|great,? thanks)[\s!.,]*$", 4.0),
+        (r"^(bye|goodbye|see you|see ya|have a (good|great|nice) day)[\s!.,]*$", 4.0),
+        (r"^(ok|okay|cool|great|awesome|perfect|got it|sounds good)[\s!.,]*$", 3.0),
+        (r"\bhow are you\b|\bwho are you\b|\bwhat('?s| is) your name\b", 3.0),
+        (r"\b(tell me a joke|you('re| are) (funny|great|helpful))\b", 2.0),
+        (r"^(hi|hello|hey)\b", 0.5),
+    ],
+    "APPOINTMENT": [
+        (r"\b(book|schedule|reserve|set up|make|arrange)\b.{0,40}\b(appointment|test[- ]drive|service|visit|slot|meeting|oil change|repair|inspection|maintenance)\b", 4.0),
+        (r"\b(reschedule|cancel) (my |an |the )?appointment\b", 4.0),
+        (r"\b(availability|available (slots?|times?)|openings?|free slots?)\b", 3.0),
+        (r"\bappointments?\b", 2.0),
+        (r"\btest[- ]drive\b", 1.5),
+    ],
+    "RAG": [
+        (r"\b(specials?|lease|leasing|financ\w*|apr|incentives?|rebates?|deals?|offers?|promotions?|discounts?)\b", 3.0),
+        (r"\b(inventory|in stock|models?|trims?|msrp|price|pricing|cost|how much)\b", 2.5),
+        (r"\b(hours|open|close|closing|located|location|address|directions|phone number|contact)\b", 2.5),
+        (r"\b(ev|evs|electric|bolt|equinox|silverado|tahoe|malibu|blazer|trax|colorado|corvette|suburban)\b", 2.0),
+        (r"\b(warranty|trade[- ]in|certified|pre-owned|used cars?|new cars?|fleet|parts|oil change|tires?)\b", 2.0),
+        (r"^(what|which|do|does|is|are|can|how)\b.*\?$", 0.5),
+    ],
+}
+
+# Details the regex path cannot extract reliably. When any is present on an APPOINTMENT
+# query, the LLM classifier must run so the name / time / agent are not lost.
+_APPOINTMENT_TIME_HINTS = re.compile(
+    r"\d|\b(today|tonight|tomorrow|morning|afternoon|evening|noon|next|this|week|weekend|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|am|pm|o'?clock|my name|name is)\b",
+    re.IGNORECASE,
+)
+# Case-sensitive on purpose: "for John" / "with Mike" name a person, "for service" does not.
+_APPOINTMENT_NAME_HINTS = re.compile(r"\b(for|with|this is|I am|I'm) [A-Z][a-z]+")
+_APPOINTMENT_CHECK = re.compile(r"\b(availability|available|openings?|free slots?|upcoming)\b", re.IGNORECASE)
+_APPOINTMENT_SALES = re.compile(r"\b(sales|test[- ]drive|buy|purchase|salesperson)\b", re.IGNORECASE)
+_APPOINTMENT_SERVICE = re.compile(r"\b(service|repair|maintenance|oil change|tires?|inspection|recall)\b", re.IGNORECASE)
+
+_COMPILED_RULES = {
+    intent: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in rules]
+    for intent, rules in _RULES.items()
+}
+
+# Pseudo-score for "none of the above", so a single weak match never reaches high confidence.
+_PRIOR = 0.5
+
+
+class FastIntentClassifier:
+    """In-process first-stage intent classifier in front of the LLM classifier.
+
+    Compiled keyword/regex rules decide the clear-cut RAG / APPOINTMENT / CHAT cases in
+    well under a millisecond; anything below the confidence threshold is left to the LLM.
+    """
+
+    def __init__(self, threshold: float = FAST_INTENT_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "fallbacks": 0}
+
+    def score(self, query: str) -> Tuple[str, float]:
+        """Returns (best intent, confidence in [0, 1]) without applying the threshold."""
+        text = query.strip()
+        scores = {
+            intent: sum(weight for pattern, weight in rules if pattern.search(text))
+            for intent, rules in _COMPILED_RULES.items()
+        }
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        (best_intent, best), (_, runner_up) = ranked[0], ranked[1]
+        confidence = best / (best + runner_up + _PRIOR)
+
+        if best_intent == "APPOINTMENT" and (_APPOINTMENT_TIME_HINTS.search(text) or _APPOINTMENT_NAME_HINTS.search(text)):
+            # The LLM has to extract name / time / agent; never short-circuit these.
+            confidence = min(confidence, self.threshold / 2)
+        return best_intent, confidence
+
+    def classify(self, query: str) -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Returns (intent, appointment details) when confident, otherwise None."""
+        intent, confidence = self.score(query)
+        with self._lock:
+            if confidence < self.threshold:
+                self.stats["fallbacks"] += 1
+                return None
+            self.stats["hits"] += 1
+
+        details = None
+        if intent == "APPOINTMENT":
+            appointment_type = None
+            if _APPOINTMENT_SERVICE.search(query):
+                appointment_type = "service"
+            elif _APPOINTMENT_SALES.search(query):
+                appointment_type = "sales"
+            details = {
+                "action": "check_availability" if _APPOINTMENT_CHECK.search(query) else "book",
+                "appointment_type": appointment_type,
+                "customer_name": None,
+                "time_preference": None,
+                "duration_minutes": None,
+                "agent_name": None,
+            }
+        return intent, details
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["fallbacks"]
+        return self.stats["hits"] / total if total else 0.0
+
+
+# Instantiate globally, like llm_helper
+fast_intent_classifier = FastIntentClassifier()
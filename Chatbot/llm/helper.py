@@ -1,40 +1,60 @@
 # llm/helper.py
-from typing import List, Dict
-from openai import OpenAI
+import json
+from typing import Any, AsyncIterator, List, Dict
 
 # Import constants from config
-from config import OPENAI_API_KEY, CHAT_MODEL, EMBED_MODEL
+from config import CHAT_MODEL, EMBED_MODEL
+from llm.openai_client import openai_provider
+from observability.log import get_logger
+
+log = get_logger("llm")
+
+# Earlier turns sent along with each answer generation (the RAG answer cache keys on them too)
+ANSWER_HISTORY_TURNS = 2
 
 class LLMHelper:
     def __init__(self):
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        # Async, pooled, retried calls (llm/openai_client.py): a slow completion only
+        # suspends its own request, not the whole event loop.
+        self.provider = openai_provider
         self.chat_model = CHAT_MODEL
         self.embed_model_name = EMBED_MODEL
 
-        print(f"API Service: Using OpenAI chat model: {self.chat_model}")
-        print(f"API Service: Using OpenAI embedding model: {self.embed_model_name}")
+        log.info("OpenAI models", chat_model=self.chat_model, embed_model=self.embed_model_name)
 
-    def embed_text(self, text: str) -> List[float]:
+    async def embed_text(self, text: str) -> List[float]:
         try:
-            res = self.client.embeddings.create(model=self.embed_model_name, input=text)
+            res = await self.provider.embeddings(model=self.embed_model_name, input=text)
             return res.data[0].embedding
         except Exception as e:
-            print(f"API Service: Error generating OpenAI embedding: {e}")
+            log.error("Embedding failed", error=str(e))
             raise
 
-    def chat_with_context(self, system_prompt: str, user_query: str, context_chunks: List[str], history: List[Dict[str, str]] = None, temperature: float = 0.7) -> str:
+    def _context_messages(self, system_prompt: str, user_query: str, context_chunks: List[str], history: List[Dict[str, str]] = None) -> List[Dict[str, str]]:
         messages = [{"role": "system", "content": system_prompt}]
         if context_chunks:
             context_text = "\n\n".join(context_chunks)
             messages.append({"role": "system", "content": f"Context (use this to answer):\n{context_text}"})
         if history:
-            for h in history[-2:]:
+            for h in history[-ANSWER_HISTORY_TURNS:]:
                 messages.append({"role": h["role"], "content": h["content"]})
         messages.append({"role": "user", "content": user_query})
-        resp = self.client.chat.completions.create(model=self.chat_model, messages=messages, max_tokens=400, temperature=temperature)
+        return messages
+
+    async def chat_with_context(self, system_prompt: str, user_query: str, context_chunks: List[str], history: List[Dict[str, str]] = None, temperature: float = 0.7) -> str:
+        messages = self._context_messages(system_prompt, user_query, context_chunks, history)
+        resp = await self.provider.chat(model=self.chat_model, messages=messages, max_tokens=400, temperature=temperature)
         return resp.choices[0].message.content.strip()
 
-    def rephrase_query(self, user_query: str, history: List[Dict[str, str]]) -> str:
+    async def stream_chat_with_context(self, system_prompt: str, user_query: str, context_chunks: List[str], history: List[Dict[str, str]] = None, temperature: float = 0.7) -> AsyncIterator[str]:
+        """Same prompt as chat_with_context, but yields the answer token by token (stream=True)."""
+        messages = self._context_messages(system_prompt, user_query, context_chunks, history)
+        stream = self.provider.chat_stream(model=self.chat_model, messages=messages, max_tokens=400, temperature=temperature)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def rephrase_query(self, user_query: str, history: List[Dict[str, str]]) -> str:
         # Import prompt from prompts.py
         from llm.prompts import REPHRASE_QUERY_PROMPT
 
@@ -42,8 +62,66 @@ class LLMHelper:
         for msg in history[-6:]:
             messages.append({"role": msg["role"], "content": msg["content"]})
         messages.append({"role": "user", "content": f"Rewrite this into a standalone question: {user_query}"})
-        resp = self.client.chat.completions.create(model=self.chat_model, messages=messages, max_tokens=150)
+        resp = await self.provider.chat(kind="rewrite", model=self.chat_model, messages=messages, max_tokens=150)
         return resp.choices[0].message.content.strip()
 
+    async def route_and_rewrite(self, user_query: str, history: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Rewrites, classifies and extracts appointment details in one structured-output call.
+
+        Returns {"rewritten_query": str, "intent": str, "appointment": dict | None}. With no
+        history there is nothing to resolve, so the rewrite is skipped and the query is
+        returned as-is.
+        """
+        from llm.prompts import ROUTE_REWRITE_PROMPT
+
+        rewrite = bool(history)
+        nullable_string = {"type": ["string", "null"]}
+        appointment_schema = {
+            "type": ["object", "null"],
+            "properties": {
+                "action": {"type": ["string", "null"], "enum": ["book", "check_availability", None]},
+                "appointment_type": {"type": ["string", "null"], "enum": ["sales", "service", None]},
+                "customer_name": nullable_string,
+                "time_preference": nullable_string,
+                "duration_minutes": {"type": ["integer", "null"]},
+                "agent_name": nullable_string,
+            },
+            "required": ["action", "appointment_type", "customer_name", "time_preference", "duration_minutes", "agent_name"],
+            "additionalProperties": False,
+        }
+        properties = {
+            "intent": {"type": "string", "enum": ["RAG", "APPOINTMENT", "CHAT"]},
+            "appointment": appointment_schema,
+        }
+        if rewrite:
+            properties = {"rewritten_query": {"type": "string"}, **properties}
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "route_and_rewrite",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": properties,
+                    "required": list(properties),
+                    "additionalProperties": False,
+                },
+            },
+        }
+
+        messages = [{"role": "system", "content": ROUTE_REWRITE_PROMPT}]
+        for msg in history[-6:]:
+            messages.append({"role": msg["role"], "content": msg["content"]})
+        task = "Rewrite, classify and extract" if rewrite else "Classify and extract (no rewrite needed)"
+        messages.append({"role": "user", "content": f"{task}: {user_query}"})
+
+        resp = await self.provider.chat(
+            kind="route", model=self.chat_model, messages=messages, max_tokens=250, temperature=0, response_format=response_format
+        )
+        result = json.loads(resp.choices[0].message.content)
+        if not rewrite or not result.get("rewritten_query", "").strip():
+            result["rewritten_query"] = user_query
+        return result
+
 # Instantiate the LLMHelper globally for the API service
-llm_helper = LLMHelper()
\ No newline at end of file
+llm_helper = LLMHelper()
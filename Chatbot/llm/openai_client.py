@@ -0,0 +1,284 @@
+# llm/openai_client.py
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Awaitable, BinaryIO, Callable, Dict, Optional, TypeVar
+
+import httpx
+import openai
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from config import (
+    OPENAI_API_KEY, OPENAI_MAX_CONNECTIONS, OPENAI_MAX_KEEPALIVE_CONNECTIONS, OPENAI_KEEPALIVE_SECONDS,
+    OPENAI_CONNECT_TIMEOUT_SECONDS, OPENAI_CHAT_TIMEOUT_SECONDS, OPENAI_EMBED_TIMEOUT_SECONDS,
+    OPENAI_AUDIO_TIMEOUT_SECONDS, OPENAI_MAX_RETRIES, OPENAI_RETRY_BASE_SECONDS, OPENAI_RETRY_MAX_SECONDS,
+    OPENAI_HEDGE_ENABLED, OPENAI_HEDGE_PERCENTILE, OPENAI_HEDGE_DEFAULT_DELAY_SECONDS,
+    OPENAI_HEDGE_MIN_DELAY_SECONDS, OPENAI_HEDGE_MAX_RATIO
+)
+from observability.log import get_logger
+from observability.metrics import EXTERNAL_CALL_SECONDS, record_token_usage
+from observability.tracing import tracer, current_span, SPAN_KIND_CLIENT
+
+log = get_logger("openai")
+
+# Errors worth retrying: rate limits, timeouts, dropped connections and 5xx responses
+_RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+_LATENCY_SAMPLES = 200 # Recent requests per latency window behind the hedge deadline
+_MIN_LATENCY_SAMPLES = 20 # Below this, OPENAI_HEDGE_DEFAULT_DELAY_SECONDS is used
+
+T = TypeVar("T")
+
+
+def create_client() -> AsyncOpenAI:
+    """AsyncOpenAI on one keep-alive connection pool. The SDK's own retries are off;
+    OpenAIProvider retries with jittered backoff instead."""
+    default_timeout = httpx.Timeout(OPENAI_CHAT_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS)
+    http_client = DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS,
+                            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                            keepalive_expiry=OPENAI_KEEPALIVE_SECONDS),
+        timeout=default_timeout,
+    )
+    return AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=http_client, timeout=default_timeout, max_retries=0)
+
+
+def backoff_delay(attempt: int, error: Exception) -> float:
+    """Seconds to wait before retry `attempt` (0-based): the API's Retry-After when it sent
+    one, else exponential backoff with +-50% jitter, capped at OPENAI_RETRY_MAX_SECONDS."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return min(OPENAI_RETRY_MAX_SECONDS, max(0.0, float(response.headers.get("retry-after"))))
+        except (TypeError, ValueError):
+            pass
+    return min(OPENAI_RETRY_MAX_SECONDS, OPENAI_RETRY_BASE_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def _record_usage(usage) -> None:
+    """Counts token usage per intent and adds it to the current span (the graph node's)
+    and to the request's span."""
+    if usage is None:
+        return
+    record_token_usage(usage)
+    span = current_span.get()
+    if span.recording:
+        for key, tokens in (("llm.prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0),
+                            ("llm.completion_tokens", getattr(usage, "completion_tokens", 0) or 0)):
+            span.add(key, tokens)
+            if span.root is not span:
+                span.root.add(key, tokens)
+
+
+class _LatencyWindow:
+    def __init__(self, samples: int = _LATENCY_SAMPLES):
+        self._seconds = deque(maxlen=samples)
+
+    def add(self, seconds: float):
+        self._seconds.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if len(self._seconds) < _MIN_LATENCY_SAMPLES:
+            return None
+        ordered = sorted(self._seconds)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class OpenAIProvider:
+    """Every OpenAI call of the API service goes through here.
+
+    One AsyncOpenAI client (one HTTP connection pool) is shared by chat, embeddings, STT
+    and TTS, each operation with its own timeout. Rate limits, 5xx responses, timeouts
+    and dropped connections are retried with jittered exponential backoff.
+
+    Chat completions can be hedged (OPENAI_HEDGE_ENABLED): when a completion, or a
+    stream's first chunk, takes longer than the recent OPENAI_HEDGE_PERCENTILE latency of
+    the same kind of call (operation, caller-given kind such as "route" or "answer", and
+    model, so short JSON calls and long generations keep separate windows), an identical second request is sent and whichever answers first is used; the other
+    is cancelled. At most OPENAI_HEDGE_MAX_RATIO of recent requests are hedged, so a
+    provider-wide slowdown doesn't double the load.
+    """
+
+    def __init__(self, client: Optional[AsyncOpenAI] = None, max_retries: int = OPENAI_MAX_RETRIES,
+                 hedge_enabled: bool = OPENAI_HEDGE_ENABLED):
+        self.client = client or create_client()
+        self.max_retries = max_retries
+        self.hedge_enabled = hedge_enabled
+        self.timeouts = {
+            "chat": httpx.Timeout(OPENAI_CHAT_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+            "embeddings": httpx.Timeout(OPENAI_EMBED_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+            "audio": httpx.Timeout(OPENAI_AUDIO_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS),
+        }
+        self._latency: Dict[str, _LatencyWindow] = {}
+        self._hedged_recent = deque(maxlen=_LATENCY_SAMPLES) # One bool per recent hedgeable request
+        self._discards = set() # Cleanup of hedge losers, held so the tasks are not garbage-collected
+        self.stats = {"requests": 0, "errors": 0, "retries": 0, "hedges": 0, "hedge_wins": 0}
+
+    # --- Operations ---
+    async def chat(self, kind: str = "answer", **kwargs) -> Any:
+        """chat.completions.create(**kwargs), retried and hedged. `kind` names the call
+        (e.g. "route", "answer") so its latency is tracked apart from other chat calls."""
+        resp = await self._request(
+            "chat_completion", lambda: self.client.chat.completions.create(timeout=self.timeouts["chat"], **kwargs),
+            hedge=True, model=kwargs.get("model"), kind=kind
+        )
+        _record_usage(getattr(resp, "usage", None))
+        return resp
+
+    async def chat_stream(self, kind: str = "answer", **kwargs) -> AsyncIterator[Any]:
+        """Yields the chunks of chat.completions.create(stream=True, **kwargs). Retries and
+        hedging cover the wait for the first chunk; after that the stream is used as is.
+        The final chunk carries the token usage (and no choices)."""
+        kwargs.setdefault("stream_options", {"include_usage": True})
+
+        async def open_stream():
+            stream = await self.client.chat.completions.create(stream=True, timeout=self.timeouts["chat"], **kwargs)
+            try:
+                first = await anext(stream, None)
+            except BaseException:
+                await stream.close()
+                raise
+            return stream, first
+
+        stream, first = await self._request("chat_completion_stream", open_stream, hedge=True,
+                                            discard=lambda opened: opened[0].close(), model=kwargs.get("model"), kind=kind)
+        try:
+            if first is not None:
+                yield first
+            async for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    _record_usage(chunk.usage)
+                yield chunk
+        finally:
+            await stream.close()
+
+    async def embeddings(self, **kwargs) -> Any:
+        """embeddings.create(**kwargs), retried."""
+        return await self._request(
+            "embeddings", lambda: self.client.embeddings.create(timeout=self.timeouts["embeddings"], **kwargs),
+            model=kwargs.get("model")
+        )
+
+    async def transcribe(self, model: str, audio: BinaryIO, filename: str) -> Any:
+        """audio.transcriptions.create for a file object, rewound before each retry."""
+        start = audio.tell()
+
+        async def call():
+            audio.seek(start)
+            return await self.client.audio.transcriptions.create(model=model, file=(filename, audio),
+                                                                 timeout=self.timeouts["audio"])
+        return await self._request("stt", call, model=model)
+
+    async def speech_stream(self, **kwargs) -> AsyncIterator[bytes]:
+        """Streams audio.speech.create(**kwargs) in network-sized chunks. Opening the
+        response is retried; once audio flows, errors go to the caller."""
+        async with AsyncExitStack() as stack:
+            response = await self._request("tts", lambda: stack.enter_async_context(
+                self.client.audio.speech.with_streaming_response.create(timeout=self.timeouts["audio"], **kwargs)
+            ), model=kwargs.get("model"))
+            async for chunk in response.iter_bytes():
+                yield chunk
+
+    # --- Retries and hedging ---
+    async def _request(self, operation: str, call: Callable[[], Awaitable[T]], hedge: bool = False,
+                       discard: Optional[Callable[[T], Awaitable[Any]]] = None, model: Optional[str] = None,
+                       kind: Optional[str] = None) -> T:
+        self.stats["requests"] += 1
+        window = "/".join(part for part in (operation, kind, model) if part) # Latency window of this kind of call
+        started = time.perf_counter()
+        try:
+            with tracer.span(f"openai {operation}", SPAN_KIND_CLIENT,
+                             {"llm.operation": operation, "llm.model": model, "llm.call_kind": kind}):
+                if hedge and self.hedge_enabled:
+                    result = await self._hedged(operation, window, call, discard)
+                else:
+                    result = await self._with_retries(operation, call)
+        except Exception:
+            self.stats["errors"] += 1
+            EXTERNAL_CALL_SECONDS.observe(time.perf_counter() - started, call=operation, outcome="error")
+            raise
+        elapsed = time.perf_counter() - started
+        EXTERNAL_CALL_SECONDS.observe(elapsed, call=operation, outcome="ok")
+        self._latency.setdefault(window, _LatencyWindow()).add(elapsed)
+        return result
+
+    async def _with_retries(self, operation: str, call: Callable[[], Awaitable[T]]) -> T:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await call()
+            except _RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, e)
+                self.stats["retries"] += 1
+                current_span.get().add_event("retry", {"attempt": attempt + 1, "error": type(e).__name__, "delay_s": round(delay, 2)})
+                log.warning("OpenAI call failed, retrying", operation=operation, error=type(e).__name__,
+                            attempt=attempt + 1, max_retries=self.max_retries, delay_s=round(delay, 2))
+                await asyncio.sleep(delay)
+
+    def hedge_delay(self, window: str) -> float:
+        """Seconds after which a request in latency `window` is hedged: the recent percentile
+        latency, or the configured default until enough requests have been seen."""
+        latencies = self._latency.get(window)
+        observed = latencies.percentile(OPENAI_HEDGE_PERCENTILE) if latencies else None
+        return max(OPENAI_HEDGE_MIN_DELAY_SECONDS, observed if observed is not None else OPENAI_HEDGE_DEFAULT_DELAY_SECONDS)
+
+    def _may_hedge(self) -> bool:
+        return sum(self._hedged_recent) < OPENAI_HEDGE_MAX_RATIO * max(1, len(self._hedged_recent))
+
+    async def _hedged(self, operation: str, window: str, call: Callable[[], Awaitable[T]],
+                      discard: Optional[Callable[[T], Awaitable[Any]]]) -> T:
+        delay = self.hedge_delay(window)
+        primary = asyncio.create_task(self._with_retries(operation, call))
+        tasks = [primary]
+        winner = None
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            hedge = not done and self._may_hedge()
+            self._hedged_recent.append(hedge)
+            if hedge:
+                self.stats["hedges"] += 1
+                current_span.get().add_event("hedge", {"deadline_s": round(delay, 2)})
+                log.info("OpenAI call slow, sending a hedged request", operation=window, deadline_s=round(delay, 2))
+                tasks.append(asyncio.create_task(self._with_retries(operation, call)))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=tasks.index): # The primary wins ties
+                    if task.exception() is None:
+                        winner = task
+                        if task is not primary:
+                            self.stats["hedge_wins"] += 1
+                            current_span.get().set_attribute("llm.hedge_won", True)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if task is not winner:
+                    task.cancel()
+                    task.add_done_callback(lambda task: self._discard(task, discard))
+
+    def _discard(self, task: asyncio.Task, discard: Optional[Callable[[T], Awaitable[Any]]]):
+        """Releases what a losing request produced (e.g. closes its stream)."""
+        if task.cancelled() or task.exception() is not None or discard is None:
+            return
+        cleanup = asyncio.ensure_future(discard(task.result()))
+        self._discards.add(cleanup)
+        cleanup.add_done_callback(self._discards.discard)
+
+    def snapshot_stats(self):
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        latency = {window: {"p50_ms": ms(latencies.percentile(0.5)), "p95_ms": ms(latencies.percentile(0.95))}
+                   for window, latencies in self._latency.items()}
+        return {**self.stats, "hedge_enabled": self.hedge_enabled, "latency": latency}
+
+    async def close(self):
+        await self.client.close()
+
+
+# Instantiate globally for the API service
+openai_provider = OpenAIProvider()
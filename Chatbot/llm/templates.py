@@ -0,0 +1,129 @@
+# llm/templates.py
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import REPLY_LOCALE
+
+# Fixed appointment replies per locale. Placeholders are filled from the extracted
+# details by ReplyRenderer.render; dates go through the locale's "datetime" format with
+# its own day / month names, so no process-wide locale setting is involved.
+_TEMPLATES = {
+    "en": {
+        "datetime": "{weekday}, {month} {day:02d} at {hour12:02d}:{minute:02d} {ampm}",
+        "days": ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"),
+        "months": ("January", "February", "March", "April", "May", "June", "July",
+                   "August", "September", "October", "November", "December"),
+        "terms": {"sales": "sales", "service": "service",
+                  "appointment_type": "the appointment type (sales or service)",
+                  "customer_name": "your name", "time_preference": "the day and time that works for you",
+                  "and": "and"},
+        "missing_details": "I'd be happy to book that for you. Could you tell me {missing}?",
+        "unparseable_time": "I couldn't understand the date and time you mentioned. Could you please specify it clearly, for example, 'tomorrow at 2 PM' or 'next Monday at 10 AM'?",
+        "duration_too_long": "Appointments can be at most {max_hours} hours long. Could you choose a shorter duration?",
+        "agent_unavailable": "I'm sorry, {agent} is not available on {when}.",
+        "others_available_one": "{agents} is available at that time instead.",
+        "others_available_many": "{agents} are available at that time instead.",
+        "no_agents": "I'm sorry, I couldn't find any {appointment_type} agents available on {when}.",
+        "slot_taken": "I'm sorry, {when} was just booked by someone else.",
+        "suggest_slots": "The next available times are: {slots}. Would one of those work?",
+        "slot": "{when} with {agent}",
+        "try_another_time": "Would you like to try a different time or day?",
+        "booked": "Great! Your {appointment_type} appointment with {agent} on {when} has been successfully booked for {customer_name}. We look forward to seeing you!",
+        "booked_fallback": "{preferred} was just booked for that time, so I've scheduled you with {agent} instead.",
+        "booking_error": "I'm sorry, something went wrong while booking your appointment. Please try again in a moment.",
+        "no_upcoming": "No upcoming appointments are scheduled.",
+        "upcoming": "Upcoming appointments:\n{lines}",
+        "upcoming_line": "{agent}: {when}",
+        "appointment_help": "Sure, I can help you with appointments. Please tell me your name, what type of appointment you're looking for (sales or service), and what date and time works best for you.",
+    },
+    "es": {
+        "datetime": "{weekday} {day} de {month} a las {hour24:02d}:{minute:02d}",
+        "days": ("lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"),
+        "months": ("enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+                   "agosto", "septiembre", "octubre", "noviembre", "diciembre"),
+        "terms": {"sales": "ventas", "service": "servicio",
+                  "appointment_type": "el tipo de cita (ventas o servicio)",
+                  "customer_name": "su nombre", "time_preference": "el día y la hora que le convienen",
+                  "and": "y"},
+        "missing_details": "Con gusto le agendo la cita. ¿Me podría indicar {missing}?",
+        "unparseable_time": "No entendí la fecha y hora que mencionó. ¿Podría indicarla con claridad, por ejemplo, 'mañana a las 2 PM' o 'el próximo lunes a las 10 AM'?",
+        "duration_too_long": "Las citas pueden durar como máximo {max_hours} horas. ¿Podría elegir una duración más corta?",
+        "agent_unavailable": "Lo siento, {agent} no está disponible el {when}.",
+        "others_available_one": "{agents} está disponible a esa hora.",
+        "others_available_many": "{agents} están disponibles a esa hora.",
+        "no_agents": "Lo siento, no encontré agentes de {appointment_type} disponibles el {when}.",
+        "slot_taken": "Lo siento, el horario del {when} acaba de ser reservado por otra persona.",
+        "suggest_slots": "Los próximos horarios disponibles son: {slots}. ¿Le conviene alguno?",
+        "slot": "{when} con {agent}",
+        "try_another_time": "¿Le gustaría probar otro día u hora?",
+        "booked": "¡Listo! Su cita de {appointment_type} con {agent} el {when} quedó reservada a nombre de {customer_name}. ¡Le esperamos!",
+        "booked_fallback": "{preferred} acaba de ser reservado a esa hora, así que le agendé con {agent}.",
+        "booking_error": "Lo siento, ocurrió un error al reservar su cita. Por favor, inténtelo de nuevo en un momento.",
+        "no_upcoming": "No hay citas programadas próximamente.",
+        "upcoming": "Próximas citas:\n{lines}",
+        "upcoming_line": "{agent}: {when}",
+        "appointment_help": "Claro, puedo ayudarle con sus citas. Indíqueme su nombre, el tipo de cita que busca (ventas o servicio) y el día y la hora que prefiere.",
+    },
+}
+
+
+class ReplyRenderer:
+    """Renders the deterministic appointment replies from localized templates.
+
+    Unknown locales fall back to English. `rendered` counts renders per template key and
+    `llm_calls_avoided` the chat completions the templates replaced (see count_avoided)."""
+
+    def __init__(self, locale: str = REPLY_LOCALE):
+        self.locale = locale if locale in _TEMPLATES else "en"
+        self._lock = threading.Lock()
+        self.rendered: Counter = Counter()
+        self.llm_calls_avoided = 0
+
+    def _table(self, locale: Optional[str]) -> Dict:
+        return _TEMPLATES.get(locale or self.locale, _TEMPLATES["en"])
+
+    def render(self, key: str, locale: Optional[str] = None, **fields) -> str:
+        with self._lock:
+            self.rendered[key] += 1
+        return self._table(locale)[key].format(**fields)
+
+    def format_datetime(self, value: datetime, locale: Optional[str] = None) -> str:
+        table = self._table(locale)
+        return table["datetime"].format(
+            weekday=table["days"][value.weekday()], month=table["months"][value.month - 1], day=value.day,
+            hour24=value.hour, hour12=value.hour % 12 or 12, minute=value.minute, ampm="AM" if value.hour < 12 else "PM",
+        )
+
+    def term(self, word: Optional[str], locale: Optional[str] = None) -> str:
+        """Localized name of an appointment type or detail field (unknown words pass through)."""
+        return self._table(locale)["terms"].get((word or "").lower(), word or "")
+
+    def join(self, items: Sequence[str], locale: Optional[str] = None) -> str:
+        """'a', 'a and b', 'a, b and c'."""
+        items = list(items)
+        if len(items) <= 1:
+            return "".join(items)
+        return f"{', '.join(items[:-1])} {self.term('and', locale)} {items[-1]}"
+
+    def slots(self, slots: List[Tuple[datetime, int, str]], locale: Optional[str] = None) -> str:
+        return "; ".join(self.render("slot", locale, when=self.format_datetime(start, locale), agent=agent_name)
+                         for start, _, agent_name in slots)
+
+    def static_replies(self, locale: Optional[str] = None) -> List[str]:
+        """Replies without placeholders, i.e. the exact text spoken every time (TTS cache warm-up)."""
+        return [template for key, template in self._table(locale).items()
+                if isinstance(template, str) and "{" not in template]
+
+    def count_avoided(self):
+        with self._lock:
+            self.llm_calls_avoided += 1
+
+    def snapshot_stats(self):
+        with self._lock:
+            return {"locale": self.locale, "llm_calls_avoided": self.llm_calls_avoided, "rendered": dict(self.rendered)}
+
+
+# Instantiate globally for the API service
+reply_renderer = ReplyRenderer()
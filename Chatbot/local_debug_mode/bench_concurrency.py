@@ -0,0 +1,123 @@
+# local_debug/bench_concurrency.py
+#
+# Concurrency benchmark for the async LangGraph pipeline.
+# Provider calls (OpenAI chat/embeddings, Pinecone query) are replaced with fakes that
+# wait for a fixed simulated latency, so the numbers show how many turns per second one
+# event loop sustains as the number of in-flight sessions grows.
+#
+# Usage:
+#   python local_debug_mode/bench_concurrency.py --latency 0.3 --turns 64 --concurrency 1 4 16 64
+#   python local_debug_mode/bench_concurrency.py --blocking   # emulate the old sync SDK calls
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("DB_FILE", os.path.join(tempfile.mkdtemp(), "bench_concurrency.db"))
+# Every turn asks the same question; keep the caches out of the measurement
+os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+
+from llm.openai_client import openai_provider
+from llm.prompts import CLASSIFY_EXTRACT_PROMPT
+import rag.retrieval as retrieval
+from langgraph_flow.state import AgentState
+from langgraph_flow.graph import build_graph
+
+
+class _FakeCall:
+    """Awaitable provider call that sleeps for the simulated latency."""
+
+    def __init__(self, latency: float, blocking: bool, result_factory):
+        self.latency = latency
+        self.blocking = blocking
+        self.result_factory = result_factory
+
+    async def create(self, **kwargs):
+        if self.blocking:
+            time.sleep(self.latency)  # what a sync SDK call inside `async def` does to the loop
+        else:
+            await asyncio.sleep(self.latency)
+        return self.result_factory(kwargs)
+
+
+def _chat_result(kwargs):
+    system_prompt = kwargs["messages"][0]["content"]
+    content = "RAG" if system_prompt == CLASSIFY_EXTRACT_PROMPT else "Our service department is open 7am to 6pm."
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _embedding_result(kwargs):
+    return SimpleNamespace(data=[SimpleNamespace(embedding=[0.0] * 8)])
+
+
+class _FakeStore:
+    blocking_io = True
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def query(self, vector, top_k):
+        time.sleep(self.latency)  # Pinecone SDK is sync; retrieval runs it in a worker thread
+        return [(0.9, {"text": "Service hours: 7am-6pm.", "source": "bench"})]
+
+    def get_content_version(self):
+        return "bench"
+
+
+def install_fakes(latency: float, blocking: bool):
+    chat = _FakeCall(latency, blocking, _chat_result)
+    embeddings = _FakeCall(latency / 3, blocking, _embedding_result)
+    fake_client = SimpleNamespace(chat=SimpleNamespace(completions=chat), embeddings=embeddings)
+    openai_provider.client = fake_client # Retries and hedging still apply to the fake calls
+    retrieval.vector_store = _FakeStore(latency / 3)
+
+
+async def run_level(app, concurrency: int, turns: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_turn(i: int):
+        async with semaphore:
+            state = AgentState(
+                user_query="What are your service hours?",
+                rewritten_query="",
+                intent="",
+                conversation_history=[],
+                answer="",
+                session_id=f"bench-{concurrency}-{i}",
+                extracted_appointment_details=None
+            )
+            await app.ainvoke(state)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_turn(i) for i in range(turns)))
+    return time.perf_counter() - start
+
+
+async def main(args):
+    install_fakes(args.latency, args.blocking)
+    app = build_graph()
+    mode = "blocking (sync SDK emulation)" if args.blocking else "async"
+    print(f"Simulated chat latency {args.latency:.3f}s, {args.turns} turns per level, mode: {mode}")
+    print(f"{'in-flight':>10} {'wall (s)':>10} {'turns/s':>10} {'speedup':>10}")
+    baseline = None
+    for concurrency in args.concurrency:
+        elapsed = await run_level(app, concurrency, args.turns)
+        throughput = args.turns / elapsed
+        baseline = baseline or throughput
+        print(f"{concurrency:>10} {elapsed:>10.2f} {throughput:>10.2f} {throughput / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of the chat graph vs. number of in-flight sessions.")
+    parser.add_argument("--latency", type=float, default=0.3, help="Simulated chat-completion latency in seconds.")
+    parser.add_argument("--turns", type=int, default=64, help="Turns to run at each concurrency level.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--blocking", action="store_true", help="Emulate blocking provider calls for comparison.")
+    asyncio.run(main(parser.parse_args()))
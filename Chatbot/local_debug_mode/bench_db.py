@@ -0,0 +1,102 @@
+# local_debug/bench_db.py
+#
+# Latency of the hot database paths as the tables grow: load_history (last 12 messages
+# of one session) and a booking (one find_free_agents query for the role, then the
+# insert). Tables are filled in steps up to the largest size; at each step both paths
+# are timed against random sessions / times.
+#
+# Usage:
+#   python local_debug_mode/bench_db.py --sizes 10000 100000 1000000
+#   python local_debug_mode/bench_db.py --no-indexes    # same run without the composite indexes
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("DB_FILE", os.path.join(tempfile.mkdtemp(), "bench_db.db"))
+
+from database import crud
+from database.availability import find_free_agents
+
+MESSAGES_PER_SESSION = 20
+APPOINTMENTS_PER_MESSAGE = 0.1 # Appointments table grows alongside conversations
+BASE_TIME = datetime(2025, 1, 6, 8, 0)
+
+
+def fill(conversations_from: int, conversations_to: int, agent_ids):
+    """Bulk-inserts conversation rows (and a proportional number of appointments)."""
+    def messages():
+        for i in range(conversations_from, conversations_to):
+            yield (f"session-{i // MESSAGES_PER_SESSION}", "user" if i % 2 == 0 else "assistant", f"message {i} " * 8)
+
+    def appointments():
+        start = int(conversations_from * APPOINTMENTS_PER_MESSAGE)
+        for i in range(start, int(conversations_to * APPOINTMENTS_PER_MESSAGE)):
+            slot = BASE_TIME + timedelta(minutes=30 * (i // len(agent_ids)))
+            start_epoch = crud.to_epoch(slot)
+            yield (agent_ids[i % len(agent_ids)], f"Customer {i}", slot.isoformat(), 30, "service",
+                   start_epoch, start_epoch + 30 * 60)
+
+    with crud.transaction() as conn:
+        conn.executemany("INSERT INTO conversations (session_id, role, content) VALUES (?, ?, ?)", messages())
+        conn.executemany("INSERT INTO appointments (agent_id, customer_name, start_time, duration_minutes, type, "
+                         "start_epoch, end_epoch) VALUES (?, ?, ?, ?, ?, ?, ?)", appointments())
+
+
+def timed(fn, repeats: int):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main(args):
+    if args.no_indexes:
+        with crud.transaction() as conn:
+            conn.execute("DROP INDEX IF EXISTS idx_conversations_session_id")
+            conn.execute("DROP INDEX IF EXISTS idx_appointments_agent_epoch")
+    agent_ids = [agent_id for agent_id, _ in crud.get_agent_by_role("sales") + crud.get_agent_by_role("service")]
+
+    print(f"DB: {os.environ['DB_FILE']} ({'no indexes' if args.no_indexes else 'with indexes'})")
+    print(f"{'messages':>10} {'appts':>9} {'history p50':>12} {'p99 (ms)':>9} {'booking p50':>12} {'p99 (ms)':>9}")
+    filled = 0
+    for size in sorted(args.sizes):
+        fill(filled, size, agent_ids)
+        filled = size
+        sessions = size // MESSAGES_PER_SESSION
+
+        def load_history():
+            crud.load_history(f"session-{random.randrange(sessions)}", last_n=12)
+
+        def book():
+            start = BASE_TIME + timedelta(minutes=30 * random.randrange(20000))
+            free = find_free_agents("service", start, 30) # What find_available_agents does per request
+            if free:
+                crud.create_appointment(free[0][0], "Bench Customer", start.isoformat(), 30, "service")
+
+        history = timed(load_history, args.repeats)
+        booking = timed(book, max(args.repeats // 10, 10))
+        print(f"{size:>10} {int(size * APPOINTMENTS_PER_MESSAGE):>9} {history[0]:>12.3f} {history[1]:>9.3f} "
+              f"{booking[0]:>12.3f} {booking[1]:>9.3f}")
+        # The random bookings would collide with the appointments fill() adds at the next size
+        with crud.transaction() as conn:
+            conn.execute("DELETE FROM appointments WHERE customer_name = 'Bench Customer'")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="load_history and booking latency vs. table size.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="Conversation row counts to measure at.")
+    parser.add_argument("--repeats", type=int, default=500, help="load_history calls per size.")
+    parser.add_argument("--no-indexes", action="store_true", help="Drop the composite indexes first.")
+    main(parser.parse_args())
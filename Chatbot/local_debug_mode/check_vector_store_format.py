@@ -0,0 +1,90 @@
+# local_debug/check_vector_store_format.py
+#
+# The local vector store exists twice: Data_ingestion/vector_db/store.py writes it and
+# Chatbot/rag/vector_store.py reads it (each service is built from its own directory).
+# This check fails if the two copies drift apart: LocalVectorStore, FORMAT_VERSION and
+# UnsupportedStoreFormat must be identical in both, and a generation published by the
+# ingestion copy must load and answer queries in the chatbot copy. Run it after any
+# change to either file.
+#
+# Usage:
+#   python local_debug_mode/check_vector_store_format.py
+
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+CHATBOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+INGESTION_DIR = os.path.abspath(os.path.join(CHATBOT_DIR, '..', 'Data_ingestion'))
+COPIES = {"chatbot": os.path.join(CHATBOT_DIR, "rag", "vector_store.py"),
+          "ingestion": os.path.join(INGESTION_DIR, "vector_db", "store.py")}
+SHARED_NAMES = ("FORMAT_VERSION", "UnsupportedStoreFormat", "LocalVectorStore")
+
+WRITE = """
+import json, sys
+from vector_db.store import LocalVectorStore, FORMAT_VERSION
+store = LocalVectorStore(sys.argv[1], dim=4)
+store.upsert([{"id": "a#0", "values": [1, 0, 0, 0], "metadata": {"source": "a", "chunk_index": 0, "text": "alpha"}},
+              {"id": "b#0", "values": [0, 1, 0, 0], "metadata": {"source": "b", "chunk_index": 0, "text": "beta"}}])
+store.set_content_version("check-v1")
+store.snapshot()
+print(json.dumps({"format": FORMAT_VERSION}))
+"""
+
+READ = """
+import json, sys
+from rag.vector_store import LocalVectorStore, FORMAT_VERSION
+store = LocalVectorStore(sys.argv[1], read_only=True, dim=4)
+print(json.dumps({"format": FORMAT_VERSION, "count": len(store), "content_version": store.get_content_version(),
+                  "top": [metadata for _, metadata in store.query([0, 1, 0, 0], 1)]}))
+"""
+
+
+def shared_definitions(path: str):
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    definitions = {}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name in SHARED_NAMES:
+            definitions[node.name] = ast.dump(node)
+        elif isinstance(node, ast.Assign) and any(getattr(target, "id", None) in SHARED_NAMES for target in node.targets):
+            definitions[node.targets[0].id] = ast.dump(node)
+    return definitions
+
+
+def run(code: str, cwd: str, root: str) -> dict:
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-check")}
+    output = subprocess.run([sys.executable, "-c", code, root], cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    failures = []
+    chatbot, ingestion = (shared_definitions(path) for path in COPIES.values())
+    for name in SHARED_NAMES:
+        if name not in chatbot or name not in ingestion:
+            failures.append(f"{name} is missing from one of the copies")
+        elif chatbot[name] != ingestion[name]:
+            failures.append(f"{name} differs between {COPIES['chatbot']} and {COPIES['ingestion']}")
+
+    with tempfile.TemporaryDirectory() as root:
+        written = run(WRITE, INGESTION_DIR, root)
+        read = run(READ, CHATBOT_DIR, root)
+    if written["format"] != read["format"]:
+        failures.append(f"FORMAT_VERSION: ingestion writes {written['format']}, chatbot reads {read['format']}")
+    expected = {"count": 2, "content_version": "check-v1", "top": [{"source": "b", "chunk_index": 0, "text": "beta"}]}
+    for key, value in expected.items():
+        if read[key] != value:
+            failures.append(f"Round trip: {key} is {read[key]!r}, expected {value!r}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print(f"Vector store format {read['format']}: {'copies agree' if not failures else f'{len(failures)} problem(s)'}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 # local_debug/cli_debug.py
 
+import asyncio
 import os
 import sys
 from datetime import datetime, timedelta, UTC
@@ -20,13 +21,16 @@ app_langgraph = build_graph()
 def cli_loop_debug():
     session_id = f"session-{datetime.now(UTC).strftime('%Y%m%d%H%M%S')}"
     print("Agent workflow CLI (Debug Mode). Type 'exit' to quit. Type '/scrape' to simulate data ingestion.")
-    print("Note: This CLI uses the local SQLite DB and Pinecone. Ensure your .env is configured.")
+    print("Note: This CLI uses the local SQLite DB and the configured vector store (Pinecone or local). Ensure your .env is configured.")
 
     # Initialize DB for local debug
     crud.setup_db()
 
     current_conversation_history = crud.load_history(session_id, last_n=12)
 
+    # One loop for the whole session: the async OpenAI client keeps its connection pool bound to it
+    loop = asyncio.new_event_loop()
+
     while True:
         user_input = input("\nYou: ").strip()
         if not user_input:
@@ -49,8 +53,8 @@ def cli_loop_debug():
         )
 
         try:
-            # Using invoke for simplicity in CLI, stream is more complex to display
-            final_state_value = app_langgraph.invoke(initial_state)
+            # The graph nodes are async, so drive them with ainvoke
+            final_state_value = loop.run_until_complete(app_langgraph.ainvoke(initial_state))
 
             if final_state_value:
                 assistant_answer = final_state_value["answer"]
@@ -71,16 +75,14 @@ if __name__ == "__main__":
     from dotenv import load_dotenv
     load_dotenv()
 
-    # Initialize Pinecone for local debug (it's called in rag/retrieval.py on import)
-    # You might need to explicitly call initialize_pinecone_api_service() here
-    # if it's not called on module import in rag/retrieval.py
-    from rag.retrieval import initialize_pinecone_api_service
+    # Initialize the vector store for local debug (not done on module import in rag/retrieval.py)
+    from rag.retrieval import initialize_vector_store
     try:
-        initialize_pinecone_api_service()
-        print("Local Pinecone initialized.")
+        initialize_vector_store()
+        print("Local vector store initialized.")
     except Exception as e:
-        print(f"Failed to initialize Pinecone for local debug: {e}")
-        print("Please ensure your Pinecone API key and environment are correct in .env.")
+        print(f"Failed to initialize vector store for local debug: {e}")
+        print("Please ensure your Pinecone API key and environment are correct in .env, or set VECTOR_STORE_BACKEND=local.")
         exit(1)
 
     cli_loop_debug()
\ No newline at end of file
@@ -0,0 +1,114 @@
+# local_debug/intent_replay.py
+#
+# Replays a labelled set of queries through the local fast-path intent classifier and
+# reports, per confidence threshold, how many queries it decides on its own (hit rate),
+# how many of those decisions are right (accuracy) and the per-call latency.
+# The few-shot examples in CLASSIFY_EXTRACT_PROMPT are always part of the replay set.
+#
+# Usage:
+#   python local_debug_mode/intent_replay.py
+#   python local_debug_mode/intent_replay.py --replay-file labelled.tsv --thresholds 0.7 0.8 0.9
+#   (labelled.tsv: one "<INTENT>\t<query>" per line)
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("OPENAI_API_KEY", "sk-replay")
+
+from llm.prompts import CLASSIFY_EXTRACT_PROMPT
+from llm.fast_intent import FastIntentClassifier
+
+REPLAY_SET = [
+    ("CHAT", "Hi"),
+    ("CHAT", "hello"),
+    ("CHAT", "Good morning!"),
+    ("CHAT", "Thanks!"),
+    ("CHAT", "thank you so much"),
+    ("CHAT", "ok"),
+    ("CHAT", "Bye"),
+    ("CHAT", "How are you today?"),
+    ("CHAT", "Who are you?"),
+    ("CHAT", "Have a great day"),
+    ("CHAT", "tell me a joke"),
+    ("CHAT", "I love my old truck"),
+    ("RAG", "What are your lease specials?"),
+    ("RAG", "Do you have any financing offers?"),
+    ("RAG", "What EV incentives are available?"),
+    ("RAG", "What are your service hours?"),
+    ("RAG", "Where are you located?"),
+    ("RAG", "How much is a 2024 Equinox?"),
+    ("RAG", "Do you have any used cars under 15k?"),
+    ("RAG", "What are the service and parts specials this month?"),
+    ("RAG", "Do you sell fleet vehicles?"),
+    ("RAG", "What's the phone number for the dealership?"),
+    ("RAG", "Any Black Friday deals?"),
+    ("RAG", "Is the Silverado EV in stock?"),
+    ("RAG", "Do you offer a warranty on certified pre-owned cars?"),
+    ("RAG", "hi, what are your hours on Sunday?"),
+    ("APPOINTMENT", "Book a service appointment"),
+    ("APPOINTMENT", "I want to schedule a test drive"),
+    ("APPOINTMENT", "Can I make an appointment?"),
+    ("APPOINTMENT", "What's your availability for service?"),
+    ("APPOINTMENT", "Do you have any openings for sales?"),
+    ("APPOINTMENT", "I need to reschedule my appointment"),
+    ("APPOINTMENT", "Book a sales appointment for Joe tomorrow at 3 PM"),
+    ("APPOINTMENT", "Can you book an appointment for John at 10am?"),
+    ("APPOINTMENT", "schedule an oil change next Monday"),
+    ("APPOINTMENT", "Set up a test drive with Sarah"),
+]
+
+
+def few_shot_examples():
+    """Labelled examples embedded in the LLM classifier prompt."""
+    pattern = re.compile(r"User query: (.+)\n(RAG|APPOINTMENT|CHAT)\b")
+    return [(intent, query) for query, intent in pattern.findall(CLASSIFY_EXTRACT_PROMPT)]
+
+
+def load_replay_file(path):
+    rows = []
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                intent, query = line.rstrip("\n").split("\t", 1)
+                rows.append((intent.strip().upper(), query))
+    return rows
+
+
+def replay(dataset, threshold, verbose=False):
+    classifier = FastIntentClassifier(threshold=threshold)
+    correct = 0
+    start = time.perf_counter()
+    for expected, query in dataset:
+        result = classifier.classify(query)
+        if result is None:
+            continue
+        if result[0] == expected:
+            correct += 1
+        elif verbose:
+            print(f"  wrong: {query!r} -> {result[0]} (expected {expected})")
+    per_call_us = (time.perf_counter() - start) / len(dataset) * 1e6
+    hits = classifier.stats["hits"]
+    accuracy = correct / hits if hits else 0.0
+    return classifier.hit_rate(), accuracy, per_call_us
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hit rate / accuracy of the fast-path intent classifier.")
+    parser.add_argument("--replay-file", help="Extra labelled queries, one '<INTENT>\\t<query>' per line.")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.8, 0.85, 0.9])
+    parser.add_argument("--verbose", action="store_true", help="Print misclassified fast-path decisions.")
+    args = parser.parse_args()
+
+    dataset = REPLAY_SET + few_shot_examples()
+    if args.replay_file:
+        dataset += load_replay_file(args.replay_file)
+
+    print(f"Replay set: {len(dataset)} labelled queries")
+    print(f"{'threshold':>10} {'hit rate':>10} {'accuracy':>10} {'us/call':>10}")
+    for threshold in args.thresholds:
+        hit_rate, accuracy, per_call_us = replay(dataset, threshold, args.verbose)
+        print(f"{threshold:>10.2f} {hit_rate:>10.1%} {accuracy:>10.1%} {per_call_us:>10.1f}")
@@ -0,0 +1,87 @@
+# local_debug/stress_booking.py
+#
+# Fires many simultaneous bookings at a handful of slots, the way concurrent chat
+# sessions reach node_appointment (asyncio tasks, SQLite work on worker threads), then
+# checks the appointments table for any agent booked twice for overlapping times.
+#
+# With S slots and A agents of the role, exactly min(requests, S * A) bookings should
+# succeed and the rest should be refused; the overlap check must report zero.
+#
+# Usage:
+#   python local_debug_mode/stress_booking.py --requests 500 --slots 10
+#   python local_debug_mode/stress_booking.py --requests 2000 --slots 50 --threads 64
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("DB_FILE", os.path.join(tempfile.mkdtemp(), "stress_booking.db"))
+
+from database import crud
+from database.availability import abook_first_free
+
+BASE_TIME = datetime(2030, 3, 4, 10, 0)
+SLOTS_PER_DAY = 12 # 10:00-16:00, when every service agent is working
+
+
+def double_bookings():
+    """Pairs of appointments of the same agent whose intervals overlap."""
+    return crud.get_conn().execute("""
+        SELECT a.id, b.id, a.agent_id, a.start_time, b.start_time FROM appointments a
+        JOIN appointments b ON a.agent_id = b.agent_id AND a.id < b.id
+        WHERE a.start_epoch < b.end_epoch AND b.start_epoch < a.end_epoch
+    """).fetchall()
+
+
+async def main(args):
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.threads))
+    agents = crud.get_agent_by_role("service")
+    slots = [BASE_TIME + timedelta(days=i // SLOTS_PER_DAY, minutes=30 * (i % SLOTS_PER_DAY)) for i in range(args.slots)]
+    latencies = []
+
+    async def book(i: int):
+        slot = slots[i % len(slots)]
+        preferred = [agents[i % len(agents)][0]] # Spread first choices so fallbacks happen
+        start = time.perf_counter()
+        result = await abook_first_free("service", slot, 30, f"Customer {i}", "service", preferred_agent_ids=preferred)
+        latencies.append((time.perf_counter() - start) * 1000)
+        return result, preferred[0]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(book(i) for i in range(args.requests)), return_exceptions=True)
+    elapsed = time.perf_counter() - start
+
+    errors = [r for r in results if isinstance(r, BaseException)]
+    booked = [r for r in results if not isinstance(r, BaseException) and r[0] is not None]
+    fallbacks = sum(1 for (agent_id, _), preferred in booked if agent_id != preferred)
+    expected = min(args.requests, len(slots) * len(agents))
+    overlaps = double_bookings()
+    latencies.sort()
+
+    print(f"DB: {os.environ['DB_FILE']}")
+    print(f"Requests: {args.requests} over {len(slots)} slots x {len(agents)} agents ({args.threads} threads)")
+    print(f"Booked: {len(booked)} (expected {expected}), fell back to another agent: {fallbacks}, "
+          f"refused: {args.requests - len(booked) - len(errors)}, errors: {len(errors)}")
+    for e in errors[:5]:
+        print(f"  error: {e!r}")
+    print(f"Throughput: {args.requests / elapsed:.0f} bookings/s "
+          f"(p50 {latencies[len(latencies) // 2]:.1f} ms, p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f} ms)")
+    print(f"Double-bookings: {len(overlaps)}")
+    for overlap in overlaps[:5]:
+        print(f"  {overlap}")
+    sys.exit(1 if overlaps or errors or len(booked) != expected else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent booking stress test.")
+    parser.add_argument("--requests", type=int, default=500, help="Simultaneous booking attempts.")
+    parser.add_argument("--slots", type=int, default=10, help="Distinct 30-minute slots they compete for.")
+    parser.add_argument("--threads", type=int, default=32, help="Worker threads running the SQLite work.")
+    asyncio.run(main(parser.parse_args()))
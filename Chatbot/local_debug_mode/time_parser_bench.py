@@ -0,0 +1,103 @@
+# local_debug/time_parser_bench.py
+#
+# Parse rate, accuracy and per-call latency of langgraph_flow/time_parser.py over the
+# booking phrases in time_phrases.tsv, next to the previous dateutil-only parser.
+# Every phrase is parsed at a fixed reference time so the expected values hold.
+#
+# Usage:
+#   python local_debug_mode/time_parser_bench.py
+#   python local_debug_mode/time_parser_bench.py --repeats 2000 --verbose
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, UTC
+from zoneinfo import ZoneInfo
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from dateutil import parser as dateutil_parser
+
+from langgraph_flow import time_parser
+
+REFERENCE_NOW = datetime(2025, 6, 11, 10, 15, tzinfo=ZoneInfo("America/Los_Angeles")) # A Wednesday
+CORPUS = os.path.join(os.path.dirname(__file__), "time_phrases.tsv")
+
+
+def legacy_parse(text: str):
+    """The parser node_appointment used before time_parser (kept for comparison)."""
+    try:
+        dt = dateutil_parser.parse(text, fuzzy_with_tokens=True)[0]
+        if not any(attr in text for attr in ['year', 'month', 'day', 'today', 'tomorrow', 'yesterday']):
+            dt = dt.replace(year=datetime.now(UTC).year, month=datetime.now(UTC).month, day=datetime.now(UTC).day)
+            if dt < datetime.now(UTC):
+                dt += timedelta(days=1)
+        return dt.replace(second=0, microsecond=0)
+    except Exception:
+        return None
+
+
+def load_corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        rows = [line.rstrip("\n").split("\t") for line in f if line.strip() and not line.startswith("#")]
+    return [(phrase, None if expected == "-" else datetime.strptime(expected, "%Y-%m-%d %H:%M")) for phrase, expected in rows]
+
+
+def timed(fn, phrases, repeats):
+    samples = []
+    for _ in range(repeats):
+        for phrase in phrases:
+            start = time.perf_counter()
+            fn(phrase)
+            samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main(args):
+    corpus = load_corpus()
+    phrases = [phrase for phrase, _ in corpus]
+    parse = lambda phrase: time_parser.parse_time_preference(phrase, REFERENCE_NOW)
+
+    results = {"correct": 0, "wrong": 0, "missed": 0, "false_positive": 0, "fallback": 0}
+    for phrase, expected in corpus:
+        got = parse(phrase)
+        got = got.replace(tzinfo=None) if got else None
+        if time_parser._spec(time_parser._normalize(phrase)) is None and got is not None:
+            results["fallback"] += 1
+        if expected is None:
+            results["correct" if got is None else "false_positive"] += 1
+        elif got is None:
+            results["missed"] += 1
+        else:
+            results["correct" if got == expected else "wrong"] += 1
+        if args.verbose or (got != expected):
+            print(f"  {'ok ' if got == expected else 'BAD'} {phrase!r:60} expected {expected}  got {got}")
+
+    legacy_parsed = sum(1 for phrase, expected in corpus if expected and legacy_parse(phrase))
+    time_phrases = sum(1 for _, expected in corpus if expected)
+    print(f"Corpus: {len(corpus)} phrases ({time_phrases} times, {len(corpus) - time_phrases} non-times)")
+    print(f"time_parser: {results['correct']}/{len(corpus)} correct, {results['wrong']} wrong, {results['missed']} missed, "
+          f"{results['false_positive']} false positives, {results['fallback']} via dateutil fallback")
+    print(f"Parse rate: time_parser {(time_phrases - results['missed']) / time_phrases:.0%}, "
+          f"legacy {legacy_parsed / time_phrases:.0%} (legacy resolves relative phrases against the real clock)")
+
+    for cached in (time_parser._normalize, time_parser._spec, time_parser._candidate):
+        cached.cache_clear()
+    cold = timed(parse, phrases, 1)
+    warm = timed(parse, phrases, args.repeats)
+    legacy = timed(legacy_parse, phrases, max(args.repeats // 10, 1))
+    print(f"{'per call (us)':<24} {'p50':>8} {'p99':>8}")
+    print(f"{'time_parser (cold)':<24} {cold[0]:>8.1f} {cold[1]:>8.1f}")
+    print(f"{'time_parser (memoized)':<24} {warm[0]:>8.1f} {warm[1]:>8.1f}")
+    print(f"{'legacy dateutil':<24} {legacy[0]:>8.1f} {legacy[1]:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="time_parser parse rate and latency over the phrase corpus.")
+    parser.add_argument("--repeats", type=int, default=200, help="Passes over the corpus for the memoized timing.")
+    parser.add_argument("--verbose", action="store_true", help="Print every phrase, not just mismatches.")
+    main(parser.parse_args())
@@ -0,0 +1,106 @@
+# local_debug/voice_ws_client.py
+#
+# Talks to the /voice/ws endpoint of a running API service the way a phone channel
+# would: streams a 16-bit mono WAV file in real-time 20 ms frames, then silence, and
+# reports the turn-taking latency (end of speech -> transcript -> first reply audio ->
+# end of reply). With --text, sends the text itself as the "audio" plus an explicit end
+# message, for servers running VOICE_PROVIDER=local.
+#
+# Usage:
+#   python local_debug_mode/voice_ws_client.py --wav question.wav --out reply.mp3
+#   python local_debug_mode/voice_ws_client.py --wav question.wav --reply-format opus --out reply.ogg
+#   python local_debug_mode/voice_ws_client.py --text "what are your hours" --text "book a service tomorrow at 3"
+
+import argparse
+import asyncio
+import json
+import time
+import wave
+
+import websockets
+
+FRAME_MS = 20
+
+
+async def stream_wav(ws, path: str) -> int:
+    """Streams the speech in real time; returns the frame size in samples."""
+    with wave.open(path, "rb") as reader:
+        if reader.getsampwidth() != 2 or reader.getnchannels() != 1:
+            raise SystemExit("Expected a 16-bit mono WAV file")
+        frame_samples = reader.getframerate() * FRAME_MS // 1000
+        while frames := reader.readframes(frame_samples):
+            await ws.send(frames)
+            await asyncio.sleep(FRAME_MS / 1000) # Real time, like a microphone
+    return frame_samples
+
+
+async def stream_silence(ws, frame_samples: int, duration_ms: int):
+    silence = b"\0\0" * frame_samples
+    for _ in range(duration_ms // FRAME_MS):
+        await ws.send(silence)
+        await asyncio.sleep(FRAME_MS / 1000)
+
+
+async def receive_reply(ws, speech_ended: float, out_path: str):
+    timings, audio = {}, bytearray()
+    while True:
+        message = await ws.recv()
+        now = (time.perf_counter() - speech_ended) * 1000
+        if isinstance(message, bytes):
+            timings.setdefault("first_audio_ms", now)
+            audio.extend(message)
+            continue
+        event = json.loads(message)
+        if event["type"] == "transcript":
+            timings["transcript_ms"] = now
+            print(f"  transcript: {event['text']!r}")
+        elif event["type"] == "sentence":
+            print(f"  sentence:   {event['text']!r}")
+        elif event["type"] in ("reply_end", "error", "interrupted"):
+            timings["reply_end_ms"] = now
+            if event["type"] != "reply_end":
+                print(f"  {event}")
+            else: # Server-side view: from the end of the utterance to the first / last audio write
+                print(f"  server:     first byte {event.get('first_byte_ms')} ms, total {event.get('total_ms')} ms")
+            break
+    if out_path and audio:
+        with open(out_path, "wb") as f:
+            f.write(audio)
+    print("  " + ", ".join(f"{name} {value:.0f}" for name, value in timings.items()) + f", audio {len(audio)} bytes")
+
+
+async def main(args):
+    audio_format = "mp3" if args.text else "pcm16" # mp3 needs no container header, so plain text passes
+    sample_rate = 16000
+    if args.wav:
+        with wave.open(args.wav, "rb") as reader:
+            sample_rate = reader.getframerate()
+    url = f"{args.url}?audio_format={audio_format}&sample_rate={sample_rate}&reply_format={args.reply_format}"
+    async with websockets.connect(url, max_size=None) as ws:
+        print(json.loads(await ws.recv()))
+        if args.text:
+            for text in args.text:
+                print(f"> {text}")
+                await ws.send(text.encode("utf-8"))
+                await ws.send(json.dumps({"type": "end"}))
+                await receive_reply(ws, time.perf_counter(), None)
+        else:
+            print(f"> {args.wav}")
+            frame_samples = await stream_wav(ws, args.wav)
+            # The reply starts arriving while the trailing silence is still being sent
+            await asyncio.gather(receive_reply(ws, time.perf_counter(), args.out),
+                                 stream_silence(ws, frame_samples, args.silence_ms))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Turn-taking latency over the /voice/ws endpoint.")
+    parser.add_argument("--url", default="ws://localhost:8080/voice/ws")
+    parser.add_argument("--wav", help="16-bit mono WAV file to stream as the caller's speech.")
+    parser.add_argument("--text", action="append", help="Text 'utterance' (VOICE_PROVIDER=local); repeatable.")
+    parser.add_argument("--silence-ms", type=int, default=1500, help="Silence streamed after the speech.")
+    parser.add_argument("--reply-format", default="mp3", help="Reply audio format: mp3, opus, aac, wav or pcm.")
+    parser.add_argument("--out", help="Write the reply audio here.")
+    args = parser.parse_args()
+    if not args.wav and not args.text:
+        parser.error("Pass --wav or --text")
+    asyncio.run(main(args))
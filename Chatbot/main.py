@@ -2,25 +2,41 @@
 
 import os
 import json
-import sqlite3 # Still needed for conn/cur setup, or move that to database/crud.py
+import time
+import asyncio
+import functools
+from contextlib import aclosing
 from datetime import datetime, timedelta, UTC
-from typing import List, Dict, Any, Tuple, TypedDict, Optional
+from typing import AsyncIterator, List, Dict, Any, Tuple, TypedDict, Optional
 
 # Import from your new modules
 from config import (
     OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_ENVIRONMENT, PINECONE_INDEX_NAME,
     DEALERSHIP_URL, DB_FILE, EMBED_MODEL, CHAT_MODEL, TOP_K, TTS_MODEL, TTS_VOICE,
-    DEBUG_MODE
+    DEBUG_MODE, VOICE_TTS_PIPELINE, VECTOR_STORE_BACKEND, VOICE_PROVIDER
 )
 from database import crud # Import the crud module
+from database.history_cache import history_cache
+from llm.templates import reply_renderer
 from llm.helper import llm_helper # Import the instantiated LLMHelper
-from rag.retrieval import initialize_pinecone_api_service # Import Pinecone init for API service
+from llm.openai_client import openai_provider
+from rag.retrieval import initialize_vector_store # Import vector store init for API service
 from langgraph_flow.state import AgentState # Import AgentState
 from langgraph_flow.graph import build_graph # Import the graph builder
+from voice.tts_pipeline import SentenceSplitter, pipelined_speech
+from voice.providers import stt_provider
+from voice.tts_cache import tts_cache, cached_tts
+from voice.audio_output import (
+    negotiate_format, audio_stream, audio_timings, StreamTiming, UnsupportedAudioFormat
+)
+from voice.utterance import UtteranceBuffer, EndpointDetector, UtteranceTooLong, MissingContainerHeader
+from observability.log import get_logger
+from observability.metrics import registry, MetricsMiddleware, VOICE_SESSIONS_ACTIVE
+from observability.tracing import tracer, current_span, TracingMiddleware
 
 # FastAPI specific imports
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
-from fastapi.responses import StreamingResponse, HTMLResponse
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, WebSocket, Request
+from fastapi.responses import StreamingResponse, HTMLResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
@@ -29,17 +45,20 @@ import io
 import uuid # Not used in this version, can remove if not needed
 from dateutil import parser # Used in nodes, but not directly in main.py anymore
 from dateutil.relativedelta import relativedelta # Used in nodes, but not directly in main.py anymore
-from openai import OpenAI # Used in llm.helper and rag.retrieval, not directly here
 
 # --- Global Setup (Minimal) ---
-# DB Connection (still here for now, could be moved to crud.py and managed via FastAPI dependencies)
-conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-cur = conn.cursor()
+log = get_logger("api")
+
+# Database connections are opened per thread by database/crud.py
 crud.setup_db() # Call the setup function from crud.py
 
 # Compile the LangGraph
 app_langgraph = build_graph()
 
+# Graph runs that outlive their streaming response (history persistence after the
+# answer is sent). Held here so the tasks are not garbage-collected mid-flight.
+_background_tasks = set()
+
 # --- FastAPI App Definition ---
 app_fastapi = FastAPI(
     title="Dealership Voice Chatbot API",
@@ -48,17 +67,27 @@ app_fastapi = FastAPI(
 )
 
 app_fastapi.mount("/static", StaticFiles(directory="static"), name="static")
+app_fastapi.add_middleware(MetricsMiddleware) # In-flight gauge and latency per route for /metrics
+app_fastapi.add_middleware(TracingMiddleware) # One trace per request (TRACE_EXPORTER)
 
 # --- FastAPI Event Handlers ---
 @app_fastapi.on_event("startup")
 async def startup_event():
-    print("FastAPI app startup: Initializing Pinecone for API service...")
     try:
-        initialize_pinecone_api_service()
-        print("FastAPI app startup: Pinecone initialized successfully.")
+        initialize_vector_store()
+        log.info("Vector store initialized", backend=VECTOR_STORE_BACKEND)
     except Exception as e:
-        print(f"FastAPI app startup: CRITICAL ERROR during Pinecone initialization: {e}")
-        raise HTTPException(status_code=500, detail=f"API service failed to start due to Pinecone error: {e}")
+        log.exception("Vector store initialization failed", backend=VECTOR_STORE_BACKEND)
+        raise HTTPException(status_code=500, detail=f"API service failed to start due to vector store error: {e}")
+    history_cache.start()
+
+@app_fastapi.on_event("shutdown")
+async def shutdown_event():
+    # Writes conversation turns still buffered by the history cache
+    await history_cache.stop()
+    log.info("Conversation history flushed")
+    await openai_provider.close() # Closes the pooled OpenAI connections
+    tracer.shutdown() # Exports the spans still queued
 
 # --- FastAPI Endpoints ---
 
@@ -83,9 +112,10 @@ async def chat_endpoint(request_body: ChatRequest):
     if not session_id:
         session_id = f"session-{datetime.now(UTC).strftime('%Y%m%d%H%M%S')}"
 
-    print(f"API Service: Received text query for session {session_id}: {user_query}")
+    log.info("Text query", endpoint="/chat", session_id=session_id, chars=len(user_query))
+    current_span.get().set_attribute("session_id", session_id)
 
-    current_conversation_history = crud.load_history(session_id, last_n=12) # Use crud.load_history
+    current_conversation_history = await history_cache.load(session_id, last_n=12)
 
     initial_state = AgentState(
         user_query=user_query,
@@ -98,50 +128,162 @@ async def chat_endpoint(request_body: ChatRequest):
     )
 
     try:
-        final_state_value = app_langgraph.invoke(initial_state)
+        final_state_value = await app_langgraph.ainvoke(initial_state)
 
         if final_state_value:
             assistant_answer = final_state_value["answer"]
-            print(f"API Service: Assistant text response for session {session_id}: {assistant_answer[:100]}...")
+            log.debug("Answer", session_id=session_id, preview=assistant_answer[:100])
             return ChatResponse(session_id=session_id, response=assistant_answer)
         else:
-            print(f"API Service: Error: Graph did not produce a final state for session {session_id}.")
+            log.error("Graph did not produce a final state", session_id=session_id)
             raise HTTPException(status_code=500, detail="Internal server error: Graph did not complete")
 
     except Exception as e:
-        print(f"API Service: Error processing text chat request for session {session_id}: {e}")
+        log.exception("Text chat request failed", session_id=session_id)
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _run_graph_streaming(initial_state: AgentState, token_queue: asyncio.Queue):
+    """Runs the graph, forwarding node tokens through token_queue.
+
+    The answer node's final text is announced as soon as that node finishes, so the
+    response stream can close while node_update_history is still persisting the turn.
+    """
+    try:
+        async for update in app_langgraph.astream(
+            initial_state,
+            config={"configurable": {"token_queue": token_queue}},
+            stream_mode="updates",
+        ):
+            for node_update in update.values():
+                if node_update and "answer" in node_update:
+                    await token_queue.put(("answer", node_update["answer"]))
+    except Exception as e:
+        log.exception("Streaming graph run failed", session_id=initial_state["session_id"])
+        await token_queue.put(("error", str(e)))
+    finally:
+        await token_queue.put(("end", None))
+
+def _start_graph_stream(initial_state: AgentState) -> asyncio.Queue:
+    """Starts a streaming graph run in the background and returns its token queue."""
+    token_queue: asyncio.Queue = asyncio.Queue()
+    graph_task = asyncio.create_task(_run_graph_streaming(initial_state, token_queue))
+    _background_tasks.add(graph_task)
+    graph_task.add_done_callback(_background_tasks.discard)
+    return token_queue
+
+async def _answer_sentences(initial_state: AgentState, token_queue: Optional[asyncio.Queue] = None,
+                            first_item: Optional[Tuple[str, Any]] = None) -> AsyncIterator[str]:
+    """Yields the assistant answer sentence by sentence while it is being generated.
+    Pass the queue of an already started graph run (and an item already taken from it)
+    to continue from there."""
+    token_queue = token_queue or _start_graph_stream(initial_state)
+    splitter = SentenceSplitter()
+    streamed = False
+    while True:
+        if first_item is not None:
+            (kind, payload), first_item = first_item, None
+        else:
+            kind, payload = await token_queue.get()
+        if kind == "token":
+            streamed = True
+            for sentence in splitter.feed(payload):
+                yield sentence
+        elif kind == "answer":
+            log.debug("Answer", session_id=initial_state["session_id"], preview=payload[:100])
+            if not streamed: # Fixed answers arrive in one piece
+                for sentence in splitter.feed(payload):
+                    yield sentence
+            tail = splitter.flush()
+            if tail:
+                yield tail
+            return
+        else:
+            log.warning("Voice answer stream ended without an answer", session_id=initial_state["session_id"], detail=payload)
+            return
+
+@app_fastapi.post("/chat/stream")
+async def chat_stream_endpoint(request_body: ChatRequest):
+    """Server-Sent Events variant of /chat: emits `token` events as the answer is generated,
+    then a single `done` event carrying the full response."""
+    user_query = request_body.query
+    session_id = request_body.session_id
+    if not session_id:
+        session_id = f"session-{datetime.now(UTC).strftime('%Y%m%d%H%M%S')}"
+
+    log.info("Text query", endpoint="/chat/stream", session_id=session_id, chars=len(user_query))
+    current_span.get().set_attribute("session_id", session_id)
+
+    current_conversation_history = await history_cache.load(session_id, last_n=12)
+
+    initial_state = AgentState(
+        user_query=user_query,
+        rewritten_query="",
+        intent="",
+        conversation_history=current_conversation_history,
+        answer="",
+        session_id=session_id,
+        extracted_appointment_details=None
+    )
+
+    async def event_stream():
+        token_queue = _start_graph_stream(initial_state)
+
+        yield _sse_event("session", {"session_id": session_id})
+        while True:
+            kind, payload = await token_queue.get()
+            if kind == "token":
+                yield _sse_event("token", {"token": payload})
+            elif kind == "answer":
+                # Fixed (non-LLM) answers produce no tokens; `done` always carries the full text.
+                yield _sse_event("done", {"session_id": session_id, "response": payload})
+                return
+            elif kind == "error":
+                yield _sse_event("error", {"detail": payload})
+                return
+            else:
+                yield _sse_event("error", {"detail": "Internal server error: Graph did not complete"})
+                return
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app_fastapi.post("/voice_chat")
 async def voice_chat_endpoint(
+    request: Request,
     audio_file: UploadFile = File(...),
-    session_id: Optional[str] = Form(None)
+    session_id: Optional[str] = Form(None),
+    audio_format: Optional[str] = Form(None) # Reply format (mp3, opus, aac, wav, pcm); else from the Accept header
 ):
+    started = time.perf_counter()
     if not session_id:
         session_id = f"session-{datetime.now(UTC).strftime('%Y%m%d%H%M%S')}"
+    try:
+        reply_format = negotiate_format(audio_format, request.headers.get("accept"))
+    except UnsupportedAudioFormat as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    reply_headers = {"X-Audio-Format": reply_format.name, "Vary": "Accept"}
+    synthesize = functools.partial(cached_tts.synthesize, audio_format=reply_format.provider_format)
 
-    print(f"API Service: Received voice query for session {session_id}")
-
-    user_audio_bytes = await audio_file.read()
-    user_audio_buffer = io.BytesIO(user_audio_bytes)
-    user_audio_buffer.name = audio_file.filename
+    log.info("Voice query", endpoint="/voice_chat", session_id=session_id, reply_format=reply_format.name)
+    current_span.get().set_attribute("session_id", session_id)
 
     try:
-        # Use client from llm.helper or rag.retrieval if needed, or pass it
-        # For now, let's assume client is globally available from rag.retrieval
-        from rag.retrieval import client as openai_client_for_stt # Import the client from rag.retrieval
-
-        transcript = openai_client_for_stt.audio.transcriptions.create(
-            model="whisper-1",
-            file=user_audio_buffer
-        )
-        user_text = transcript.text
-        print(f"API Service: User (STT): {user_text}")
+        # The upload is already spooled (memory, then disk); hand the file over without reading it all
+        with tracer.span("stt", attributes={"voice.provider": VOICE_PROVIDER}) as span:
+            user_text = await stt_provider.transcribe(audio_file.file, audio_file.filename or "audio.webm")
+            span.set_attribute("transcript.chars", len(user_text))
+        log.debug("Transcript", session_id=session_id, text=user_text)
     except Exception as e:
-        print(f"API Service: STT Error: {e}")
+        log.exception("Speech-to-text failed", session_id=session_id)
         raise HTTPException(status_code=500, detail=f"Speech-to-Text failed: {e}")
 
-    current_conversation_history = crud.load_history(session_id, last_n=12) # Use crud.load_history
+    current_conversation_history = await history_cache.load(session_id, last_n=12)
 
     initial_state = AgentState(
         user_query=user_text,
@@ -153,44 +295,270 @@ async def voice_chat_endpoint(
         extracted_appointment_details=None
     )
 
+    async def cached_reply_file(text: str) -> Optional[FileResponse]:
+        # Formats with a stream header (wav) are assembled on the fly, not served from the file
+        cached_path = None if reply_format.header else await tts_cache.lookup(text, reply_format.provider_format)
+        if not cached_path:
+            return None
+        try:
+            size = await asyncio.to_thread(os.path.getsize, cached_path)
+        except OSError: # Evicted by another worker just now
+            return None
+        StreamTiming(reply_format, "file", started).served_file(size)
+        return FileResponse(cached_path, media_type=reply_format.media_type, headers=reply_headers) # sendfile where the server supports it
+
+    if VOICE_TTS_PIPELINE:
+        # Stream the answer, synthesize each sentence as soon as it is complete and
+        # send the audio segments out in order on this single response.
+        token_queue = _start_graph_stream(initial_state)
+        first_item = await token_queue.get()
+        if first_item[0] in ("error", "end"): # The graph failed before producing anything to speak
+            log.error("Voice chat request failed", session_id=session_id, detail=first_item[1])
+            raise HTTPException(status_code=500, detail=first_item[1] or "Internal server error: Graph did not complete")
+        if first_item[0] == "answer": # Fixed reply (template, answer cache): maybe cached as a whole
+            cached_response = await cached_reply_file(first_item[1])
+            if cached_response:
+                log.debug("Answer (cached audio)", session_id=session_id, preview=first_item[1][:100])
+                return cached_response
+        sentences = _answer_sentences(initial_state, token_queue, first_item)
+        speech = pipelined_speech(sentences, synthesize=synthesize)
+        return StreamingResponse(audio_stream(speech, reply_format, StreamTiming(reply_format, "pipeline", started)),
+                                 media_type=reply_format.media_type, headers=reply_headers)
+
     try:
-        final_state_value = app_langgraph.invoke(initial_state)
+        final_state_value = await app_langgraph.ainvoke(initial_state)
 
         if final_state_value:
             assistant_answer = final_state_value["answer"]
-            print(f"API Service: Assistant (Text): {assistant_answer[:100]}...")
+            log.debug("Answer", session_id=session_id, preview=assistant_answer[:100])
         else:
-            print(f"API Service: Error: Graph did not produce a final state for session {session_id}.")
+            log.error("Graph did not produce a final state", session_id=session_id)
             raise HTTPException(status_code=500, detail="Internal server error: Graph did not complete")
 
     except Exception as e:
-        print(f"API Service: Error processing voice chat request for session {session_id}: {e}")
+        log.exception("Voice chat request failed", session_id=session_id)
         raise HTTPException(status_code=500, detail=str(e))
 
+    cached_response = await cached_reply_file(assistant_answer)
+    if cached_response:
+        return cached_response
+
     try:
-        # Use client from llm.helper or rag.retrieval for TTS
-        from rag.retrieval import client as openai_client_for_tts # Import the client from rag.retrieval
-        from config import TTS_MODEL, TTS_VOICE # Import TTS config
-
-        speech_response = openai_client_for_tts.audio.speech.create(
-            model=TTS_MODEL,
-            voice=TTS_VOICE,
-            input=assistant_answer
-        )
-        return StreamingResponse(speech_response.iter_bytes(1024), media_type="audio/mpeg")
+        speech = synthesize(assistant_answer)
+        first_chunk = await anext(speech) # Fail here, before the response starts, if TTS is down
+
+        async def speech_bytes():
+            yield first_chunk
+            async for chunk in speech:
+                yield chunk
+
+        return StreamingResponse(audio_stream(speech_bytes(), reply_format, StreamTiming(reply_format, "stream", started)),
+                                 media_type=reply_format.media_type, headers=reply_headers)
     except Exception as e:
-        print(f"API Service: TTS Error: {e}")
+        log.exception("Text-to-speech failed", session_id=session_id)
         raise HTTPException(status_code=500, detail=f"Text-to-Speech failed: {e}")
 
+@app_fastapi.websocket("/voice/ws")
+async def voice_websocket(websocket: WebSocket, session_id: Optional[str] = None,
+                          audio_format: str = "pcm16", sample_rate: int = 16000,
+                          reply_format: Optional[str] = None):
+    """Full-duplex voice session, one conversation turn per utterance.
+
+    Client -> server: binary messages are audio frames in `audio_format` (pcm16 = raw
+    16-bit mono at `sample_rate`, or a compressed container such as webm/ogg); text
+    messages are JSON controls: {"type": "end"} ends the current utterance now,
+    {"type": "cancel"} stops the reply being spoken.
+    Server -> client: JSON events `session`, `transcript`, `sentence` (answer text as it
+    is spoken), `reply_start`, `reply_end` (with the reply's first-byte and total timings),
+    `interrupted`, `error`, and binary messages carrying the reply audio between
+    reply_start and reply_end, in `reply_format` (mp3, opus, aac, wav, pcm; default from
+    the handshake's Accept header, else AUDIO_DEFAULT_FORMAT).
+
+    The utterance ends on the client's end message, on trailing silence (pcm16) or on a
+    gap in the frames. Audio keeps being received while a reply is spoken; speech that
+    starts during a reply interrupts it (barge-in). For containers with a header (webm,
+    ogg, wav, m4a) the client starts a new recorder for every utterance: frames that don't
+    open with the header while no utterance is in progress are rejected with an `error`
+    event and neither start an utterance nor interrupt the reply.
+    """
+    if not session_id:
+        session_id = f"session-{datetime.now(UTC).strftime('%Y%m%d%H%M%S')}"
+    try:
+        buffer = UtteranceBuffer(audio_format, sample_rate)
+        output_format = negotiate_format(reply_format, websocket.headers.get("accept"))
+    except ValueError as e: # Includes UnsupportedAudioFormat
+        await websocket.close(code=1003, reason=str(e))
+        return
+    detector = EndpointDetector(audio_format, sample_rate)
+    synthesize = functools.partial(cached_tts.synthesize, audio_format=output_format.provider_format)
+    await websocket.accept()
+    await websocket.send_json({"type": "session", "session_id": session_id, "audio_format": audio_format,
+                               "reply_format": output_format.name, "reply_media_type": output_format.media_type})
+    log.info("Voice WebSocket opened", session_id=session_id, audio_format=audio_format, reply_format=output_format.name)
+
+    incoming: asyncio.Queue = asyncio.Queue(maxsize=64) # Backpressure: the socket isn't read faster than frames are buffered
+    reply_task: Optional[asyncio.Task] = None
+
+    async def read_socket():
+        try:
+            while True:
+                message = await websocket.receive()
+                await incoming.put(message)
+                if message["type"] == "websocket.disconnect":
+                    return
+        except Exception:
+            await incoming.put({"type": "websocket.disconnect"})
+
+    async def spoken_sentences(initial_state: AgentState) -> AsyncIterator[str]:
+        async for sentence in _answer_sentences(initial_state):
+            await websocket.send_json({"type": "sentence", "text": sentence})
+            yield sentence
+
+    async def run_turn(audio, filename: str):
+        started = time.perf_counter()
+        try:
+            with audio, tracer.span("stt", attributes={"voice.provider": VOICE_PROVIDER}) as span:
+                user_text = (await stt_provider.transcribe(audio, filename)).strip()
+                span.set_attribute("transcript.chars", len(user_text))
+        except Exception as e:
+            log.exception("Speech-to-text failed", session_id=session_id)
+            await websocket.send_json({"type": "error", "detail": f"Speech-to-Text failed: {e}"})
+            return
+        await websocket.send_json({"type": "transcript", "text": user_text})
+        if not user_text:
+            return
+        log.debug("Transcript", session_id=session_id, text=user_text)
+
+        initial_state = AgentState(
+            user_query=user_text,
+            rewritten_query="",
+            intent="",
+            conversation_history=await history_cache.load(session_id, last_n=12),
+            answer="",
+            session_id=session_id,
+            extracted_appointment_details=None
+        )
+        try:
+            await websocket.send_json({"type": "reply_start"})
+            timing = StreamTiming(output_format, "websocket", started)
+            speech = pipelined_speech(spoken_sentences(initial_state), synthesize=synthesize)
+            async with aclosing(audio_stream(speech, output_format, timing)) as reply_audio:
+                async for chunk in reply_audio:
+                    await websocket.send_bytes(chunk)
+            await websocket.send_json({"type": "reply_end", **timing.as_dict()})
+        except Exception as e: # Usually the client went away mid-reply
+            log.warning("Voice WebSocket reply failed", session_id=session_id, error=str(e))
+
+    async def traced_turn(audio, filename: str):
+        # One trace per turn rather than per connection: a session can stay open for minutes
+        with tracer.start_trace("voice_ws turn", attributes={"session_id": session_id, "url.path": "/voice/ws"}):
+            await run_turn(audio, filename)
+
+    async def stop_reply(notify: bool):
+        nonlocal reply_task
+        if reply_task is not None and not reply_task.done():
+            reply_task.cancel()
+            try:
+                await reply_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            if notify:
+                await websocket.send_json({"type": "interrupted"})
+        reply_task = None
+
+    async def end_utterance():
+        nonlocal reply_task
+        audio, filename = buffer.take()
+        detector.reset()
+        if audio is None:
+            return
+        await stop_reply(notify=True)
+        reply_task = asyncio.create_task(traced_turn(audio, filename))
+
+    rejecting_frames = False # One error per run of headerless frames, not one per frame
+    VOICE_SESSIONS_ACTIVE.inc()
+    reader = asyncio.create_task(read_socket())
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(incoming.get(), timeout=detector.idle_timeout())
+            except asyncio.TimeoutError: # The frames stopped: the caller is done talking
+                await end_utterance()
+                continue
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                frame = message["bytes"]
+                try:
+                    buffer.check_start(frame)
+                except MissingContainerHeader as e:
+                    # A headerless continuation of an earlier recording: not transcribable, and not a barge-in
+                    if not rejecting_frames:
+                        await websocket.send_json({"type": "error", "detail": str(e)})
+                    rejecting_frames = True
+                    continue
+                rejecting_frames = False
+                was_speaking = detector.heard_speech
+                ended = detector.feed(frame)
+                if not detector.heard_speech:
+                    continue # Leading silence is not buffered
+                if not was_speaking:
+                    await stop_reply(notify=True) # Barge-in: the caller started talking over the reply
+                try:
+                    buffer.append(frame)
+                except UtteranceTooLong as e:
+                    buffer.close()
+                    detector.reset()
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+                    continue
+                if ended:
+                    await end_utterance()
+            elif message.get("text") is not None:
+                try:
+                    control = json.loads(message["text"])
+                except json.JSONDecodeError:
+                    await websocket.send_json({"type": "error", "detail": "Control messages must be JSON"})
+                    continue
+                if control.get("type") == "end":
+                    await end_utterance()
+                elif control.get("type") == "cancel":
+                    await stop_reply(notify=True)
+    finally:
+        reader.cancel()
+        await stop_reply(notify=False)
+        buffer.close()
+        VOICE_SESSIONS_ACTIVE.dec()
+        log.info("Voice WebSocket closed", session_id=session_id)
+
+@app_fastapi.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: per-node and per-provider-call latency histograms,
+    token counters by intent and in-flight gauges (observability/metrics.py)."""
+    return Response(registry.render(), media_type=registry.content_type)
+
 @app_fastapi.get("/health")
 async def health_check():
-    # Check Pinecone connection status from rag.retrieval
-    from rag.retrieval import pinecone_index as rag_pinecone_index
-    return {"status": "ok", "pinecone_connected": rag_pinecone_index is not None}
+    # Check vector store status from rag.retrieval
+    from rag.retrieval import vector_store as rag_vector_store
+    from rag.embedding_cache import embedding_cache
+    from rag.answer_cache import answer_cache
+    return {
+        "status": "ok",
+        "vector_store": VECTOR_STORE_BACKEND,
+        "vector_store_connected": rag_vector_store is not None,
+        "embedding_cache": embedding_cache.snapshot_stats(),
+        "answer_cache": answer_cache.snapshot_stats(),
+        "history_cache": history_cache.snapshot_stats(),
+        "appointment_replies": reply_renderer.snapshot_stats(),
+        "tts_cache": tts_cache.snapshot_stats(),
+        "audio_output": audio_timings.snapshot_stats(),
+        "openai": openai_provider.snapshot_stats(),
+        "tracing": tracer.snapshot_stats(),
+    }
 
 
 # --- Main Entry Point for Uvicorn ---
 if __name__ == "__main__":
     import uvicorn
-    print("Starting API Service with Uvicorn...")
+    log.info("Starting API service with Uvicorn")
     uvicorn.run(app_fastapi, host="0.0.0.0", port=int(os.getenv("PORT", 8080)))
\ No newline at end of file
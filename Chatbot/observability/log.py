@@ -0,0 +1,114 @@
+# observability/log.py
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, UTC
+
+from config import LOG_LEVEL, LOG_FORMAT
+
+_ROOT = "chatbot"
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event, then the event's fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """`time LEVEL logger event key=value ...` for reading in a terminal."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = (f"{datetime.fromtimestamp(record.created).strftime('%H:%M:%S.%f')[:-3]} {record.levelname:<7} "
+                f"{record.name} {record.getMessage()}")
+        fields = " ".join(f"{key}={value!r}" if isinstance(value, str) and " " in value else f"{key}={value}"
+                          for key, value in _fields(record).items())
+        if fields:
+            line += " " + fields
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues the record as is: formatting and writing happen on the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class StructuredLogger:
+    """Thin wrapper over a stdlib logger: log.info("event", key=value, ...).
+
+    Disabled levels cost one isEnabledFor() check; enabled records are only put on a
+    queue, so request handlers never wait for formatting or stderr.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    def is_enabled_for(self, level: int) -> bool:
+        return self._logger.isEnabledFor(level)
+
+    def _log(self, level: int, event: str, fields: dict, exc_info=None):
+        if self._logger.isEnabledFor(level):
+            if not _RESERVED.isdisjoint(fields): # e.g. name=..., which LogRecord owns
+                fields = {f"{key}_" if key in _RESERVED else key: value for key, value in fields.items()}
+            self._logger.log(level, event, extra=fields, exc_info=exc_info)
+
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        self._log(logging.WARNING, event, fields)
+
+    def error(self, event: str, exc_info=None, **fields):
+        self._log(logging.ERROR, event, fields, exc_info)
+
+    def exception(self, event: str, **fields):
+        self._log(logging.ERROR, event, fields, exc_info=True)
+
+
+def setup_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT) -> logging.handlers.QueueListener:
+    """Sends every `chatbot.*` logger through a queue to one stderr handler on a
+    background thread."""
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    root = logging.getLogger(_ROOT)
+    root.setLevel(level.upper())
+    root.handlers = [_DeferredQueueHandler(records)]
+    root.propagate = False
+    listener.start()
+    atexit.register(listener.stop) # Drains the queue on exit
+    return listener
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(logging.getLogger(f"{_ROOT}.{name}"))
+
+
+# Instantiate globally for the API service
+log_listener = setup_logging()
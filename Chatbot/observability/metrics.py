@@ -0,0 +1,244 @@
+# observability/metrics.py
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds: local work (a few ms) up to slow LLM completions
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Intent of the graph run the current task is working for; the graph's node wrapper sets
+# it, so LLM calls deep inside a node are counted under the right intent.
+current_intent: ContextVar[str] = ContextVar("current_intent", default="none")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                    for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {} # key -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, (('le', _format_value(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """The process's metrics, rendered in the Prometheus text exposition format (0.0.4).
+
+    Metrics are per process: with several workers, scrape each (or run one worker per
+    container, as the Dockerfile does)."""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Instantiate globally for the API service
+registry = Registry()
+
+GRAPH_NODE_SECONDS = registry.histogram(
+    "chatbot_graph_node_duration_seconds", "Time spent in each LangGraph node.", ["node"])
+EXTERNAL_CALL_SECONDS = registry.histogram(
+    "chatbot_external_call_duration_seconds",
+    "Provider calls (embeddings, vector_query, chat_completion, stt, tts); streams until their first chunk.",
+    ["call", "outcome"])
+LLM_TOKENS = registry.counter(
+    "chatbot_llm_tokens_total", "Prompt and completion tokens by the intent of the turn (routing = before it is known).",
+    ["intent", "type"])
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge(
+    "chatbot_http_requests_in_flight", "HTTP requests being handled, including streaming responses.", ["path"])
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "chatbot_http_request_duration_seconds", "HTTP request duration until the last response byte.",
+    ["path", "method", "status"])
+VOICE_SESSIONS_ACTIVE = registry.gauge(
+    "chatbot_voice_sessions_active", "Open /voice/ws sessions.")
+AUDIO_FIRST_BYTE_SECONDS = registry.histogram(
+    "chatbot_audio_first_byte_seconds", "Time from request (or end of utterance) to the first reply audio byte.",
+    ["format", "source"])
+
+
+def record_token_usage(usage) -> None:
+    """Counts an OpenAI `usage` object under the current intent."""
+    if usage is None:
+        return
+    intent = current_intent.get()
+    LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, intent=intent, type="prompt")
+    LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, intent=intent, type="completion")
+
+
+class MetricsMiddleware:
+    """ASGI middleware: in-flight gauge and duration histogram per HTTP route. Paths that
+    aren't routes of the app are labeled "other", so scanners can't blow up cardinality."""
+
+    def __init__(self, app):
+        self.app = app
+        self._paths: Optional[set] = None
+
+    def _label(self, scope) -> str:
+        if self._paths is None:
+            self._paths = {getattr(route, "path", None) for route in scope["app"].routes} - {None, ""}
+        path = scope["path"]
+        if path in self._paths:
+            return path
+        prefix = "/" + path.lstrip("/").split("/", 1)[0] # Mounted apps, e.g. /static
+        return prefix if prefix in self._paths else "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = self._label(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc(path=path)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec(path=path)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, path=path, method=scope["method"],
+                                         status=str(status["code"]))
@@ -0,0 +1,343 @@
+# observability/tracing.py
+import asyncio
+import atexit
+import json
+import queue
+import random
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from config import (
+    TRACE_EXPORTER, TRACE_FILE, TRACE_OTLP_ENDPOINT, TRACE_SERVICE_NAME, TRACE_SAMPLE_RATIO,
+    TRACE_BATCH_SIZE, TRACE_EXPORT_INTERVAL_SECONDS, TRACE_MAX_QUEUE
+)
+from observability.log import get_logger
+
+log = get_logger("tracing")
+
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL, SPAN_KIND_SERVER, SPAN_KIND_CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class _NonRecordingSpan:
+    """Stands in for a span when the request is not sampled (or tracing is off): every
+    operation is a no-op, and spans started under it are not recorded either."""
+    recording = False
+    trace_id = span_id = None
+
+    @property
+    def root(self):
+        return self
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def add(self, key: str, amount: float):
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        pass
+
+    def set_error(self, message: str):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+
+# The span the current task is working in; tasks created inside a span inherit it
+current_span: ContextVar = ContextVar("current_span", default=NON_RECORDING_SPAN)
+
+
+class Span:
+    """One timed operation of a trace. As a context manager it is the current span while
+    open, so spans started inside it (also in tasks created meanwhile) become its children."""
+    recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, kind: int, trace_id: str, parent_id: Optional[str],
+                 root: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self._tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.root = root or self # The request's (or voice turn's) span
+        self.attributes: Dict[str, Any] = {}
+        self.events: List[tuple] = []
+        self.status = (STATUS_UNSET, "")
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._token = None
+        if attributes:
+            self.set_attributes(attributes)
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def add(self, key: str, amount: float):
+        """Adds to a numeric attribute, e.g. tokens used by several LLM calls."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.events.append((time.time_ns(), name, attributes or {}))
+
+    def set_error(self, message: str):
+        self.status = (STATUS_ERROR, message)
+
+    def __enter__(self):
+        self._token = current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        current_span.reset(self._token)
+        if exc_type is not None:
+            if issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)): # Barge-in, client gone, hedge loser
+                self.set_attribute("cancelled", True)
+            else:
+                self.set_error(f"{exc_type.__name__}: {exc}")
+                self.add_event("exception", {"exception.type": exc_type.__name__, "exception.message": str(exc)})
+        self.end()
+        return False
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self._tracer.exporter.submit(self)
+
+
+# --- OTLP/JSON encoding (opentelemetry-proto ExportTraceServiceRequest, JSON mapping) ---
+def _any_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_any_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: Dict[str, Any]) -> List[dict]:
+    return [{"key": key, "value": _any_value(value)} for key, value in attributes.items()]
+
+
+def _otlp_span(span: Span) -> dict:
+    encoded = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _attributes(span.attributes),
+        "events": [{"timeUnixNano": str(at), "name": name, "attributes": _attributes(attributes)}
+                   for at, name, attributes in span.events],
+        "status": {"code": span.status[0], **({"message": span.status[1]} if span.status[1] else {})},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    return encoded
+
+
+def otlp_request(spans: List[Span], service_name: str = TRACE_SERVICE_NAME) -> dict:
+    return {"resourceSpans": [{
+        "resource": {"attributes": _attributes({"service.name": service_name})},
+        "scopeSpans": [{"scope": {"name": "chatbot"}, "spans": [_otlp_span(span) for span in spans]}],
+    }]}
+
+
+class SpanExporter:
+    """Batches finished spans on a background thread and exports them as OTLP/JSON: one
+    export request per line appended to `path` ("file"), or POSTed to an OTLP/HTTP
+    collector at `endpoint` ("otlp"). Requests only enqueue; when the queue is full
+    (exporter stuck or far behind) spans are dropped and counted instead."""
+
+    _STOP = object()
+
+    def __init__(self, target: str, path: str = TRACE_FILE, endpoint: str = TRACE_OTLP_ENDPOINT,
+                 service_name: str = TRACE_SERVICE_NAME, batch_size: int = TRACE_BATCH_SIZE,
+                 interval: float = TRACE_EXPORT_INTERVAL_SECONDS, max_queue: int = TRACE_MAX_QUEUE):
+        if target not in ("file", "otlp"):
+            raise ValueError(f"Unknown trace exporter '{target}'. Use none, file or otlp.")
+        self.target = target
+        self.path = path
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._client = httpx.Client(timeout=10.0) if target == "otlp" else None
+        self.stats = {"exported": 0, "dropped": 0, "failed": 0}
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, deadline = [], time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                self._export(batch)
+        while True: # Spans that ended while stopping
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                self._export([item])
+
+    def _export(self, spans: List[Span]):
+        payload = json.dumps(otlp_request(spans, self.service_name), separators=(",", ":"))
+        try:
+            if self.target == "file":
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(payload + "\n")
+            else:
+                response = self._client.post(self.endpoint, content=payload, headers={"Content-Type": "application/json"})
+                response.raise_for_status()
+            self.stats["exported"] += len(spans)
+        except Exception as e:
+            self.stats["failed"] += len(spans)
+            log.warning("Trace export failed", target=self.target, spans=len(spans), error=str(e))
+
+    def shutdown(self, timeout: float = 5.0):
+        """Exports what is queued and stops the thread."""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._client is not None:
+            self._client.close()
+
+
+class Tracer:
+    """Starts spans. `start_trace` opens the root span of a request (head sampling happens
+    here); `span` opens a child of the current span, or nothing when there is no sampled
+    trace in progress, so instrumented code outside requests (CLIs, warm-up) costs nothing."""
+
+    def __init__(self, exporter: Optional[SpanExporter], sample_ratio: float = TRACE_SAMPLE_RATIO):
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self._threshold = int(max(0.0, min(1.0, sample_ratio)) * (1 << 64))
+        self.stats = {"traces": 0, "unsampled": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_trace(self, name: str, kind: int = SPAN_KIND_SERVER, attributes: Optional[Dict[str, Any]] = None,
+                    traceparent: Optional[str] = None):
+        if self.exporter is None:
+            return NON_RECORDING_SPAN
+        remote = _TRACEPARENT.match(traceparent.strip().lower()) if traceparent else None
+        if remote: # Continue the caller's trace and follow its sampling decision
+            trace_id, parent_id = remote.group(1), remote.group(2)
+            sampled = bool(int(remote.group(3), 16) & 1)
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = int(trace_id[16:], 16) < self._threshold # Same decision for the same trace id
+        if not sampled:
+            self.stats["unsampled"] += 1
+            return NON_RECORDING_SPAN
+        self.stats["traces"] += 1
+        return Span(self, name, kind, trace_id, parent_id, attributes=attributes)
+
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None):
+        parent = current_span.get()
+        if not parent.recording:
+            return NON_RECORDING_SPAN
+        return Span(self, name, kind, parent.trace_id, parent.span_id, parent.root, attributes)
+
+    def snapshot_stats(self):
+        if self.exporter is None:
+            return {"enabled": False}
+        return {**self.stats, **self.exporter.stats, "enabled": True, "exporter": self.exporter.target,
+                "sample_ratio": self.sample_ratio}
+
+    def shutdown(self):
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+class TracingMiddleware:
+    """ASGI middleware: one server span per HTTP request, named after the matched route
+    ("POST /voice_chat") and continuing the caller's trace when it sends a W3C
+    `traceparent` header. Endpoints add attributes through current_span()."""
+
+    def __init__(self, app, exclude: tuple = ("/metrics", "/health")):
+        self.app = app
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        traceparent = dict(scope["headers"]).get(b"traceparent")
+        span = tracer.start_trace(method, attributes={"http.request.method": method, "url.path": scope["path"]},
+                                  traceparent=traceparent.decode("latin-1") if traceparent else None)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.set_error(f"HTTP {message['status']}")
+            await send(message)
+
+        with span:
+            try:
+                await self.app(scope, receive, send_wrapper if span.recording else send)
+            finally:
+                route = getattr(scope.get("route"), "path", None) # Set by the router
+                if route and span.recording:
+                    span.name = f"{method} {route}"
+                    span.set_attribute("http.route", route)
+
+
+def create_tracer() -> Tracer:
+    return Tracer(None if TRACE_EXPORTER == "none" else SpanExporter(TRACE_EXPORTER))
+
+
+# Instantiate globally for the API service
+tracer = create_tracer()
@@ -0,0 +1,116 @@
+# rag/answer_cache.py
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from config import ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_TTL_SECONDS, ANSWER_CACHE_MAX_ENTRIES
+
+
+class SemanticAnswerCache:
+    """Caches RAG answers by the embedding of the rewritten query.
+
+    A lookup returns a stored answer when its query embedding has cosine similarity of at
+    least `threshold` with the new one. Entries belong to a content version (bumped by
+    the ingestion service after each cycle that changed the index); when the version
+    moves on, every entry is dropped. Entries also expire after `ttl_seconds`, and the
+    least recently used entry is evicted once `max_entries` is reached.
+
+    Each entry also records `conversation`, a digest of the earlier turns the answer was
+    generated with ("" for none); a lookup only matches entries with the same digest.
+
+    Vectors live in one preallocated float32 matrix, so a lookup is a single
+    matrix-vector product.
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_SIMILARITY,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._vectors: Optional[np.ndarray] = None # (max_entries, dim), allocated on first store
+        self._answers: List[Optional[str]] = [None] * max_entries
+        self._conversations = np.full(max_entries, "", dtype=object)
+        self._created_at = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+        self._occupied = np.zeros(max_entries, dtype=bool)
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, version: str):
+        """Drops everything cached for an older content version. Caller holds self._lock."""
+        if version != self._version:
+            if self._occupied.any():
+                self.stats["invalidations"] += 1
+            self._occupied[:] = False
+            self._answers = [None] * self.max_entries
+            self._version = version
+
+    def _expire(self, now: float):
+        """Frees entries older than the TTL. Caller holds self._lock."""
+        expired = self._occupied & (now - self._created_at > self.ttl_seconds)
+        if expired.any():
+            self.stats["expirations"] += int(expired.sum())
+            self._occupied[expired] = False
+            for slot in np.flatnonzero(expired):
+                self._answers[slot] = None
+
+    def lookup(self, embedding: List[float], version: str, conversation: str = "") -> Optional[str]:
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            self._expire(now)
+            candidates = self._occupied & (self._conversations == conversation)
+            if self._vectors is None or not candidates.any():
+                self.stats["misses"] += 1
+                return None
+            scores = self._vectors @ query
+            scores[~candidates] = -np.inf
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.threshold:
+                self.stats["misses"] += 1
+                return None
+            self._last_used[slot] = now
+            self.stats["hits"] += 1
+            return self._answers[slot]
+
+    def store(self, embedding: List[float], answer: str, version: str, conversation: str = ""):
+        vector = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            free = np.flatnonzero(~self._occupied)
+            if free.size:
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._last_used)) # Least recently used
+                self.stats["evictions"] += 1
+            self._vectors[slot] = vector
+            self._answers[slot] = answer
+            self._conversations[slot] = conversation
+            self._created_at[slot] = now
+            self._last_used[slot] = now
+            self._occupied[slot] = True
+
+    def snapshot_stats(self):
+        with self._lock:
+            return {**self.stats, "entries": int(self._occupied.sum()), "content_version": self._version}
+
+
+# Instantiate globally for the API service
+answer_cache = SemanticAnswerCache()
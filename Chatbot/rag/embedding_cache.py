@@ -0,0 +1,160 @@
+# rag/embedding_cache.py
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import (
+    EMBED_CACHE_FILE, EMBED_CACHE_MEMORY_ENTRIES, EMBED_CACHE_DISK_ENTRIES, EMBED_CACHE_DTYPE
+)
+
+# How stale a row's last_used may get before a disk hit refreshes it (saves a write per hit)
+_TOUCH_INTERVAL_SECONDS = 300
+# Once the disk tier is full, evict this fraction of EMBED_CACHE_DISK_ENTRIES below the limit
+# at a time, so the table is counted and trimmed once per batch of inserts, not per insert
+_DISK_EVICTION_BATCH = 0.05
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive form of a query, without trailing punctuation."""
+    return " ".join(text.lower().split()).rstrip("?!. ")
+
+
+class EmbeddingCache:
+    """Two-tier cache for query embeddings keyed by (model, normalized query text).
+
+    Tier 1 is an in-process LRU of float32 vectors. Tier 2 is a SQLite file (WAL mode,
+    so several workers can share it) holding compact float16/float32 blobs that survive
+    restarts. Both tiers are size bounded; evictions are counted in `stats`. The disk
+    tier's row count is tracked as a running estimate (new inserts, plus rows other
+    workers added as of the last recount) and only recounted when it passes the limit.
+    """
+
+    def __init__(
+        self,
+        path: str = EMBED_CACHE_FILE,
+        memory_entries: int = EMBED_CACHE_MEMORY_ENTRIES,
+        disk_entries: int = EMBED_CACHE_DISK_ENTRIES,
+        dtype: str = EMBED_CACHE_DTYPE,
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.dtype = np.dtype(dtype)
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local() # One SQLite connection per thread
+        self.stats = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0,
+            "memory_evictions": 0, "disk_evictions": 0,
+        }
+        self._setup()
+        (self._disk_count,) = self._conn().execute("SELECT COUNT(*) FROM query_embeddings").fetchone()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _setup(self):
+        conn = self._conn()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS query_embeddings (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            dtype TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_used ON query_embeddings(last_used)")
+        conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Inserts into the memory LRU. Caller holds self._lock."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["memory_evictions"] += 1
+
+    def get(self, model: str, text: str, memory_only: bool = False) -> Optional[List[float]]:
+        """Returns the cached embedding, or None. memory_only skips the SQLite tier."""
+        key = self.make_key(model, text)
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return vector.tolist()
+        if memory_only:
+            return None
+
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT dtype, vector, last_used FROM query_embeddings WHERE key = ? AND model = ?", (key, model)
+        ).fetchone()
+        if row is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+
+        dtype, blob, last_used = row
+        vector = np.frombuffer(blob, dtype=np.dtype(dtype)).astype(np.float32)
+        now = time.time()
+        if now - last_used > _TOUCH_INTERVAL_SECONDS:
+            conn.execute("UPDATE query_embeddings SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+        with self._lock:
+            self.stats["disk_hits"] += 1
+            self._remember(key, vector)
+        return vector.tolist()
+
+    def put(self, model: str, text: str, embedding: List[float]):
+        """Stores an embedding in both tiers, evicting least recently used rows beyond the limits."""
+        key = self.make_key(model, text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO query_embeddings (key, model, dtype, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, model, self.dtype.name, vector.astype(self.dtype).tobytes(), time.time())
+        )
+        with self._lock:
+            self._disk_count += 1 # Over-counts replaced rows, which only brings the recount forward
+            full = self._disk_count > self.disk_entries
+        if full:
+            (count,) = conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()
+            evicted = 0
+            if count > self.disk_entries:
+                evicted = min(count, count - self.disk_entries + int(self.disk_entries * _DISK_EVICTION_BATCH))
+                conn.execute(
+                    "DELETE FROM query_embeddings WHERE key IN (SELECT key FROM query_embeddings ORDER BY last_used LIMIT ?)",
+                    (evicted,)
+                )
+            with self._lock:
+                self._disk_count = count - evicted
+                self.stats["disk_evictions"] += evicted
+        conn.commit()
+
+    def snapshot_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, "memory_entries": len(self._memory)}
+
+
+# Instantiate globally for the API service
+embedding_cache = EmbeddingCache()
@@ -1,59 +1,108 @@
 # rag/retrieval.py
-from typing import List, Tuple
-from pinecone import Pinecone
-from openai import OpenAI
+import asyncio
+import time
+from typing import List, Optional, Tuple
 
 # Import constants from config
-from config import PINECONE_API_KEY, PINECONE_ENVIRONMENT, PINECONE_INDEX_NAME, EMBED_MODEL, TOP_K, OPENAI_API_KEY
+from config import (
+    PINECONE_INDEX_NAME, EMBED_MODEL, TOP_K, EMBED_CACHE_ENABLED,
+    CONTENT_VERSION_REFRESH_SECONDS, VECTOR_STORE_BACKEND, LOCAL_VECTOR_STORE_DIR
+)
+from llm.openai_client import openai_provider
+from rag.embedding_cache import embedding_cache
+from observability.log import get_logger
+from observability.metrics import EXTERNAL_CALL_SECONDS
+from observability.tracing import tracer, current_span, SPAN_KIND_CLIENT
+from rag.vector_store import VectorStore, LocalVectorStore, create_pinecone_store
 
-# Instantiate OpenAI client for embeddings
-client = OpenAI(api_key=OPENAI_API_KEY)
+log = get_logger("retrieval")
 
-# Pinecone Client Setup (API Service)
-pinecone_client = None
-pinecone_index = None
+# Vector Store Setup (API Service): Pinecone or the local memory-mapped index
+vector_store: Optional[VectorStore] = None
 
-def initialize_pinecone_api_service():
-    """Initializes Pinecone client and index for the API service."""
-    global pinecone_client, pinecone_index
+def initialize_vector_store():
+    """Initializes the configured vector store backend for the API service."""
+    global vector_store
     try:
-        pinecone_client = Pinecone(api_key=PINECONE_API_KEY, environment=PINECONE_ENVIRONMENT)
-        pinecone_index = pinecone_client.Index(PINECONE_INDEX_NAME)
-        print(f"API Service: Connected to Pinecone index '{PINECONE_INDEX_NAME}'.")
+        if VECTOR_STORE_BACKEND == "local":
+            vector_store = LocalVectorStore(LOCAL_VECTOR_STORE_DIR, read_only=True)
+            log.info("Loaded local vector store", directory=LOCAL_VECTOR_STORE_DIR, vectors=len(vector_store))
+        else:
+            vector_store = create_pinecone_store()
+            log.info("Connected to Pinecone", index=PINECONE_INDEX_NAME)
     except Exception as e:
-        print(f"API Service: Error connecting to Pinecone or getting index: {e}")
-        raise RuntimeError(f"Failed to initialize Pinecone for API service: {e}")
+        log.error("Vector store initialization failed", backend=VECTOR_STORE_BACKEND, error=str(e))
+        raise RuntimeError(f"Failed to initialize vector store for API service: {e}")
+
+async def embed_text(text: str) -> List[float]:
+    """Generates embeddings using OpenAI API, served from the embedding cache when possible."""
+    if EMBED_CACHE_ENABLED:
+        cached = embedding_cache.get(EMBED_MODEL, text, memory_only=True)
+        if cached is None:
+            cached = await asyncio.to_thread(embedding_cache.get, EMBED_MODEL, text)
+        if cached is not None:
+            current_span.get().set_attribute("embedding.cache_hit", True)
+            return cached
 
-def embed_text(text: str) -> List[float]:
-    """Generates embeddings using OpenAI API."""
     try:
-        res = client.embeddings.create(model=EMBED_MODEL, input=text)
-        return res.data[0].embedding
+        res = await openai_provider.embeddings(model=EMBED_MODEL, input=text)
+        embedding = res.data[0].embedding
+        if EMBED_CACHE_ENABLED:
+            await asyncio.to_thread(embedding_cache.put, EMBED_MODEL, text, embedding)
+        return embedding
     except Exception as e:
-        print(f"API Service: Error generating OpenAI embedding: {e}")
+        log.error("Embedding failed", error=str(e))
         raise
 
-def retrieve_top_k(query: str, k: int = TOP_K) -> List[Tuple[float, str, str]]:
-    """Return list[(score, chunk, url)] by querying Pinecone."""
-    if pinecone_index is None:
-        print("[Retrieval] Pinecone index is not initialized.")
+async def retrieve_top_k(query: str, k: int = TOP_K, query_embedding: Optional[List[float]] = None) -> List[Tuple[float, str, str]]:
+    """Return list[(score, chunk, url)] by querying the vector store."""
+    if vector_store is None:
+        log.error("Vector store is not initialized")
         return []
 
-    query_embedding = embed_text(query) # Get embedding for the query
+    if query_embedding is None:
+        query_embedding = await embed_text(query) # Get embedding for the query
 
-    # Query Pinecone
-    query_results = pinecone_index.query(
-        vector=query_embedding,
-        top_k=k,
-        include_metadata=True # Ensure metadata is returned
-    )
+    started, outcome = time.perf_counter(), "error"
+    with tracer.span("vector_query", SPAN_KIND_CLIENT, {"vector_store.backend": VECTOR_STORE_BACKEND, "top_k": k}) as span:
+        try:
+            if vector_store.blocking_io:
+                # Network-backed store (Pinecone SDK is synchronous), so run it off the event loop
+                matches = await asyncio.to_thread(vector_store.query, query_embedding, k)
+            else:
+                matches = vector_store.query(query_embedding, k) # In-process matrix-vector product
+            outcome = "ok"
+        finally:
+            EXTERNAL_CALL_SECONDS.observe(time.perf_counter() - started, call="vector_query", outcome=outcome)
+        if span.recording:
+            span.set_attribute("retrieval.scores", [round(float(score), 4) for score, _ in matches])
+            span.set_attribute("retrieval.sources", [metadata.get("source", "unknown") for _, metadata in matches])
 
     scored = []
-    for match in query_results.matches:
-        score = match.score
-        metadata = match.metadata
+    for score, metadata in matches:
         chunk = metadata.get('text', '') # Retrieve the original text from metadata
         url = metadata.get('source', 'unknown')
         scored.append((score, chunk, url))
 
-    return scored
\ No newline at end of file
+    return scored
+
+# Content version (bumped by the ingestion service after each cycle that changed the index)
+_content_version = {"value": "unversioned", "fetched_at": 0.0}
+
+async def get_content_version() -> str:
+    """Returns the current content version, re-reading it from the vector store at most every
+    CONTENT_VERSION_REFRESH_SECONDS. Falls back to the last known value on errors."""
+    if vector_store is None:
+        return _content_version["value"]
+    now = time.monotonic()
+    if now - _content_version["fetched_at"] < CONTENT_VERSION_REFRESH_SECONDS:
+        return _content_version["value"]
+
+    _content_version["fetched_at"] = now
+    try:
+        version = await asyncio.to_thread(vector_store.get_content_version)
+        if version:
+            _content_version["value"] = version
+    except Exception as e:
+        log.warning("Could not refresh content version", error=str(e))
+    return _content_version["value"]
@@ -0,0 +1,343 @@
+# rag/vector_store.py
+import json
+import os
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    PINECONE_API_KEY, PINECONE_INDEX_NAME, EMBED_DIMENSION, CONTENT_VERSION_NAMESPACE, CONTENT_VERSION_ID,
+    LOCAL_VECTOR_STORE_DIR, LOCAL_VECTOR_STORE_REFRESH_SECONDS
+)
+from observability.log import get_logger
+
+log = get_logger("vector_store")
+
+# A record is {"id": str, "values": List[float], "metadata": {"source": url, "chunk_index": i, "text": chunk}}
+Record = Dict[str, Any]
+
+# Version of LocalVectorStore's on-disk layout, written into every manifest. The chatbot
+# (rag/vector_store.py) and the ingestion service (vector_db/store.py) each carry a copy
+# of this module, since each is built from its own directory: bump it with any layout
+# change, in both copies (Chatbot/local_debug_mode/check_vector_store_format.py checks
+# that they agree). A store refuses generations in a format it doesn't know.
+FORMAT_VERSION = 1
+
+
+class UnsupportedStoreFormat(RuntimeError):
+    pass
+
+
+def _warn(message: str, error: Exception):
+    log.warning(message, error=str(error))
+
+
+class VectorStore(ABC):
+    """Storage backend for chunk embeddings (same interface as the ingestion service's vector_db/store.py)."""
+
+    # True when calls do network I/O and should be run off the event loop
+    blocking_io = True
+
+    @abstractmethod
+    def upsert(self, records: List[Record]):
+        """Inserts or replaces records by id."""
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """Removes the records with the given ids (unknown ids are ignored)."""
+
+    @abstractmethod
+    def delete_by_source(self, source: str):
+        """Removes every record whose metadata source equals `source`."""
+
+    @abstractmethod
+    def query(self, vector: List[float], top_k: int) -> List[Tuple[float, Dict[str, Any]]]:
+        """Returns up to top_k (cosine score, metadata) pairs, best first."""
+
+    @abstractmethod
+    def snapshot(self):
+        """Makes all writes so far durable and visible to readers."""
+
+    @abstractmethod
+    def get_content_version(self) -> Optional[str]:
+        """Version published by the last ingestion cycle that changed the content."""
+
+    @abstractmethod
+    def set_content_version(self, version: str):
+        """Publishes a new content version (visible to readers after snapshot())."""
+
+
+class PineconeVectorStore(VectorStore):
+    """Pinecone index backend. Writes are durable immediately, so snapshot() is a no-op."""
+
+    blocking_io = True
+
+    def __init__(self, index):
+        self.index = index
+
+    def upsert(self, records: List[Record]):
+        self.index.upsert(vectors=records)
+
+    def delete(self, ids: List[str]):
+        for i in range(0, len(ids), 1000): # Pinecone accepts at most 1000 ids per delete
+            self.index.delete(ids=ids[i:i + 1000])
+
+    def delete_by_source(self, source: str):
+        self.index.delete(filter={"source": source})
+
+    def query(self, vector: List[float], top_k: int) -> List[Tuple[float, Dict[str, Any]]]:
+        results = self.index.query(vector=vector, top_k=top_k, include_metadata=True)
+        return [(match.score, match.metadata or {}) for match in results.matches]
+
+    def snapshot(self):
+        pass
+
+    def get_content_version(self) -> Optional[str]:
+        response = self.index.fetch(ids=[CONTENT_VERSION_ID], namespace=CONTENT_VERSION_NAMESPACE)
+        record = response.vectors.get(CONTENT_VERSION_ID)
+        if record is None or not record.metadata:
+            return None
+        return str(record.metadata.get("version"))
+
+    def set_content_version(self, version: str):
+        # Pinecone records need a non-zero vector; the marker is never queried by similarity.
+        marker_vector = [1.0] + [0.0] * (EMBED_DIMENSION - 1)
+        self.index.upsert(
+            vectors=[{"id": CONTENT_VERSION_ID, "values": marker_vector, "metadata": {"version": version}}],
+            namespace=CONTENT_VERSION_NAMESPACE
+        )
+
+
+class LocalVectorStore(VectorStore):
+    """Local backend: normalized float32 vectors in a memory-mapped file.
+
+    Layout under `root`:
+        CURRENT                   name of the live generation
+        gen-<ns>/vectors.f32      row-major float32 matrix (count x dim), L2-normalized
+        gen-<ns>/records.jsonl    one {"id", "metadata"} line per row
+        gen-<ns>/manifest.json    {"format", "dim", "count", "content_version", "created_at"}
+
+    The writer (ingestion) keeps the data in memory and publishes a new immutable
+    generation on snapshot(), switching CURRENT atomically. Readers (chatbot replicas)
+    open the store read-only, memory-map the live generation and pick up new ones
+    within `refresh_seconds`, loading them on a background thread so queries never wait
+    on file I/O. A query is one matrix-vector product plus argpartition.
+    """
+
+    blocking_io = False
+    _KEEP_GENERATIONS = 2 # The live one plus the previous, which readers may still have mapped
+
+    def __init__(self, root: str = LOCAL_VECTOR_STORE_DIR, read_only: bool = False,
+                 dim: int = EMBED_DIMENSION, refresh_seconds: float = LOCAL_VECTOR_STORE_REFRESH_SECONDS):
+        self.root = root
+        self.read_only = read_only
+        self.dim = dim
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._generation: Optional[str] = None
+        self._checked_at = 0.0
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._ids: List[str] = []
+        self._metadata: List[Dict[str, Any]] = []
+        self._rows: Dict[str, int] = {}
+        self._content_version: Optional[str] = None
+        self._rejected: Optional[str] = None # Last generation skipped for an unknown format
+        self._refreshing = False # A background refresh is running
+        os.makedirs(root, exist_ok=True)
+        self._load(self._current_generation())
+
+    # --- Generations ---
+    def _current_generation(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, "CURRENT"), "r") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _load(self, generation: Optional[str]):
+        if generation is None:
+            return
+        path = os.path.join(self.root, generation)
+        with open(os.path.join(path, "manifest.json"), "r") as f:
+            manifest = json.load(f)
+        version = manifest.get("format", 1) # Generations written before the field existed are format 1
+        if version != FORMAT_VERSION:
+            raise UnsupportedStoreFormat(f"Vector store generation '{generation}' has format {version}; "
+                                         f"this service reads format {FORMAT_VERSION}. Deploy matching versions.")
+        count, dim = manifest["count"], manifest["dim"]
+        if count:
+            vectors = np.memmap(os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r", shape=(count, dim))
+        else:
+            vectors = np.zeros((0, dim), dtype=np.float32)
+        ids, metadata = [], []
+        with open(os.path.join(path, "records.jsonl"), "r") as f:
+            for line in f:
+                record = json.loads(line)
+                ids.append(record["id"])
+                metadata.append(record["metadata"])
+
+        with self._lock:
+            # The writer needs a mutable copy; readers keep the read-only mapping.
+            self._vectors = vectors if self.read_only else np.array(vectors)
+            self._ids = ids
+            self._metadata = metadata
+            self._rows = {vector_id: row for row, vector_id in enumerate(ids)}
+            self._content_version = manifest.get("content_version")
+            self.dim = dim
+            self._generation = generation
+
+    def refresh(self):
+        """Switches to a newer generation if the writer has published one. Raises
+        UnsupportedStoreFormat if it was written in a format this copy doesn't know."""
+        generation = self._current_generation()
+        if generation != self._generation:
+            self._load(generation)
+
+    def _maybe_refresh(self):
+        """Every `refresh_seconds`, checks for a new generation on a background thread;
+        reads keep using the loaded generation until the new one is in place."""
+        now = time.monotonic()
+        if not self.read_only or now - self._checked_at < self.refresh_seconds:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        self._checked_at = now
+        threading.Thread(target=self._background_refresh, name="vector-store-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except UnsupportedStoreFormat as e: # Keep serving the generation already loaded
+            if self._rejected != self._current_generation():
+                self._rejected = self._current_generation()
+                _warn("Vector store generation not loaded", e)
+        except Exception as e: # E.g. a generation pruned while being opened; retried next interval
+            _warn("Vector store refresh failed", e)
+        finally:
+            self._refreshing = False
+
+    # --- Writes ---
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("Local vector store is opened read-only.")
+
+    def upsert(self, records: List[Record]):
+        self._check_writable()
+        if not records:
+            return
+        vectors = np.asarray([record["values"] for record in records], dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional vectors, got shape {vectors.shape}.")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        with self._lock:
+            new_rows = []
+            for record, vector in zip(records, vectors):
+                row = self._rows.get(record["id"])
+                if row is None:
+                    self._rows[record["id"]] = len(self._ids) # Row of the vector appended below
+                    new_rows.append(vector)
+                    self._ids.append(record["id"])
+                    self._metadata.append(record.get("metadata", {}))
+                else:
+                    self._vectors[row] = vector
+                    self._metadata[row] = record.get("metadata", {})
+            if new_rows:
+                self._vectors = np.vstack([self._vectors, np.asarray(new_rows, dtype=np.float32)])
+
+    def _delete_rows(self, keep: np.ndarray):
+        """Keeps only rows where `keep` is True. Caller holds self._lock."""
+        self._vectors = self._vectors[keep]
+        self._ids = [vector_id for vector_id, kept in zip(self._ids, keep) if kept]
+        self._metadata = [metadata for metadata, kept in zip(self._metadata, keep) if kept]
+        self._rows = {vector_id: row for row, vector_id in enumerate(self._ids)}
+
+    def delete(self, ids: List[str]):
+        self._check_writable()
+        with self._lock:
+            doomed = {self._rows[vector_id] for vector_id in ids if vector_id in self._rows}
+            if doomed:
+                keep = np.ones(len(self._ids), dtype=bool)
+                keep[list(doomed)] = False
+                self._delete_rows(keep)
+
+    def delete_by_source(self, source: str):
+        self._check_writable()
+        with self._lock:
+            keep = np.array([metadata.get("source") != source for metadata in self._metadata], dtype=bool)
+            if not keep.all():
+                self._delete_rows(keep)
+
+    def set_content_version(self, version: str):
+        self._check_writable()
+        with self._lock:
+            self._content_version = version
+
+    def snapshot(self):
+        self._check_writable()
+        with self._lock:
+            vectors = np.ascontiguousarray(self._vectors, dtype=np.float32)
+            ids, metadata, content_version = list(self._ids), list(self._metadata), self._content_version
+
+        generation = f"gen-{time.time_ns()}"
+        staging = os.path.join(self.root, f".{generation}.tmp")
+        os.makedirs(staging)
+        vectors.tofile(os.path.join(staging, "vectors.f32"))
+        with open(os.path.join(staging, "records.jsonl"), "w") as f:
+            for vector_id, meta in zip(ids, metadata):
+                f.write(json.dumps({"id": vector_id, "metadata": meta}) + "\n")
+        with open(os.path.join(staging, "manifest.json"), "w") as f:
+            json.dump({"format": FORMAT_VERSION, "dim": self.dim, "count": len(ids), "content_version": content_version,
+                       "created_at": time.time()}, f)
+        os.rename(staging, os.path.join(self.root, generation))
+
+        pointer = os.path.join(self.root, "CURRENT.tmp")
+        with open(pointer, "w") as f:
+            f.write(generation)
+        os.replace(pointer, os.path.join(self.root, "CURRENT"))
+        self._generation = generation
+        self._prune()
+
+    def _prune(self):
+        generations = sorted(name for name in os.listdir(self.root) if name.startswith("gen-"))
+        for name in generations[:-self._KEEP_GENERATIONS]:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+    # --- Reads ---
+    def query(self, vector: List[float], top_k: int) -> List[Tuple[float, Dict[str, Any]]]:
+        self._maybe_refresh()
+        with self._lock:
+            vectors, metadata = self._vectors, self._metadata
+        count = vectors.shape[0]
+        if count == 0 or top_k <= 0:
+            return []
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = vectors @ query
+        k = min(top_k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[row]), metadata[row]) for row in top]
+
+    def get_content_version(self) -> Optional[str]:
+        self._maybe_refresh()
+        return self._content_version
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+def create_pinecone_store() -> PineconeVectorStore:
+    from pinecone import Pinecone
+
+    pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
+    return PineconeVectorStore(pinecone_client.Index(PINECONE_INDEX_NAME))
@@ -0,0 +1,246 @@
+# voice/audio_output.py
+import asyncio
+import struct
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional
+
+from config import AUDIO_DEFAULT_FORMAT, AUDIO_FLUSH_MS, AUDIO_MAX_HOLD_MS, AUDIO_TIMING_SAMPLES
+from observability.log import get_logger
+from observability.metrics import AUDIO_FIRST_BYTE_SECONDS
+from observability.tracing import current_span
+
+log = get_logger("audio")
+
+PCM_SAMPLE_RATE = 24000 # OpenAI TTS "pcm" output: 16-bit signed little-endian mono at 24 kHz
+
+
+class UnsupportedAudioFormat(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    name: str              # What the client asked for
+    provider_format: str   # What TTS is asked to produce (and what the TTS cache stores)
+    media_type: str
+    bytes_per_second: int  # Approximate bitrate; only used to size network writes
+    header: bytes = b""    # Sent once before the first audio byte
+
+
+def wav_stream_header(sample_rate: int = PCM_SAMPLE_RATE, channels: int = 1, sample_width: int = 2) -> bytes:
+    """RIFF/WAVE header for a stream of unknown length (sizes set to the maximum, which
+    players treat as "until the end of the stream")."""
+    byte_rate = sample_rate * channels * sample_width
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate, channels * sample_width, sample_width * 8)
+            + b"data" + struct.pack("<I", 0xFFFFFFFF))
+
+
+# Each sentence is synthesized separately and the segments are concatenated: MP3 frames,
+# ADTS AAC frames and chained Ogg Opus streams can simply be appended, but WAV segments
+# each carry their own header, so "wav" is one streaming header followed by raw PCM.
+AUDIO_FORMATS: Dict[str, AudioFormat] = {
+    "mp3": AudioFormat("mp3", "mp3", "audio/mpeg", 16000),
+    "opus": AudioFormat("opus", "opus", "audio/ogg", 4000),
+    "aac": AudioFormat("aac", "aac", "audio/aac", 8000),
+    "wav": AudioFormat("wav", "pcm", "audio/wav", PCM_SAMPLE_RATE * 2, wav_stream_header()),
+    "pcm": AudioFormat("pcm", "pcm", f"audio/pcm;rate={PCM_SAMPLE_RATE};channels=1", PCM_SAMPLE_RATE * 2),
+}
+
+# Accept header media types (parameters stripped, lowercased) -> format name
+_MEDIA_TYPES = {
+    "audio/mpeg": "mp3", "audio/mp3": "mp3",
+    "audio/ogg": "opus", "audio/opus": "opus",
+    "audio/aac": "aac", "audio/x-aac": "aac",
+    "audio/wav": "wav", "audio/wave": "wav", "audio/x-wav": "wav", "audio/vnd.wave": "wav",
+    "audio/pcm": "pcm", "audio/l16": "pcm",
+}
+
+
+def negotiate_format(requested: Optional[str] = None, accept: Optional[str] = None,
+                     default: str = AUDIO_DEFAULT_FORMAT) -> AudioFormat:
+    """Picks the reply format. An explicit format name (form field / query parameter)
+    wins and must be supported; otherwise the Accept header's most preferred supported
+    audio type is used. Wildcards, a missing header or one naming only types we can't
+    produce fall back to `default`, so existing clients keep getting MP3."""
+    if requested:
+        name = requested.strip().lower()
+        if name not in AUDIO_FORMATS:
+            raise UnsupportedAudioFormat(f"Unsupported audio format '{requested}'. Use one of: {', '.join(AUDIO_FORMATS)}")
+        return AUDIO_FORMATS[name]
+
+    best_name, best_q = None, 0.0
+    for item in (accept or "").split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.lower().startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        name = _MEDIA_TYPES.get(media_type.lower())
+        if name and q > best_q: # Ties keep the header's order
+            best_name, best_q = name, q
+    return AUDIO_FORMATS[best_name or default]
+
+
+async def paced_chunks(chunks: AsyncIterator[bytes], audio_format: AudioFormat,
+                       flush_ms: int = AUDIO_FLUSH_MS, max_hold_ms: int = AUDIO_MAX_HOLD_MS) -> AsyncIterator[bytes]:
+    """Regroups provider chunks into network writes sized for time-to-first-byte.
+
+    The first bytes are written the moment they exist. After that, writes grow (doubling
+    from the first chunk's size) up to `flush_ms` of audio at the format's bitrate, so
+    playback starts immediately and the rest of the stream goes out in few, large writes.
+    Buffered audio is never held back longer than `max_hold_ms` waiting for more.
+    """
+    limit = max(512, audio_format.bytes_per_second * flush_ms // 1000)
+    iterator = chunks.__aiter__()
+    buffer = bytearray()
+    target = 0 # 0 until the first write: flush whatever arrives
+    held_since = 0.0
+    pending = asyncio.ensure_future(iterator.__anext__())
+    try:
+        while True:
+            timeout = None
+            if buffer:
+                timeout = max(0.0, held_since + max_hold_ms / 1000 - time.perf_counter())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done: # The provider is slower than playback: send what we have
+                yield bytes(buffer)
+                buffer.clear()
+                continue
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                break
+            pending = asyncio.ensure_future(iterator.__anext__())
+            if not buffer:
+                held_since = time.perf_counter()
+            buffer += chunk
+            if len(buffer) >= target:
+                yield bytes(buffer)
+                target = min(limit, max(target, len(buffer)) * 2)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+    finally:
+        if not pending.done():
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, Exception):
+                pass
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None: # Release the provider's HTTP stream now, not at garbage collection
+            await aclose()
+
+
+class StreamTiming:
+    """First-byte and total-stream timing of one audio reply, measured from `started`
+    (the arrival of the request / end of the utterance, in time.perf_counter() seconds)."""
+
+    def __init__(self, audio_format: AudioFormat, source: str, started: Optional[float] = None):
+        self.audio_format = audio_format
+        self.source = source
+        self.started = started if started is not None else time.perf_counter()
+        self.first_byte_ms: Optional[float] = None
+        self.total_ms: Optional[float] = None
+        self.bytes = 0
+
+    async def wrap(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        complete = False
+        try:
+            async for chunk in chunks:
+                if self.first_byte_ms is None and chunk:
+                    self.first_byte_ms = (time.perf_counter() - self.started) * 1000
+                self.bytes += len(chunk)
+                yield chunk
+            complete = True
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            self.finish(complete)
+
+    def served_file(self, size: int):
+        """For replies handed to the server as a file: both timings are the time until the
+        response was ready, the transfer itself is left to the server (sendfile)."""
+        self.bytes = size
+        self.first_byte_ms = (time.perf_counter() - self.started) * 1000
+        self.finish()
+
+    def finish(self, complete: bool = True):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+        audio_timings.record(self, complete)
+        if self.first_byte_ms is not None:
+            AUDIO_FIRST_BYTE_SECONDS.observe(self.first_byte_ms / 1000, format=self.audio_format.name, source=self.source)
+        log.info("Audio reply", **self.as_dict(), complete=complete)
+        current_span.get().root.set_attributes({ # The request's (or voice turn's) span
+            "audio.format": self.audio_format.name, "audio.source": self.source, "audio.bytes": self.bytes,
+            "audio.first_byte_ms": self.first_byte_ms, "audio.total_ms": self.total_ms, "audio.complete": complete})
+
+    def as_dict(self):
+        return {"format": self.audio_format.name, "source": self.source, "bytes": self.bytes,
+                "first_byte_ms": None if self.first_byte_ms is None else round(self.first_byte_ms, 1),
+                "total_ms": None if self.total_ms is None else round(self.total_ms, 1)}
+
+
+def _percentile(values, fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+
+
+class AudioTimings:
+    """Recent first-byte / total timings per format, for /health."""
+
+    def __init__(self, samples: int = AUDIO_TIMING_SAMPLES):
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._first_byte: Dict[str, deque] = {}
+        self._total: Dict[str, deque] = {}
+        self.stats = {"replies": 0, "interrupted": 0, "bytes": 0}
+
+    def record(self, timing: StreamTiming, complete: bool):
+        name = timing.audio_format.name
+        with self._lock:
+            self.stats["replies"] += 1
+            self.stats["bytes"] += timing.bytes
+            if not complete:
+                self.stats["interrupted"] += 1
+                return
+            if timing.first_byte_ms is not None:
+                self._first_byte.setdefault(name, deque(maxlen=self.samples)).append(timing.first_byte_ms)
+            self._total.setdefault(name, deque(maxlen=self.samples)).append(timing.total_ms)
+
+    def snapshot_stats(self):
+        with self._lock:
+            formats = {
+                name: {"first_byte_ms_p50": _percentile(self._first_byte.get(name), 0.5),
+                       "first_byte_ms_p95": _percentile(self._first_byte.get(name), 0.95),
+                       "total_ms_p50": _percentile(totals, 0.5),
+                       "total_ms_p95": _percentile(totals, 0.95),
+                       "samples": len(totals)}
+                for name, totals in self._total.items()
+            }
+            return {**self.stats, "formats": formats}
+
+
+def audio_stream(chunks: AsyncIterator[bytes], audio_format: AudioFormat, timing: StreamTiming) -> AsyncIterator[bytes]:
+    """The reply as it goes on the wire: format header, paced writes, timed."""
+    async def with_header():
+        header = audio_format.header
+        async for chunk in chunks:
+            if header: # Goes out with the first audio, not as a write of its own
+                chunk, header = header + chunk, b""
+            yield chunk
+    return timing.wrap(paced_chunks(with_header(), audio_format))
+
+
+# Instantiate globally for the API service
+audio_timings = AudioTimings()
@@ -0,0 +1,70 @@
+# voice/providers.py
+from typing import AsyncIterator, BinaryIO
+
+from config import VOICE_PROVIDER, STT_MODEL
+from voice.tts_pipeline import openai_speech_stream
+
+
+class SpeechToText:
+    """Transcribes one complete utterance."""
+
+    async def transcribe(self, audio: BinaryIO, filename: str) -> str:
+        raise NotImplementedError
+
+
+class TextToSpeech:
+    """Synthesizes one piece of text, streaming the audio bytes as they are produced.
+    `audio_format` is an AudioFormat.provider_format (mp3, opus, aac or pcm)."""
+
+    def synthesize(self, text: str, audio_format: str = "mp3") -> AsyncIterator[bytes]:
+        raise NotImplementedError
+
+
+class OpenAISpeechToText(SpeechToText):
+    async def transcribe(self, audio: BinaryIO, filename: str) -> str:
+        from llm.openai_client import openai_provider
+
+        # The file object is streamed into the multipart upload; the name tells Whisper the format
+        transcript = await openai_provider.transcribe(STT_MODEL, audio, filename)
+        return transcript.text
+
+
+class OpenAITextToSpeech(TextToSpeech):
+    def synthesize(self, text: str, audio_format: str = "mp3") -> AsyncIterator[bytes]:
+        return openai_speech_stream(text, audio_format)
+
+
+class LocalSpeechToText(SpeechToText):
+    """Stand-in for tests and local runs without API access: "audio" that is UTF-8 text
+    (what test clients send) transcribes to that text; anything else to a placeholder."""
+
+    async def transcribe(self, audio: BinaryIO, filename: str) -> str:
+        data = audio.read()
+        try:
+            return data.decode("utf-8").strip()
+        except UnicodeDecodeError:
+            return f"[{len(data)} bytes of audio]"
+
+
+class LocalTextToSpeech(TextToSpeech):
+    """Stand-in that "speaks" the UTF-8 bytes of the text in 1 KiB chunks, whatever the format."""
+
+    async def synthesize(self, text: str, audio_format: str = "mp3") -> AsyncIterator[bytes]:
+        data = text.encode("utf-8")
+        for i in range(0, len(data), 1024):
+            yield data[i:i + 1024]
+
+
+_PROVIDERS = {
+    "openai": (OpenAISpeechToText, OpenAITextToSpeech),
+    "local": (LocalSpeechToText, LocalTextToSpeech),
+}
+
+def create_providers(name: str = VOICE_PROVIDER):
+    if name not in _PROVIDERS:
+        raise ValueError(f"Unknown VOICE_PROVIDER '{name}'. Use one of: {', '.join(_PROVIDERS)}")
+    stt_class, tts_class = _PROVIDERS[name]
+    return stt_class(), tts_class()
+
+# Instantiate globally for the API service
+stt_provider, tts_provider = create_providers()
@@ -0,0 +1,226 @@
+# voice/tts_cache.py
+import argparse
+import asyncio
+import hashlib
+import os
+import threading
+import unicodedata
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, BinaryIO, Iterable, List, Optional
+
+from config import (
+    TTS_MODEL, TTS_VOICE, VOICE_PROVIDER, TTS_CACHE_ENABLED, TTS_CACHE_DIR, TTS_CACHE_MAX_MB,
+    TTS_MAX_CONCURRENCY, TTS_WARMUP_PHRASES_FILE, AUDIO_DEFAULT_FORMAT
+)
+from voice.audio_output import AUDIO_FORMATS
+from voice.providers import TextToSpeech, tts_provider
+from observability.log import get_logger
+from observability.tracing import current_span
+
+log = get_logger("tts_cache")
+
+_SUFFIX = ".audio"
+_READ_CHUNK = 64 * 1024
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace and Unicode differences don't change the speech; case and punctuation do."""
+    return unicodedata.normalize("NFC", " ".join(text.split()))
+
+
+class TTSCache:
+    """Size-bounded, content-addressed cache of synthesized audio on disk.
+
+    Each entry is one file named by sha256(provider, TTS_MODEL, TTS_VOICE, audio format,
+    normalized text). Entries are evicted least recently used once the directory holds more than
+    `max_bytes`; hits refresh the file's mtime, so the order survives restarts (the index
+    is rebuilt from mtimes on startup). Files are only ever replaced atomically, so
+    several workers can share one directory; an entry another worker evicted is a miss.
+    """
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_MB * 1024 * 1024,
+                 enabled: bool = TTS_CACHE_ENABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, int]" = OrderedDict() # key -> size, least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "fills": 0, "evictions": 0}
+        if enabled:
+            os.makedirs(directory, exist_ok=True)
+            self._load_index()
+
+    def _load_index(self):
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".tmp"): # Fill interrupted by a crash
+                os.remove(path)
+            elif name.endswith(_SUFFIX):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, name[:-len(_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._bytes += size
+        self._evict()
+
+    def key(self, text: str, audio_format: str = "mp3") -> str:
+        return hashlib.sha256(f"{VOICE_PROVIDER}\0{TTS_MODEL}\0{TTS_VOICE}\0{audio_format}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    async def lookup(self, text: str, audio_format: str = "mp3") -> Optional[str]:
+        """Path of the cached audio for `text` in `audio_format`, or None on a miss."""
+        if not self.enabled:
+            return None
+        key = self.key(text, audio_format)
+        return await asyncio.to_thread(self._lookup, key, self.path(key)) # Disk checks stay off the event loop
+
+    def _lookup(self, key: str, path: str) -> Optional[str]:
+        with self._lock:
+            if key in self._entries and os.path.exists(path):
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return path
+            self.stats["misses"] += 1
+        return None
+
+    async def fill(self, text: str, audio_format: str, audio: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Passes the provider's audio through while writing it to the cache. The entry
+        only appears once the stream completed; an interrupted stream leaves nothing.
+        File operations run in worker threads, like the reads of cache hits."""
+        if not self.enabled:
+            async for chunk in audio:
+                yield chunk
+            return
+        key = self.key(text, audio_format)
+        tmp_path = f"{self.path(key)}.{uuid.uuid4().hex}.tmp"
+        size, complete = 0, False
+        f = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            async for chunk in audio:
+                await asyncio.to_thread(f.write, chunk)
+                size += len(chunk)
+                yield chunk
+            complete = True
+        finally:
+            # Runs to completion in its thread even if this task is cancelled meanwhile
+            await asyncio.to_thread(self._finish_fill, f, key, tmp_path, size if complete else 0)
+
+    def _finish_fill(self, f: BinaryIO, key: str, tmp_path: str, size: int):
+        f.close()
+        if not size:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        os.replace(tmp_path, self.path(key))
+        with self._lock:
+            self._bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self.stats["fills"] += 1
+            self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.stats["evictions"] += 1
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def snapshot_stats(self):
+        with self._lock:
+            return {**self.stats, "enabled": self.enabled, "entries": len(self._entries), "bytes": self._bytes}
+
+
+class CachedTextToSpeech(TextToSpeech):
+    """TextToSpeech that answers from the TTS cache and fills it on misses."""
+
+    def __init__(self, provider: TextToSpeech, cache: TTSCache):
+        self.provider = provider
+        self.cache = cache
+
+    async def synthesize(self, text: str, audio_format: str = "mp3") -> AsyncIterator[bytes]:
+        path = await self.cache.lookup(text, audio_format)
+        if path is not None:
+            try:
+                f = await asyncio.to_thread(open, path, "rb")
+            except FileNotFoundError: # Evicted by another worker just now
+                path = None
+        current_span.get().set_attribute("tts.cache_hit", path is not None)
+        if path is not None:
+            with f:
+                while chunk := await asyncio.to_thread(f.read, _READ_CHUNK):
+                    yield chunk
+            return
+        async for chunk in self.cache.fill(text, audio_format, self.provider.synthesize(text, audio_format)):
+            yield chunk
+
+
+# Instantiate globally for the API service
+tts_cache = TTSCache()
+cached_tts = CachedTextToSpeech(tts_provider, tts_cache)
+
+
+# --- Warm-up: python -m voice.tts_cache [--phrases-file FILE] [--formats mp3 opus ...] ---
+def canned_phrases(phrases_file: Optional[str] = TTS_WARMUP_PHRASES_FILE) -> List[str]:
+    """The fixed appointment replies of the configured locale, plus one phrase per line of
+    `phrases_file` (greetings, hold messages, ...)."""
+    from llm.templates import reply_renderer
+
+    phrases = reply_renderer.static_replies()
+    if phrases_file:
+        with open(phrases_file, encoding="utf-8") as f:
+            phrases += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return phrases
+
+async def warm_up(phrases: Iterable[str], audio_formats: Iterable[str] = ("mp3",),
+                  tts: CachedTextToSpeech = cached_tts, max_concurrency: int = TTS_MAX_CONCURRENCY) -> int:
+    """Synthesizes every phrase not yet cached in each of `audio_formats` (provider
+    formats), both whole (as /voice_chat speaks fixed replies) and sentence by sentence
+    (as the pipelined paths speak them). Returns how many entries were synthesized."""
+    from voice.tts_pipeline import SentenceSplitter
+
+    texts = []
+    for phrase in phrases:
+        splitter = SentenceSplitter()
+        sentences = splitter.feed(phrase + " ")
+        tail = splitter.flush()
+        for text in [phrase, *sentences, *([tail] if tail else [])]:
+            if text not in texts:
+                texts.append(text)
+    missing = [(text, audio_format) for audio_format in dict.fromkeys(audio_formats) for text in texts
+               if not os.path.exists(tts.cache.path(tts.cache.key(text, audio_format)))]
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def synthesize(text: str, audio_format: str):
+        async with semaphore:
+            async for _ in tts.synthesize(text, audio_format):
+                pass
+            log.info("Cached phrase", audio_format=audio_format, text=text[:60])
+
+    await asyncio.gather(*(synthesize(text, audio_format) for text, audio_format in missing))
+    return len(missing)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-synthesize canned phrases into the TTS cache.")
+    parser.add_argument("--phrases-file", default=TTS_WARMUP_PHRASES_FILE, help="Extra phrases, one per line.")
+    parser.add_argument("--formats", nargs="+", default=[AUDIO_DEFAULT_FORMAT], choices=sorted(AUDIO_FORMATS),
+                        help="Reply formats clients negotiate (default: AUDIO_DEFAULT_FORMAT).")
+    args = parser.parse_args()
+    if not tts_cache.enabled:
+        raise SystemExit("TTS_CACHE_ENABLED is false; nothing to warm up.")
+    provider_formats = [AUDIO_FORMATS[name].provider_format for name in args.formats]
+    synthesized = asyncio.run(warm_up(canned_phrases(args.phrases_file), provider_formats))
+    print(f"[TTS Cache] Warm-up done: {synthesized} synthesized, {tts_cache.snapshot_stats()}")
@@ -0,0 +1,113 @@
+# voice/tts_pipeline.py
+import asyncio
+import re
+import time
+from typing import AsyncIterator, Callable, List, Optional
+
+from config import TTS_MODEL, TTS_VOICE, TTS_MAX_CONCURRENCY, TTS_MIN_SENTENCE_CHARS
+from observability.log import get_logger
+from observability.tracing import tracer
+
+log = get_logger("tts")
+
+# End of sentence: terminal punctuation (plus closing quotes/brackets) followed by whitespace.
+_SENTENCE_END = re.compile(r"""[.!?]+["')\]]*\s+""")
+# Tokens that end in a period without ending the sentence.
+_ABBREVIATIONS = ("mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "e.g.", "i.e.", "approx.", "no.")
+
+
+class SentenceSplitter:
+    """Incrementally splits streamed LLM tokens into sentences for TTS.
+
+    Fragments shorter than min_chars are held back and merged with the next sentence,
+    so "Sure!" does not turn into its own TTS request.
+    """
+
+    def __init__(self, min_chars: int = TTS_MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """Adds streamed text and returns the sentences it completed."""
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) < self.min_chars or candidate.lower().endswith(_ABBREVIATIONS):
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Returns whatever is left once the stream has ended."""
+        tail, self._buffer = self._buffer.strip(), ""
+        return tail or None
+
+
+async def openai_speech_stream(text: str, response_format: str = "mp3") -> AsyncIterator[bytes]:
+    """Streams the audio for one piece of text from the OpenAI TTS API, in network-sized
+    chunks (voice/audio_output.py decides how they are grouped into writes)."""
+    from llm.openai_client import openai_provider
+
+    async for chunk in openai_provider.speech_stream(
+        model=TTS_MODEL,
+        voice=TTS_VOICE,
+        input=text,
+        response_format=response_format
+    ):
+        yield chunk
+
+
+async def pipelined_speech(
+    sentences: AsyncIterator[str],
+    synthesize: Callable[[str], AsyncIterator[bytes]] = openai_speech_stream,
+    max_concurrency: int = TTS_MAX_CONCURRENCY,
+) -> AsyncIterator[bytes]:
+    """Overlaps generation, synthesis and playback.
+
+    Each sentence is sent to TTS as soon as it is complete (at most max_concurrency at
+    a time), while later sentences are still being generated. Audio is yielded strictly
+    in sentence order; the segment being played streams through as its bytes arrive and
+    later segments are buffered until their turn.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    segments: asyncio.Queue = asyncio.Queue() # Per-sentence chunk queues, in sentence order
+    tasks = []
+
+    async def synthesize_segment(text: str, chunks: asyncio.Queue):
+        try:
+            async with semaphore:
+                with tracer.span("tts segment", attributes={"tts.chars": len(text)}) as span:
+                    started = time.perf_counter()
+                    async for chunk in synthesize(text):
+                        if started is not None:
+                            span.set_attribute("tts.first_chunk_ms", round((time.perf_counter() - started) * 1000, 1))
+                            started = None
+                        await chunks.put(chunk)
+        except Exception as e:
+            log.error("TTS failed for segment; skipped", segment=text[:40], error=str(e))
+        finally:
+            await chunks.put(None)
+
+    async def schedule_segments():
+        try:
+            async for sentence in sentences:
+                chunks: asyncio.Queue = asyncio.Queue()
+                tasks.append(asyncio.create_task(synthesize_segment(sentence, chunks)))
+                await segments.put(chunks)
+        finally:
+            await segments.put(None)
+
+    scheduler = asyncio.create_task(schedule_segments())
+    try:
+        while (chunks := await segments.get()) is not None:
+            while (chunk := await chunks.get()) is not None:
+                yield chunk
+        await scheduler # Surface errors from the sentence source
+    finally:
+        # Client went away or something failed: stop any synthesis still in flight.
+        for task in [scheduler, *tasks]:
+            task.cancel()
@@ -0,0 +1,158 @@
+# voice/utterance.py
+import tempfile
+import time
+import wave
+from typing import BinaryIO, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    VOICE_WS_SPOOL_MEMORY_BYTES, VOICE_WS_MAX_UTTERANCE_BYTES, VOICE_WS_SILENCE_MS,
+    VOICE_WS_IDLE_GAP_MS, VOICE_WS_ENERGY_THRESHOLD
+)
+
+# Container formats the client may stream, and the file name Whisper needs to recognize
+# them. "pcm16" is raw little-endian 16-bit mono; it is wrapped in a WAV header for STT
+# and is the only format whose frames can be inspected for speech energy.
+AUDIO_FORMATS = {"pcm16": "utterance.wav", "webm": "utterance.webm", "ogg": "utterance.ogg",
+                 "mp3": "utterance.mp3", "wav": "utterance.wav", "m4a": "utterance.m4a"}
+
+# Leading bytes of each container's header: (offset, magic). A recorder writes the header
+# only at the start of its stream, so every utterance in these formats must come from a
+# fresh recorder. mp3 frames decode on their own and pcm16 has no header.
+CONTAINER_HEADERS = {"webm": (0, b"\x1a\x45\xdf\xa3"), "ogg": (0, b"OggS"),
+                     "wav": (0, b"RIFF"), "m4a": (4, b"ftyp")}
+
+
+class UtteranceTooLong(Exception):
+    pass
+
+
+class MissingContainerHeader(Exception):
+    pass
+
+
+class UtteranceBuffer:
+    """Accumulates the audio frames of one utterance.
+
+    Frames go into a SpooledTemporaryFile: up to `memory_bytes` stay in memory, longer
+    utterances spill to a temporary file, and more than `max_bytes` is refused, so a
+    connection never holds more than a bounded amount of audio in memory.
+    """
+
+    def __init__(self, audio_format: str = "pcm16", sample_rate: int = 16000,
+                 memory_bytes: int = VOICE_WS_SPOOL_MEMORY_BYTES, max_bytes: int = VOICE_WS_MAX_UTTERANCE_BYTES):
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f"Unsupported audio format '{audio_format}'. Use one of: {', '.join(AUDIO_FORMATS)}")
+        self.audio_format = audio_format
+        self.sample_rate = sample_rate
+        self.memory_bytes = memory_bytes
+        self.max_bytes = max_bytes
+        self._file = None
+        self.size = 0
+
+    def check_start(self, frame: bytes):
+        """Raises MissingContainerHeader if `frame` would start an utterance without the
+        container header STT needs to decode it (a recorder that kept running across turns)."""
+        if self.size or self.audio_format not in CONTAINER_HEADERS:
+            return
+        offset, magic = CONTAINER_HEADERS[self.audio_format]
+        if frame[offset:offset + len(magic)] != magic:
+            raise MissingContainerHeader(
+                f"Each {self.audio_format} utterance must start with its container header: "
+                "start a new recorder for every utterance")
+
+    def append(self, frame: bytes):
+        self.check_start(frame)
+        if self.size + len(frame) > self.max_bytes:
+            raise UtteranceTooLong(f"Utterance exceeds {self.max_bytes} bytes")
+        if self._file is None:
+            self._file = tempfile.SpooledTemporaryFile(max_size=self.memory_bytes)
+        self._file.write(frame)
+        self.size += len(frame)
+
+    def take(self) -> Tuple[Optional[BinaryIO], str]:
+        """Returns the utterance as a readable file (rewound) with the file name STT should
+        see, and starts a new empty utterance. The caller closes the file."""
+        audio, self._file, size = self._file, None, self.size
+        self.size = 0
+        if audio is None or size == 0:
+            return None, AUDIO_FORMATS[self.audio_format]
+        audio.seek(0)
+        if self.audio_format == "pcm16":
+            wav = tempfile.SpooledTemporaryFile(max_size=self.memory_bytes)
+            with wave.open(wav, "wb") as writer: # Closing the writer leaves `wav` open
+                writer.setnchannels(1)
+                writer.setsampwidth(2)
+                writer.setframerate(self.sample_rate)
+                while chunk := audio.read(65536):
+                    writer.writeframes(chunk)
+            audio.close()
+            audio = wav
+            audio.seek(0)
+        return audio, AUDIO_FORMATS[self.audio_format]
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self.size = 0
+
+
+class EndpointDetector:
+    """Decides when the caller has finished speaking.
+
+    For pcm16 audio, frames whose RMS level exceeds `energy_threshold` count as speech;
+    the utterance ends after `silence_ms` of quiet frames following speech. For
+    compressed formats, whose frames can't be measured, the utterance ends when no frame
+    has arrived for `idle_gap_ms` (clients stop sending while the user is silent). An
+    explicit end message from the client always ends it immediately (handled by the caller).
+    """
+
+    def __init__(self, audio_format: str = "pcm16", sample_rate: int = 16000,
+                 energy_threshold: float = VOICE_WS_ENERGY_THRESHOLD,
+                 silence_ms: int = VOICE_WS_SILENCE_MS, idle_gap_ms: int = VOICE_WS_IDLE_GAP_MS):
+        self.measures_energy = audio_format == "pcm16"
+        self.sample_rate = sample_rate
+        self.energy_threshold = energy_threshold
+        self.silence_ms = silence_ms
+        self.idle_gap_ms = idle_gap_ms
+        self.reset()
+
+    def reset(self):
+        self.heard_speech = False
+        self._silence_ms = 0.0
+        self._last_frame_at: Optional[float] = None
+        self._odd_byte = b""
+
+    def is_speech(self, frame: bytes) -> bool:
+        """True if a pcm16 frame is loud enough to be speech (always True for other formats)."""
+        if not self.measures_energy:
+            return True
+        data = self._odd_byte + frame
+        self._odd_byte = data[-1:] if len(data) % 2 else b""
+        samples = np.frombuffer(data[:len(data) - len(self._odd_byte)], dtype="<i2")
+        if samples.size == 0:
+            return False
+        return float(np.sqrt(np.mean(samples.astype(np.float32) ** 2))) >= self.energy_threshold
+
+    def feed(self, frame: bytes) -> bool:
+        """Processes one incoming frame; returns True when it completes the utterance."""
+        self._last_frame_at = time.monotonic()
+        if not self.measures_energy:
+            self.heard_speech = True
+            return False
+        speech = self.is_speech(frame)
+        if speech:
+            self.heard_speech = True
+            self._silence_ms = 0.0
+        elif self.heard_speech:
+            self._silence_ms += len(frame) / 2 / self.sample_rate * 1000
+        return self.heard_speech and self._silence_ms >= self.silence_ms
+
+    def idle_timeout(self) -> Optional[float]:
+        """Seconds to wait for the next frame before the gap itself ends the utterance
+        (None while nothing has been heard yet)."""
+        if not self.heard_speech or self._last_frame_at is None:
+            return None
+        return max(0.0, self._last_frame_at + self.idle_gap_ms / 1000 - time.monotonic())
@@ -14,13 +14,73 @@ DEALERSHIP_URL = os.getenv("DEALERSHIP_URL", "https://www.stevenscreekchevy.com"
 
 # --- Embedding Model ---
 EMBED_MODEL = "text-embedding-3-small"
+EMBED_DIMENSION = 1536 # Output size of EMBED_MODEL
+EMBED_BATCH_MAX_INPUTS = int(os.getenv("EMBED_BATCH_MAX_INPUTS", 256)) # Chunks per embeddings request (API limit is 2048)
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", 200000)) # Estimated tokens per request (API limit is 300k)
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", 4)) # Embedding requests in flight at once
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", 5)) # Retries per batch on rate-limit / transient errors
+
+# --- OpenAI Client (vector_db/openai_client.py) ---
+# One pooled HTTP client for all embedding requests; transient errors are retried with
+# jittered exponential backoff (Retry-After is honored, up to OPENAI_RETRY_MAX_SECONDS)
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", EMBED_MAX_CONCURRENCY * 2))
+OPENAI_KEEPALIVE_SECONDS = float(os.getenv("OPENAI_KEEPALIVE_SECONDS", 30)) # Idle connections are closed after this
+OPENAI_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", 5))
+OPENAI_EMBED_TIMEOUT_SECONDS = float(os.getenv("OPENAI_EMBED_TIMEOUT_SECONDS", 60)) # Batches of up to EMBED_BATCH_MAX_TOKENS
+OPENAI_RETRY_BASE_SECONDS = float(os.getenv("OPENAI_RETRY_BASE_SECONDS", 0.5))
+OPENAI_RETRY_MAX_SECONDS = float(os.getenv("OPENAI_RETRY_MAX_SECONDS", 30))
+
+# --- Content Version ---
+# Bumped after every ingestion cycle that changed the index; the chatbot keys its
+# semantic answer cache on it. Stored as a marker record in its own Pinecone namespace.
+CONTENT_VERSION_NAMESPACE = os.getenv("CONTENT_VERSION_NAMESPACE", "meta")
+CONTENT_VERSION_ID = "content-version"
+
+# --- Vector Store ---
+# "pinecone" or "local" (memory-mapped NumPy index under LOCAL_VECTOR_STORE_DIR,
+# loaded read-only by the chatbot replicas from the same shared path)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")
+LOCAL_VECTOR_STORE_DIR = os.getenv("LOCAL_VECTOR_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "local_vector_store"))
+LOCAL_VECTOR_STORE_REFRESH_SECONDS = int(os.getenv("LOCAL_VECTOR_STORE_REFRESH_SECONDS", 30))
+
+# --- Page Fetching ---
+FETCH_MAX_WORKERS = int(os.getenv("FETCH_MAX_WORKERS", 8)) # Concurrent page fetches (also the keep-alive pool size)
+FETCH_PER_HOST_CONCURRENCY = int(os.getenv("FETCH_PER_HOST_CONCURRENCY", 4)) # Politeness limit per host
+FETCH_QUEUE_SIZE = int(os.getenv("FETCH_QUEUE_SIZE", 16)) # Fetched pages waiting to be parsed/embedded
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", 10))
+FETCH_USER_AGENT = os.getenv("FETCH_USER_AGENT", "DealershipIngestionBot/1.0")
+
+# --- Crawling ---
+# Paths always seeded into the crawl frontier, in addition to the root and sitemap.xml
+CRAWL_SEED_PATHS = [
+    "/service-parts-specials.html",
+    "/ev-incentives",
+    "/newspecials.html",
+    "/usedspecials.html",
+    "/black-friday-car-deals-san-jose",
+    "/contactus.aspx",
+    "/fleet-vehicles",
+    "/under-15k.html",
+]
+CRAWL_MAX_PAGES_PER_CYCLE = int(os.getenv("CRAWL_MAX_PAGES_PER_CYCLE", 2000)) # Crawl budget; the rest waits for the next cycle
+CRAWL_MAX_DEPTH = int(os.getenv("CRAWL_MAX_DEPTH", 5)) # Link hops from the root / sitemap entries
+CRAWL_BATCH_SIZE = int(os.getenv("CRAWL_BATCH_SIZE", 32)) # URLs claimed from the frontier at a time
+CRAWL_MAX_SITEMAP_URLS = int(os.getenv("CRAWL_MAX_SITEMAP_URLS", 50000))
+# Path keywords crawled first at equal depth, most important first
+CRAWL_PRIORITY_SECTIONS = [s.strip() for s in os.getenv(
+    "CRAWL_PRIORITY_SECTIONS", "new-vehicles,used-vehicles,inventory,specials,service,parts,finance"
+).split(",") if s.strip()]
 
 # --- Ingestion Interval (Informational for Cloud Run) ---
 INGESTION_INTERVAL_MINUTES = 15
 
+# --- Ingestion Jobs ---
+JOB_COUNTER_FLUSH_SECONDS = float(os.getenv("JOB_COUNTER_FLUSH_SECONDS", 5)) # How often a running job's counters are saved
+
 # --- Database Configuration ---
 # For Cloud Run, DB_FILE will be set to /tmp/embeddings.db via env var
 # For local, it will default to a file in the script's directory.
 # Adjust path based on where this config.py is relative to your project root.
 # Assuming this config.py is in data_ingestion_service/
-DB_FILE = os.getenv("DB_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "local_ingestion_db.db"))
\ No newline at end of file
+DB_FILE = os.getenv("DB_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "local_ingestion_db.db"))
+DB_BUSY_TIMEOUT_SECONDS = float(os.getenv("DB_BUSY_TIMEOUT_SECONDS", 30)) # Wait for the write lock before failing
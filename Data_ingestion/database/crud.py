@@ -1,17 +1,38 @@
 # data_ingestion_service/database/crud.py
 import sqlite3
-from typing import List, Dict
+import threading
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime, UTC
 
 # Import DB_FILE from config
-from config import DB_FILE
+from config import DB_FILE, DB_BUSY_TIMEOUT_SECONDS
 
-# Global connection and cursor
-conn = sqlite3.connect(DB_FILE, check_same_thread=False)
-cur = conn.cursor()
+# One connection per thread: the ingestion worker writes pages and the frontier while
+# the /ingest handlers read from FastAPI's threadpool. WAL lets those readers proceed
+# during the worker's writes, and a writer waits up to DB_BUSY_TIMEOUT_SECONDS for the lock.
+_local = threading.local()
+
+def get_conn() -> sqlite3.Connection:
+    """Returns this thread's connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_FILE, timeout=DB_BUSY_TIMEOUT_SECONDS)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL") # Durable at checkpoints; safe against corruption with WAL
+        _local.conn = conn
+    return conn
+
+def _add_column_if_missing(table: str, column: str, definition: str):
+    """Adds a column to an existing table (databases created before the column existed)."""
+    cur = get_conn().cursor()
+    columns = {row[1] for row in cur.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
 
 def setup_db():
-    """Creates tables for scraped pages if they don't exist."""
+    """Creates tables for scraped pages and their indexed chunks if they don't exist."""
+    conn = get_conn()
+    cur = conn.cursor()
     cur.execute("""
     CREATE TABLE IF NOT EXISTS scraped_pages (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -20,18 +41,80 @@ def setup_db():
         scraped_at TEXT
     )
     """)
+    _add_column_if_missing("scraped_pages", "page_hash", "TEXT")
+    # HTTP validators from the last fetch, sent back as If-None-Match / If-Modified-Since
+    _add_column_if_missing("scraped_pages", "etag", "TEXT")
+    _add_column_if_missing("scraped_pages", "last_modified", "TEXT")
+    # One row per vector currently in the vector store for a page
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS page_chunks (
+        url TEXT NOT NULL,
+        vector_id TEXT NOT NULL,
+        chunk_hash TEXT NOT NULL,
+        PRIMARY KEY (url, vector_id)
+    )
+    """)
     conn.commit()
 
 def get_last_scraped_time(url: str) -> str | None:
     """Retrieves the last scraped timestamp for a given URL."""
+    cur = get_conn().cursor()
     cur.execute("SELECT scraped_at FROM scraped_pages WHERE url = ? ORDER BY scraped_at DESC LIMIT 1", (url,))
     result = cur.fetchone()
     return result[0] if result else None
 
-def save_scraped_page(url: str, raw_text: str):
-    """Saves or updates a scraped page record."""
-    cur.execute("INSERT OR REPLACE INTO scraped_pages (url, raw_text, scraped_at) VALUES (?, ?, ?)",
-                (url, raw_text, datetime.now(UTC).isoformat()))
+def get_page_hash(url: str) -> Optional[str]:
+    """Retrieves the content hash of the last indexed version of a page."""
+    cur = get_conn().cursor()
+    cur.execute("SELECT page_hash FROM scraped_pages WHERE url = ?", (url,))
+    result = cur.fetchone()
+    return result[0] if result else None
+
+def get_page_chunks(url: str) -> Dict[str, str]:
+    """Returns {vector_id: chunk_hash} for the vectors currently indexed for a page."""
+    cur = get_conn().cursor()
+    cur.execute("SELECT vector_id, chunk_hash FROM page_chunks WHERE url = ?", (url,))
+    return dict(cur.fetchall())
+
+def get_page_validators(urls: List[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """Returns {url: (etag, last_modified)} for the given URLs that have been fetched before."""
+    cur = get_conn().cursor()
+    validators = {}
+    for url in urls:
+        cur.execute("SELECT etag, last_modified FROM scraped_pages WHERE url = ?", (url,))
+        result = cur.fetchone()
+        if result and (result[0] or result[1]):
+            validators[url] = (result[0], result[1])
+    return validators
+
+def touch_scraped_page(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+    """Marks an unchanged page as freshly scraped without rewriting it (refreshing validators if given)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""UPDATE scraped_pages SET scraped_at = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                   WHERE url = ?""", (datetime.now(UTC).isoformat(), etag, last_modified, url))
+    conn.commit()
+
+def save_scraped_page(url: str, raw_text: str, page_hash: Optional[str] = None, chunks: Optional[Dict[str, str]] = None,
+                      etag: Optional[str] = None, last_modified: Optional[str] = None):
+    """Saves or updates a scraped page record and, if given, its {vector_id: chunk_hash} map."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("""INSERT OR REPLACE INTO scraped_pages (url, raw_text, scraped_at, page_hash, etag, last_modified)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (url, raw_text, datetime.now(UTC).isoformat(), page_hash, etag, last_modified))
+    if chunks is not None:
+        cur.execute("DELETE FROM page_chunks WHERE url = ?", (url,))
+        cur.executemany("INSERT INTO page_chunks (url, vector_id, chunk_hash) VALUES (?, ?, ?)",
+                        [(url, vector_id, chunk_hash) for vector_id, chunk_hash in chunks.items()])
+    conn.commit()
+
+def delete_scraped_page(url: str):
+    """Forgets a page and its indexed chunks (the page is gone or no longer indexable)."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM page_chunks WHERE url = ?", (url,))
+    cur.execute("DELETE FROM scraped_pages WHERE url = ?", (url,))
     conn.commit()
 
 # Initialize DB on module import
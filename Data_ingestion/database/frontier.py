@@ -0,0 +1,98 @@
+# data_ingestion_service/database/frontier.py
+from datetime import datetime, UTC
+from typing import Dict, Iterable, List, Tuple
+
+# Uses the ingestion service's per-thread SQLite connections
+from database.crud import get_conn
+
+# Frontier states: pending -> in_progress -> indexing | removing | failed, then
+# indexing -> done and removing -> gone once the cycle has saved its pages (complete_cycle).
+# in_progress, indexing and removing rows left by an interrupted cycle go back to pending.
+# A crawl "pass" visits every known URL once and may span several ingestion cycles
+# (each cycle has a page budget). When nothing is pending, the next cycle starts a new pass;
+# gone URLs (404/410) are not requeued.
+
+
+def setup_frontier():
+    """Creates the crawl frontier table if it doesn't exist."""
+    conn = get_conn()
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS crawl_frontier (
+        url TEXT PRIMARY KEY,
+        depth INTEGER NOT NULL,
+        priority INTEGER NOT NULL,
+        state TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        discovered_at TEXT,
+        updated_at TEXT
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_crawl_frontier_next ON crawl_frontier (state, priority, depth)")
+    conn.commit()
+
+def add_urls(entries: Iterable[Tuple[str, int, int]]) -> int:
+    """Adds (url, depth, priority) entries; known URLs keep their state but take the
+    smaller depth/priority if found again closer to the root. Returns rows touched."""
+    conn = get_conn()
+    now = datetime.now(UTC).isoformat()
+    cursor = conn.executemany("""
+        INSERT INTO crawl_frontier (url, depth, priority, state, discovered_at, updated_at)
+        VALUES (?, ?, ?, 'pending', ?, ?)
+        ON CONFLICT(url) DO UPDATE SET
+            depth = MIN(depth, excluded.depth),
+            priority = MIN(priority, excluded.priority)
+        WHERE excluded.depth < crawl_frontier.depth OR excluded.priority < crawl_frontier.priority
+    """, [(url, depth, priority, now, now) for url, depth, priority in entries])
+    conn.commit()
+    return cursor.rowcount
+
+def claim_batch(limit: int) -> List[Tuple[str, int]]:
+    """Marks up to `limit` pending URLs (best priority first) in_progress and returns (url, depth)."""
+    conn = get_conn()
+    rows = conn.execute(
+        "SELECT url, depth FROM crawl_frontier WHERE state = 'pending' ORDER BY priority, depth, url LIMIT ?",
+        (limit,)
+    ).fetchall()
+    now = datetime.now(UTC).isoformat()
+    conn.executemany("UPDATE crawl_frontier SET state = 'in_progress', updated_at = ? WHERE url = ?",
+                     [(now, url) for url, _ in rows])
+    conn.commit()
+    return rows
+
+def mark_url(url: str, state: str):
+    """Records the outcome of a claimed URL ('done', 'failed', 'indexing' or 'removing')."""
+    conn = get_conn()
+    conn.execute("""UPDATE crawl_frontier SET state = ?, updated_at = ?,
+                    attempts = attempts + CASE WHEN ? = 'failed' THEN 1 ELSE 0 END WHERE url = ?""",
+                 (state, datetime.now(UTC).isoformat(), state, url))
+    conn.commit()
+
+def complete_cycle() -> int:
+    """Marks the URLs this cycle fetched done (or gone), once their pages are saved. Returns how many."""
+    conn = get_conn()
+    cursor = conn.execute("""UPDATE crawl_frontier SET state = CASE state WHEN 'removing' THEN 'gone' ELSE 'done' END,
+                             updated_at = ? WHERE state IN ('indexing', 'removing')""", (datetime.now(UTC).isoformat(),))
+    conn.commit()
+    return cursor.rowcount
+
+def recover_in_progress() -> int:
+    """Returns URLs an interrupted cycle claimed or fetched without saving to pending. Returns how many."""
+    conn = get_conn()
+    cursor = conn.execute("UPDATE crawl_frontier SET state = 'pending' WHERE state IN ('in_progress', 'indexing', 'removing')")
+    conn.commit()
+    return cursor.rowcount
+
+def pending_count() -> int:
+    return get_conn().execute("SELECT COUNT(*) FROM crawl_frontier WHERE state = 'pending'").fetchone()[0]
+
+def start_new_pass():
+    """Queues every known URL again for a fresh pass over the site."""
+    conn = get_conn()
+    conn.execute("UPDATE crawl_frontier SET state = 'pending' WHERE state IN ('done', 'failed')")
+    conn.commit()
+
+def state_counts() -> Dict[str, int]:
+    return dict(get_conn().execute("SELECT state, COUNT(*) FROM crawl_frontier GROUP BY state").fetchall())
+
+# Initialize table on module import
+setup_frontier()
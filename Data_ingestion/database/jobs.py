@@ -0,0 +1,134 @@
+# data_ingestion_service/database/jobs.py
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, UTC
+from typing import Any, Dict, List, Optional
+
+from config import DB_FILE, DB_BUSY_TIMEOUT_SECONDS
+
+# Job states: queued -> running -> succeeded | failed
+ACTIVE_STATES = ("queued", "running")
+
+# The API handlers read job status while the worker thread writes it, so each thread
+# gets its own connection (WAL lets readers proceed during the worker's writes).
+_local = threading.local()
+
+
+def _conn() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_FILE, timeout=DB_BUSY_TIMEOUT_SECONDS)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        _local.conn = conn
+    return conn
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+def setup_jobs():
+    """Creates tables for ingestion jobs and their per-URL progress if they don't exist."""
+    conn = _conn()
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS ingestion_jobs (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        trigger TEXT,
+        created_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT,
+        error TEXT,
+        counters TEXT NOT NULL DEFAULT '{}'
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS ingestion_job_pages (
+        job_id TEXT NOT NULL,
+        url TEXT NOT NULL,
+        status TEXT NOT NULL,
+        detail TEXT,
+        started_at TEXT,
+        finished_at TEXT,
+        PRIMARY KEY (job_id, url)
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs (status, created_at)")
+    conn.commit()
+
+def create_job(trigger: str) -> str:
+    job_id = uuid.uuid4().hex
+    conn = _conn()
+    conn.execute("INSERT INTO ingestion_jobs (id, status, trigger, created_at) VALUES (?, 'queued', ?, ?)",
+                 (job_id, trigger, _now()))
+    conn.commit()
+    return job_id
+
+def get_active_job() -> Optional[str]:
+    """Returns the id of the queued or running job, if any (oldest first)."""
+    row = _conn().execute(
+        "SELECT id FROM ingestion_jobs WHERE status IN (?, ?) ORDER BY created_at LIMIT 1", ACTIVE_STATES
+    ).fetchone()
+    return row["id"] if row else None
+
+def mark_job_running(job_id: str):
+    conn = _conn()
+    conn.execute("UPDATE ingestion_jobs SET status = 'running', started_at = ? WHERE id = ?", (_now(), job_id))
+    conn.commit()
+
+def finish_job(job_id: str, counters: Dict[str, int], error: Optional[str] = None):
+    conn = _conn()
+    conn.execute("UPDATE ingestion_jobs SET status = ?, finished_at = ?, error = ?, counters = ? WHERE id = ?",
+                 ("failed" if error else "succeeded", _now(), error, json.dumps(counters), job_id))
+    conn.commit()
+
+def save_counters(job_id: str, counters: Dict[str, int]):
+    conn = _conn()
+    conn.execute("UPDATE ingestion_jobs SET counters = ? WHERE id = ?", (json.dumps(counters), job_id))
+    conn.commit()
+
+def record_page(job_id: str, url: str, status: str, detail: Optional[str] = None, started_at: Optional[str] = None):
+    """Inserts or updates the progress row of one URL within a job."""
+    conn = _conn()
+    conn.execute("""
+        INSERT INTO ingestion_job_pages (job_id, url, status, detail, started_at, finished_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(job_id, url) DO UPDATE SET status = excluded.status, detail = excluded.detail,
+            finished_at = excluded.finished_at
+    """, (job_id, url, status, detail, started_at or _now(), None if status == "processing" else _now()))
+    conn.commit()
+
+def recover_interrupted_jobs() -> List[str]:
+    """Fails jobs left running by a killed instance and returns queued job ids to re-enqueue."""
+    conn = _conn()
+    conn.execute("UPDATE ingestion_jobs SET status = 'failed', finished_at = ?, error = 'Interrupted by shutdown' "
+                 "WHERE status = 'running'", (_now(),))
+    conn.commit()
+    return [row["id"] for row in conn.execute("SELECT id FROM ingestion_jobs WHERE status = 'queued' ORDER BY created_at")]
+
+def get_job(job_id: str, recent_pages: int = 0) -> Optional[Dict[str, Any]]:
+    """Job status with timings, counters, per-URL status totals and optionally the most recent URLs."""
+    conn = _conn()
+    row = conn.execute("SELECT * FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job["counters"] = json.loads(job["counters"] or "{}")
+    end = job["finished_at"] or _now()
+    job["duration_seconds"] = (
+        (datetime.fromisoformat(end) - datetime.fromisoformat(job["started_at"])).total_seconds()
+        if job["started_at"] else None
+    )
+    job["pages_by_status"] = dict(conn.execute(
+        "SELECT status, COUNT(*) FROM ingestion_job_pages WHERE job_id = ? GROUP BY status", (job_id,)
+    ).fetchall())
+    if recent_pages:
+        job["recent_pages"] = [dict(page) for page in conn.execute(
+            "SELECT url, status, detail, started_at, finished_at FROM ingestion_job_pages WHERE job_id = ? "
+            "ORDER BY started_at DESC LIMIT ?", (job_id, recent_pages)
+        )]
+    return job
+
+# Initialize tables on module import
+setup_jobs()
@@ -0,0 +1,97 @@
+# data_ingestion_service/jobs/worker.py
+import queue
+import threading
+import time
+import traceback
+from collections import defaultdict
+from datetime import datetime, UTC
+from typing import Callable, Dict, Optional, Tuple
+
+from config import JOB_COUNTER_FLUSH_SECONDS
+from database import jobs as db_jobs
+
+
+class CycleProgress:
+    """Counters for one ingestion cycle. perform_ingestion_cycle reports every page here;
+    this base class only counts, JobProgress also records per-URL rows for the status API."""
+
+    def __init__(self):
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    def page_started(self, url: str):
+        pass
+
+    def page_finished(self, url: str, status: str, detail: Optional[str] = None):
+        self.counters[f"pages_{status}"] += 1
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+
+class JobProgress(CycleProgress):
+    """Persists per-URL progress and (periodically) the counters of a running job."""
+
+    def __init__(self, job_id: str):
+        super().__init__()
+        self.job_id = job_id
+        self._page_started_at: Dict[str, str] = {}
+        self._flushed_at = time.monotonic()
+
+    def page_started(self, url: str):
+        self._page_started_at[url] = datetime.now(UTC).isoformat()
+        db_jobs.record_page(self.job_id, url, "processing", started_at=self._page_started_at[url])
+
+    def page_finished(self, url: str, status: str, detail: Optional[str] = None):
+        super().page_finished(url, status, detail)
+        db_jobs.record_page(self.job_id, url, status, detail, self._page_started_at.pop(url, None))
+        if time.monotonic() - self._flushed_at >= JOB_COUNTER_FLUSH_SECONDS:
+            self._flushed_at = time.monotonic()
+            db_jobs.save_counters(self.job_id, self.counters)
+
+
+class IngestionJobRunner:
+    """Runs ingestion cycles as background jobs on a single worker thread.
+
+    submit() returns immediately with a job id. While a job is queued or running, further
+    triggers coalesce into it instead of starting another cycle, so at most one cycle
+    touches the crawl frontier and vector store at a time.
+    """
+
+    def __init__(self, run_cycle: Callable[[CycleProgress], Dict[str, int]]):
+        self.run_cycle = run_cycle
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._submit_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        for job_id in db_jobs.recover_interrupted_jobs():
+            self._queue.put(job_id)
+        self._thread = threading.Thread(target=self._work, name="ingestion-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, trigger: str) -> Tuple[str, bool]:
+        """Returns (job id, True if coalesced into an already active job)."""
+        with self._submit_lock:
+            active = db_jobs.get_active_job()
+            if active:
+                return active, True
+            job_id = db_jobs.create_job(trigger)
+            self._queue.put(job_id)
+            return job_id, False
+
+    def _work(self):
+        while True:
+            job_id = self._queue.get()
+            print(f"Ingestion Service: Job {job_id} started.")
+            db_jobs.mark_job_running(job_id)
+            progress = JobProgress(job_id)
+            try:
+                self.run_cycle(progress)
+                db_jobs.finish_job(job_id, progress.counters)
+                print(f"Ingestion Service: Job {job_id} succeeded: {dict(progress.counters)}")
+            except Exception as e:
+                traceback.print_exc()
+                db_jobs.finish_job(job_id, progress.counters, error=str(e))
+                print(f"Ingestion Service: Job {job_id} failed: {e}")
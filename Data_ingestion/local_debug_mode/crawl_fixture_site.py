@@ -0,0 +1,108 @@
+# local_debug/crawl_fixture_site.py
+#
+# Runs the crawler against a generated static dealership site served from a local
+# http.server, so the frontier (seeding, dedup, robots, budget, resume) can be checked
+# without the real site. Pages are crawled but not embedded.
+#
+# The fixture has a robots.txt that disallows /private/, a sitemap.xml listing the model
+# pages, and inventory pages linked from listing pages (with tracking parameters and
+# fragments to exercise URL normalization).
+#
+# Usage:
+#   python local_debug_mode/crawl_fixture_site.py --vehicles 500 --budget 200
+#   python local_debug_mode/crawl_fixture_site.py --kill-after 50   # abandon the first cycle, then resume
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+_workdir = tempfile.mkdtemp(prefix="crawl_fixture_")
+_port = int(os.environ.get("FIXTURE_PORT", 8765))
+os.environ.setdefault("OPENAI_API_KEY", "sk-fixture")
+os.environ.setdefault("DB_FILE", os.path.join(_workdir, "ingestion.db"))
+os.environ["DEALERSHIP_URL"] = f"http://127.0.0.1:{_port}"
+
+
+def build_site(root: str, vehicles: int, per_listing: int = 25):
+    def write(path: str, body: str):
+        full = os.path.join(root, path.lstrip("/"))
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "w") as f:
+            f.write(body)
+
+    def page(title: str, links, text: str = "") -> str:
+        anchors = "".join(f'<li><a href="{href}">{label}</a></li>' for href, label in links)
+        return (f"<html><head><title>{title}</title></head><body><nav><ul>{anchors}</ul></nav>"
+                f"<main><h1>{title}</h1><p>{text or title + ' details. ' * 40}</p></main></body></html>")
+
+    listings = (vehicles + per_listing - 1) // per_listing
+    write("/index.html", page("Fixture Chevrolet", [
+        ("/inventory/page-1.html", "Inventory"), ("/service.html", "Service"),
+        ("/private/admin.html", "Admin"), ("/brochure.pdf", "Brochure"), ("mailto:sales@example.com", "Mail"),
+    ]))
+    write("/service.html", page("Service", [("/index.html#top", "Home"), ("/", "Home again")]))
+    write("/private/admin.html", page("Admin", []))
+    for n in range(1, listings + 1):
+        links = [(f"/inventory/vehicle-{i}.html?utm_source=listing#specs", f"Vehicle {i}")
+                 for i in range((n - 1) * per_listing + 1, min(n * per_listing, vehicles) + 1)]
+        links += [(f"/inventory/page-{m}.html", f"Page {m}") for m in range(1, listings + 1) if m != n]
+        write(f"/inventory/page-{n}.html", page(f"Inventory page {n}", links))
+    for i in range(1, vehicles + 1):
+        write(f"/inventory/vehicle-{i}.html", page(f"Vehicle {i}", [("/inventory/page-1.html", "Back")],
+                                                   f"Stock #{i}: 2024 Chevrolet Equinox, MSRP ${28000 + i}. " * 20))
+    for model in ("silverado", "equinox", "bolt"):
+        write(f"/new-vehicles/{model}.html", page(model.title(), [("../service.html", "Service")]))
+    write("/robots.txt", f"User-agent: *\nDisallow: /private/\nSitemap: http://127.0.0.1:{_port}/sitemap.xml\n")
+    write("/sitemap.xml", '<?xml version="1.0" encoding="UTF-8"?>'
+          '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+          + "".join(f"<url><loc>http://127.0.0.1:{_port}/new-vehicles/{m}.html</loc></url>"
+                    for m in ("silverado", "equinox", "bolt"))
+          + "</urlset>")
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def main(args):
+    site = os.path.join(_workdir, "site")
+    build_site(site, args.vehicles)
+    server = ThreadingHTTPServer(("127.0.0.1", _port), partial(_QuietHandler, directory=site))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    from database import frontier
+    from scraper.crawler import Crawler
+
+    print(f"Fixture site with {args.vehicles} vehicles at {os.environ['DEALERSHIP_URL']} (workdir {_workdir})")
+    if args.kill_after:
+        pages = Crawler(max_pages=args.budget).crawl()
+        for _ in zip(range(args.kill_after), pages):
+            pass
+        pages.close() # Simulates the instance being killed mid-cycle
+        print(f"Abandoned first cycle after {args.kill_after} pages: {frontier.state_counts()}")
+
+    for cycle in range(1, args.cycles + 1):
+        crawler = Crawler(max_pages=args.budget)
+        start = time.perf_counter()
+        pages = sum(1 for _ in crawler.crawl())
+        crawler.commit()
+        elapsed = time.perf_counter() - start
+        print(f"Cycle {cycle}: {pages} pages in {elapsed:.2f}s, resumed {crawler.stats['resumed']}, "
+              f"frontier {crawler.stats['frontier']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl a generated local dealership site.")
+    parser.add_argument("--vehicles", type=int, default=300, help="Inventory pages in the fixture site.")
+    parser.add_argument("--budget", type=int, default=200, help="Pages fetched per cycle.")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--kill-after", type=int, default=0, help="Abandon a first cycle after this many pages.")
+    main(parser.parse_args())
@@ -1,13 +1,18 @@
 # data_ingestion_service/main.py
 
+import asyncio
+import functools
 import os
-from datetime import datetime, timedelta, UTC
-from typing import List
+from datetime import datetime, UTC
+from typing import Callable, Dict, List, Optional
 
 # Import from your new modules
-from config import DEALERSHIP_URL, INGESTION_INTERVAL_MINUTES
+from config import VECTOR_STORE_BACKEND
 from database import crud as db_crud
+from database import jobs as db_jobs
+from jobs.worker import CycleProgress, IngestionJobRunner
 from scraper import core as scraper_core
+from scraper.crawler import Crawler
 from vector_db import pinecone_client as pinecone_db
 
 # FastAPI specific imports
@@ -23,66 +28,138 @@ app = FastAPI(
 
 
 # --- Core Ingestion Logic ---
-def perform_ingestion_cycle():
-    pages_to_scrape = [
-        DEALERSHIP_URL,
-        f"{DEALERSHIP_URL}/service-parts-specials.html",
-        f"{DEALERSHIP_URL}/ev-incentives",
-        f"{DEALERSHIP_URL}/newspecials.html",
-        f"{DEALERSHIP_URL}/usedspecials.html",
-        f"{DEALERSHIP_URL}/black-friday-car-deals-san-jose",
-        f"{DEALERSHIP_URL}/contactus.aspx", # Fixed missing comma
-        f"{DEALERSHIP_URL}/fleet-vehicles",
-        f"{DEALERSHIP_URL}/under-15k.html",
-    ]
+def perform_ingestion_cycle(progress: Optional[CycleProgress] = None) -> Dict[str, int]:
+    """Crawls, embeds and upserts one cycle's worth of pages. Returns the cycle's counters."""
+    progress = progress or CycleProgress()
     print(f"\n--- Ingestion Cycle Started: {datetime.now(UTC)} ---")
-
-    for url in pages_to_scrape:
+    pages_updated = 0
+    # Bookkeeping of indexed pages, written once their vectors are durable: the local backend
+    # only persists this cycle's writes at publish_snapshot(), and hashes committed before that
+    # would make the next cycle skip pages whose vectors were lost with a crash.
+    pending_saves: List[Callable[[], None]] = []
+
+    def remove_page(url: str) -> bool:
+        """Deletes the vectors of a previously indexed page; its rows go with the other saves."""
+        if db_crud.get_page_hash(url) is None and not db_crud.get_page_chunks(url):
+            return False
+        pinecone_db.delete_page_vectors(url)
+        pending_saves.append(functools.partial(db_crud.delete_scraped_page, url))
+        return True
+
+    # Pages arrive from the crawl frontier as they are fetched; each is parsed/embedded here
+    crawler = Crawler()
+    for page in crawler.crawl():
+        fetched = page.result
+        url = fetched.url
+        progress.page_started(url)
         try:
             print(f"Ingestion Service: Processing {url}")
-            last_scraped_at_str = db_crud.get_last_scraped_time(url)
-            if last_scraped_at_str:
-                last_scraped_dt = datetime.fromisoformat(last_scraped_at_str)
-                if datetime.now(UTC) - last_scraped_dt < timedelta(minutes=INGESTION_INTERVAL_MINUTES):
-                    print(f"Ingestion Service: {url} scraped recently, skipping.")
-                    continue
-
-            raw_text = scraper_core.scrape_page(url)
-            if not raw_text.strip():
+            if fetched.gone:
+                if remove_page(url):
+                    pages_updated += 1
+                print(f"Ingestion Service: {url} is gone (HTTP {fetched.status}).")
+                progress.page_finished(url, "gone")
+                continue
+            if fetched.error:
+                print(f"Ingestion Service: Error fetching {url}: {fetched.error}")
+                progress.page_finished(url, "fetch_failed", fetched.error)
+                continue
+            if fetched.not_modified:
+                db_crud.touch_scraped_page(url)
+                print(f"Ingestion Service: {url} not modified (304), skipping.")
+                progress.page_finished(url, "not_modified")
+                continue
+
+            raw_text = page.text
+            if not raw_text.strip(): # Empty, or marked noindex
+                if remove_page(url):
+                    pages_updated += 1
                 print(f"Ingestion Service: No text found for {url}, skipping.")
+                progress.page_finished(url, "empty")
+                continue
+
+            page_hash = scraper_core.page_hash(raw_text)
+            if page_hash == db_crud.get_page_hash(url):
+                db_crud.touch_scraped_page(url, fetched.etag, fetched.last_modified)
+                print(f"Ingestion Service: {url} unchanged since last scrape, skipping.")
+                progress.page_finished(url, "unchanged")
                 continue
 
-            db_crud.save_scraped_page(url, raw_text)
             chunks = scraper_core.split_text_into_chunks(raw_text)
             print(f"Ingestion Service: {len(chunks)} chunks from {url}")
 
-            pinecone_db.upsert_vectors_to_pinecone(url, chunks)
+            indexed = db_crud.get_page_chunks(url)
+            if not indexed and db_crud.get_last_scraped_time(url) is not None:
+                indexed = None # Saved before chunk hashes were tracked: clear its vectors by source
+            indexed_chunks, upserted, deleted = pinecone_db.upsert_vectors(url, chunks, indexed)
+            # Saved only after the vector store is in sync and published, so a failed page is retried next cycle
+            pending_saves.append(functools.partial(db_crud.save_scraped_page, url, raw_text, page_hash, indexed_chunks,
+                                                   fetched.etag, fetched.last_modified))
+            if upserted or deleted:
+                pages_updated += 1
+            progress.count("chunks_embedded", upserted)
+            progress.count("vectors_deleted", deleted)
+            progress.page_finished(url, "indexed", f"{upserted} embedded, {deleted} deleted")
 
         except Exception as e:
             print(f"Ingestion Service: Failed to process {url}: {e}")
+            progress.page_finished(url, "failed", str(e))
+
+    for name in ("recently_scraped", "discovered", "resumed"):
+        progress.count(f"crawl_{name}", crawler.stats.get(name, 0))
+
+    if pages_updated:
+        # Invalidates the chatbot's semantic answer cache
+        pinecone_db.set_content_version(datetime.now(UTC).strftime("%Y%m%dT%H%M%S.%fZ"))
+        pinecone_db.publish_snapshot()
+    for save in pending_saves:
+        save()
+    crawler.commit()
 
     print(f"--- Ingestion Cycle Finished: {datetime.now(UTC)} ---")
+    return progress.counters
+
+
+# Background ingestion jobs (one worker thread; triggers coalesce into the active job)
+job_runner = IngestionJobRunner(perform_ingestion_cycle)
 
 
 # --- FastAPI Endpoints ---
-@app.get("/ingest")
-async def trigger_ingestion():
+@app.on_event("startup")
+async def startup_event():
+    job_runner.start()
+
+@app.post("/ingest", status_code=status.HTTP_202_ACCEPTED)
+def trigger_ingestion(trigger: str = "api"):
     """
-    Endpoint to trigger the data ingestion process.
-    Designed to be called by Google Cloud Scheduler.
+    Enqueues an ingestion job and returns its id immediately.
+    Designed to be called by Google Cloud Scheduler; while a job is queued or running,
+    further calls return that job instead of starting another one.
     """
-    try:
-        perform_ingestion_cycle()
-        return {"message": "Data ingestion triggered and completed successfully."}
-    except Exception as e:
-        print(f"Error during ingestion: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Data ingestion failed: {e}")
+    job_id, coalesced = job_runner.submit(trigger)
+    return {"job_id": job_id, "coalesced": coalesced, "status_url": f"/ingest/{job_id}"}
+
+# Kept for schedulers configured with GET /ingest
+app.add_api_route("/ingest", trigger_ingestion, methods=["GET"], status_code=status.HTTP_202_ACCEPTED)
+
+@app.get("/ingest/{job_id}")
+def ingestion_job_status(job_id: str, recent_pages: int = 0):
+    """Status, timings, counters and per-URL progress of an ingestion job."""
+    job = db_jobs.get_job(job_id, recent_pages=min(recent_pages, 500))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown ingestion job {job_id}")
+    return job
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    # Check Pinecone connection status from vector_db.pinecone_client
-    return {"status": "ok", "pinecone_connected": pinecone_db.pinecone_index is not None}
+    # Check vector store status from vector_db.pinecone_client
+    return {
+        "status": "ok",
+        "vector_store": VECTOR_STORE_BACKEND,
+        "vector_store_connected": pinecone_db.vector_store is not None,
+        "active_ingestion_job": await asyncio.to_thread(db_jobs.get_active_job),
+    }
 
 
 # --- Main Entry Point for Uvicorn ---
@@ -1,22 +1,51 @@
 # data_ingestion_service/scraper/core.py
-import requests
+import hashlib
 from bs4 import BeautifulSoup
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from typing import List
+from typing import List, Tuple
+from urllib.parse import urljoin
+
+from scraper.fetcher import page_fetcher
+
+def _visible_text(soup: BeautifulSoup) -> str:
+    # More targeted scraping: remove script, style, nav, footer, header elements
+    for script_or_style in soup(["script", "style", "nav", "footer", "header"]):
+        script_or_style.extract()
+    return soup.body.get_text(separator=' ', strip=True) if soup.body else ""
+
+def extract_text(html: str) -> str:
+    """Returns the visible text of an HTML page using BeautifulSoup."""
+    return _visible_text(BeautifulSoup(html, 'html.parser'))
+
+def parse_page(html: str, base_url: str) -> Tuple[str, List[str]]:
+    """Returns (visible text, absolute link targets) of a page, honouring robots meta
+    tags: `noindex` yields no text and `nofollow` yields no links."""
+    soup = BeautifulSoup(html, 'html.parser')
+    robots_meta = soup.find("meta", attrs={"name": lambda name: name and name.lower() == "robots"})
+    directives = (robots_meta.get("content") or "").lower() if robots_meta else ""
+
+    links = []
+    if "nofollow" not in directives:
+        base = soup.find("base", href=True)
+        base_url = urljoin(base_url, base["href"]) if base else base_url
+        for anchor in soup.find_all("a", href=True):
+            if "nofollow" not in (anchor.get("rel") or []):
+                links.append(urljoin(base_url, anchor["href"]))
+    # Links are collected first: nav/header/footer hold most of the site navigation
+    text = "" if "noindex" in directives else _visible_text(soup)
+    return text, links
 
 def scrape_page(url: str) -> str:
-    """Fetch page content and return visible text using BeautifulSoup."""
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        # More targeted scraping: remove script, style, nav, footer, header elements
-        for script_or_style in soup(["script", "style", "nav", "footer", "header"]):
-            script_or_style.extract()
-        return soup.body.get_text(separator=' ', strip=True)
-    except requests.exceptions.RequestException as e:
-        print(f"Ingestion Service: Error fetching {url}: {e}")
+    """Fetch page content and return visible text (unconditional, single page)."""
+    result = page_fetcher.fetch(url)
+    if result.error:
+        print(f"Ingestion Service: Error fetching {url}: {result.error}")
         return ""
+    return extract_text(result.html)
+
+def page_hash(text: str) -> str:
+    """Content hash of a page's extracted text, used to skip unchanged pages."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
 text_splitter = RecursiveCharacterTextSplitter(
     chunk_size=1000,
@@ -0,0 +1,222 @@
+# data_ingestion_service/scraper/crawler.py
+import gzip
+import posixpath
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime, timedelta, UTC
+from typing import Iterable, Iterator, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+from config import (
+    DEALERSHIP_URL, CRAWL_SEED_PATHS, CRAWL_MAX_PAGES_PER_CYCLE, CRAWL_MAX_DEPTH, CRAWL_BATCH_SIZE,
+    CRAWL_PRIORITY_SECTIONS, CRAWL_MAX_SITEMAP_URLS, FETCH_USER_AGENT, INGESTION_INTERVAL_MINUTES
+)
+from database import crud as db_crud
+from database import frontier
+from scraper.core import parse_page
+from scraper.fetcher import FetchResult, PageFetcher, page_fetcher
+
+# Links to these are never pages worth indexing
+_SKIPPED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico", ".css", ".js", ".json", ".xml", ".pdf",
+    ".zip", ".gz", ".mp4", ".mp3", ".woff", ".woff2", ".ttf", ".eot",
+}
+# Query parameters that only track campaigns and never change the content
+_TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "_ga"}
+
+_SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+def normalize_url(url: str) -> Optional[str]:
+    """Canonical form used for deduplication: lowercase scheme/host, no default port, no
+    fragment, no tracking parameters, sorted query, no trailing slash (the site root
+    is "https://host"). Returns None for non-http(s) URLs."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https") or not parts.hostname:
+        return None
+    host = parts.hostname.lower()
+    if parts.port and not (scheme == "http" and parts.port == 80 or scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    path = posixpath.normpath(parts.path) if parts.path else ""
+    path = "" if path in (".", "/") else path.rstrip("/")
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith("utm_")
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+@dataclass
+class CrawledPage:
+    result: FetchResult
+    text: str # Visible text; empty for 304s, errors and noindex pages
+
+
+class Crawler:
+    """Crawls one site from a persistent frontier (database/frontier.py).
+
+    Seeds come from the site root, robots.txt/sitemap.xml sitemaps and CRAWL_SEED_PATHS.
+    Discovered links are normalized and deduplicated by the frontier's primary key,
+    restricted to the root's host and robots rules, and ordered by priority: depth
+    first, then the position of the first CRAWL_PRIORITY_SECTIONS keyword in the path.
+    URLs are claimed in batches of `batch_size`, so memory stays bounded however large
+    the site is, and each cycle fetches at most `max_pages` pages. Fetched pages only
+    count as crawled once the caller has saved them and called commit(); a killed cycle
+    leaves its rows in_progress or indexing, and the next cycle requeues them and carries on.
+    """
+
+    def __init__(self, root_url: str = DEALERSHIP_URL, seed_paths: Iterable[str] = CRAWL_SEED_PATHS,
+                 fetcher: PageFetcher = page_fetcher, max_pages: int = CRAWL_MAX_PAGES_PER_CYCLE,
+                 max_depth: int = CRAWL_MAX_DEPTH, batch_size: int = CRAWL_BATCH_SIZE,
+                 sections: Iterable[str] = CRAWL_PRIORITY_SECTIONS):
+        self.root_url = normalize_url(root_url)
+        self.host = urlsplit(self.root_url).netloc
+        self.seed_paths = list(seed_paths)
+        self.fetcher = fetcher
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.batch_size = batch_size
+        self.sections = [section.lower() for section in sections]
+        self.robots: Optional[RobotFileParser] = None
+        self.stats = {}
+
+    # --- Scope and priority ---
+    def priority(self, url: str, depth: int) -> int:
+        path = urlsplit(url).path.lower()
+        rank = next((i for i, section in enumerate(self.sections) if section in path), len(self.sections))
+        return depth * (len(self.sections) + 1) + rank
+
+    def in_scope(self, url: str) -> bool:
+        parts = urlsplit(url)
+        if parts.netloc != self.host:
+            return False
+        if posixpath.splitext(parts.path)[1].lower() in _SKIPPED_EXTENSIONS:
+            return False
+        return self.robots is None or self.robots.can_fetch(FETCH_USER_AGENT, url)
+
+    def _enqueue(self, urls: Iterable[str], depth: int) -> int:
+        entries, seen = [], set()
+        for url in urls:
+            url = normalize_url(url)
+            if url and url not in seen and self.in_scope(url):
+                seen.add(url)
+                entries.append((url, depth, self.priority(url, depth)))
+        return frontier.add_urls(entries) if entries else 0
+
+    # --- robots.txt and sitemaps ---
+    def _get(self, url: str) -> Optional[bytes]:
+        try:
+            response = self.fetcher.session.get(url, timeout=self.fetcher.timeout)
+            return response.content if response.status_code == 200 else None
+        except Exception as e:
+            print(f"Ingestion Service: Could not fetch {url}: {e}")
+            return None
+
+    def load_robots(self):
+        self.robots = RobotFileParser(f"{self.root_url}/robots.txt")
+        content = self._get(self.robots.url)
+        # No robots.txt means everything is allowed
+        self.robots.parse(content.decode("utf-8", "replace").splitlines() if content else [])
+
+    def sitemap_urls(self) -> Iterator[str]:
+        """Page URLs listed in the site's sitemaps (following sitemap indexes), up to
+        CRAWL_MAX_SITEMAP_URLS."""
+        pending = list((self.robots.site_maps() if self.robots else None) or [f"{self.root_url}/sitemap.xml"])
+        visited, emitted = set(), 0
+        while pending and emitted < CRAWL_MAX_SITEMAP_URLS:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            content = self._get(sitemap_url)
+            if not content:
+                continue
+            if content[:2] == b"\x1f\x8b":
+                content = gzip.decompress(content)
+            try:
+                root = ET.fromstring(content)
+            except ET.ParseError as e:
+                print(f"Ingestion Service: Invalid sitemap {sitemap_url}: {e}")
+                continue
+            is_index = root.tag == f"{_SITEMAP_NS}sitemapindex"
+            for loc in root.iter(f"{_SITEMAP_NS}loc"):
+                if not loc.text:
+                    continue
+                if is_index:
+                    pending.append(loc.text.strip())
+                else:
+                    emitted += 1
+                    yield loc.text.strip()
+                    if emitted >= CRAWL_MAX_SITEMAP_URLS:
+                        break
+
+    def seed(self):
+        seeded = self._enqueue([self.root_url] + [f"{self.root_url}{path}" for path in self.seed_paths], depth=0)
+        batch: List[str] = []
+        for url in self.sitemap_urls():
+            batch.append(url)
+            if len(batch) >= 500:
+                seeded += self._enqueue(batch, depth=1)
+                batch = []
+        seeded += self._enqueue(batch, depth=1)
+        print(f"Ingestion Service: Seeded crawl frontier with {seeded} URLs.")
+
+    # --- Crawl ---
+    def _recently_scraped(self, url: str) -> bool:
+        last_scraped_at_str = db_crud.get_last_scraped_time(url)
+        if not last_scraped_at_str:
+            return False
+        return datetime.now(UTC) - datetime.fromisoformat(last_scraped_at_str) < timedelta(minutes=INGESTION_INTERVAL_MINUTES)
+
+    def crawl(self) -> Iterator[CrawledPage]:
+        """Yields fetched pages for this cycle. A page is marked indexing (removing, if it
+        is gone) once the caller asks for the next one; commit() then marks them done."""
+        self.stats = {"fetched": 0, "recently_scraped": 0, "failed": 0, "gone": 0, "discovered": 0,
+                      "resumed": frontier.recover_in_progress()}
+        self.load_robots()
+        if frontier.pending_count() == 0:
+            frontier.start_new_pass()
+            self.seed()
+
+        while self.stats["fetched"] < self.max_pages:
+            claimed = frontier.claim_batch(min(self.batch_size, self.max_pages - self.stats["fetched"]))
+            if not claimed:
+                break
+            depths = dict(claimed)
+            due = []
+            for url, _ in claimed:
+                if self._recently_scraped(url):
+                    frontier.mark_url(url, "done")
+                    self.stats["recently_scraped"] += 1
+                else:
+                    due.append(url)
+
+            for result in self.fetcher.fetch_all(due, db_crud.get_page_validators(due)):
+                self.stats["fetched"] += 1
+                if result.gone: # The caller removes it from the index
+                    self.stats["gone"] += 1
+                    yield CrawledPage(result, "")
+                    frontier.mark_url(result.url, "removing")
+                    continue
+                if result.error:
+                    self.stats["failed"] += 1
+                    frontier.mark_url(result.url, "failed")
+                    yield CrawledPage(result, "")
+                    continue
+                text = ""
+                if not result.not_modified:
+                    text, links = parse_page(result.html, result.url)
+                    if depths[result.url] < self.max_depth:
+                        self.stats["discovered"] += self._enqueue(links, depths[result.url] + 1)
+                yield CrawledPage(result, text)
+                frontier.mark_url(result.url, "indexing")
+
+        self.stats["frontier"] = frontier.state_counts()
+        print(f"Ingestion Service: Crawl stats: {self.stats}")
+
+    def commit(self):
+        """Marks the pages crawl() yielded as crawled; call once their vectors and rows are saved."""
+        frontier.complete_cycle()
+        self.stats["frontier"] = frontier.state_counts()
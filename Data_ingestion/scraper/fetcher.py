@@ -0,0 +1,123 @@
+# data_ingestion_service/scraper/fetcher.py
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    FETCH_MAX_WORKERS, FETCH_PER_HOST_CONCURRENCY, FETCH_QUEUE_SIZE, FETCH_TIMEOUT_SECONDS, FETCH_USER_AGENT
+)
+
+# (etag, last_modified) stored from the previous fetch of a URL
+Validators = Tuple[Optional[str], Optional[str]]
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int # HTTP status, or 0 if the request failed
+    html: str = ""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+    @property
+    def gone(self) -> bool:
+        """The page no longer exists; its indexed content should be removed."""
+        return self.status in (404, 410)
+
+
+class PageFetcher:
+    """Fetches pages over a pooled keep-alive session, with conditional requests.
+
+    At most `per_host` requests run against the same host at once (and `max_workers`
+    overall). Results are handed to the caller through a queue of `queue_size`
+    entries, so fetching pauses while parsing/embedding falls behind instead of
+    buffering every page in memory.
+    """
+
+    def __init__(self, max_workers: int = FETCH_MAX_WORKERS, per_host: int = FETCH_PER_HOST_CONCURRENCY,
+                 queue_size: int = FETCH_QUEUE_SIZE, timeout: float = FETCH_TIMEOUT_SECONDS):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = FETCH_USER_AGENT
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_limits_lock = threading.Lock()
+
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._host_limits_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_limits[host]
+
+    def fetch(self, url: str, validators: Validators = (None, None)) -> FetchResult:
+        """GETs a page, sending If-None-Match / If-Modified-Since when validators are known."""
+        etag, last_modified = validators
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        try:
+            with self._host_limit(url):
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                return FetchResult(url, 304, etag=etag, last_modified=last_modified)
+            if response.status_code in (404, 410):
+                return FetchResult(url, response.status_code, error=f"HTTP {response.status_code}")
+            response.raise_for_status()
+            return FetchResult(url, response.status_code, response.text,
+                               response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        except requests.exceptions.RequestException as e:
+            return FetchResult(url, 0, error=str(e))
+
+    def fetch_all(self, urls: Iterable[str], validators: Optional[Dict[str, Validators]] = None) -> Iterator[FetchResult]:
+        """Fetches `urls` concurrently and yields results in completion order."""
+        validators = validators or {}
+        results: "queue.Queue[FetchResult]" = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        urls = list(urls)
+
+        def work(url: str):
+            if stop.is_set():
+                return
+            try:
+                result = self.fetch(url, validators.get(url, (None, None)))
+            except Exception as e: # Decode errors, malformed URLs, ...: the consumer waits for one result per URL
+                result = FetchResult(url, 0, error=str(e))
+            while not stop.is_set(): # Blocks while the queue is full, unless the consumer went away
+                try:
+                    results.put(result, timeout=0.5)
+                    return
+                except queue.Full:
+                    pass
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetcher")
+        for url in urls:
+            executor.submit(work, url)
+        try:
+            for _ in urls:
+                yield results.get()
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Instantiate globally for the ingestion service
+page_fetcher = PageFetcher()
@@ -0,0 +1,71 @@
+# data_ingestion_service/vector_db/embedder.py
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Tuple
+
+import openai
+
+from config import (
+    EMBED_MODEL, EMBED_BATCH_MAX_INPUTS, EMBED_BATCH_MAX_TOKENS, EMBED_MAX_CONCURRENCY, EMBED_MAX_RETRIES
+)
+from vector_db.openai_client import with_retries
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper-bound token estimate (~3 characters per token) used for batch sizing."""
+    return len(text) // 3 + 1
+
+
+def make_batches(chunks: List[str]) -> Iterator[Tuple[int, List[str]]]:
+    """Groups consecutive chunks into (start index, texts) batches that stay under the
+    per-request input count and token limits."""
+    start, batch, batch_tokens = 0, [], 0
+    for i, chunk in enumerate(chunks):
+        tokens = estimate_tokens(chunk)
+        if batch and (len(batch) >= EMBED_BATCH_MAX_INPUTS or batch_tokens + tokens > EMBED_BATCH_MAX_TOKENS):
+            yield start, batch
+            start, batch, batch_tokens = i, [], 0
+        batch.append(chunk)
+        batch_tokens += tokens
+    if batch:
+        yield start, batch
+
+
+class BatchEmbedder:
+    """Embeds many chunks per request, with a bounded number of requests in flight.
+
+    Results are yielded in input order as soon as the oldest outstanding batch finishes,
+    so callers can stream them into vector store upserts without holding every
+    embedding in memory.
+    """
+
+    def __init__(self, client: openai.OpenAI, model: str = EMBED_MODEL,
+                 max_concurrency: int = EMBED_MAX_CONCURRENCY, max_retries: int = EMBED_MAX_RETRIES):
+        # Retries are handled by with_retries (with jitter), not by the SDK
+        self.client = client.with_options(max_retries=0)
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embedder")
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        res = with_retries(f"Embedding batch of {len(texts)}",
+                           lambda: self.client.embeddings.create(model=self.model, input=texts), self.max_retries)
+        return [item.embedding for item in sorted(res.data, key=lambda item: item.index)]
+
+    def embed(self, chunks: List[str]) -> Iterator[Tuple[int, List[float]]]:
+        """Yields (chunk index, embedding) for every chunk, in order."""
+        batches = make_batches(chunks)
+        in_flight = deque()
+        for start, texts in batches:
+            in_flight.append((start, self._executor.submit(self._embed_batch, texts)))
+            if len(in_flight) >= self.max_concurrency:
+                yield from self._drain_oldest(in_flight)
+        while in_flight:
+            yield from self._drain_oldest(in_flight)
+
+    @staticmethod
+    def _drain_oldest(in_flight: deque) -> Iterator[Tuple[int, List[float]]]:
+        start, future = in_flight.popleft()
+        for offset, embedding in enumerate(future.result()):
+            yield start + offset, embedding
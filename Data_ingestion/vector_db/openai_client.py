@@ -0,0 +1,55 @@
+# data_ingestion_service/vector_db/openai_client.py
+import random
+import time
+from typing import Callable, TypeVar
+
+import httpx
+import openai
+from openai import OpenAI, DefaultHttpxClient
+
+from config import (
+    OPENAI_API_KEY, OPENAI_MAX_CONNECTIONS, OPENAI_KEEPALIVE_SECONDS, OPENAI_CONNECT_TIMEOUT_SECONDS,
+    OPENAI_EMBED_TIMEOUT_SECONDS, OPENAI_RETRY_BASE_SECONDS, OPENAI_RETRY_MAX_SECONDS, EMBED_MAX_RETRIES
+)
+
+# Errors worth retrying: rate limits, timeouts, dropped connections and 5xx responses
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+T = TypeVar("T")
+
+
+def create_client() -> OpenAI:
+    """OpenAI client on one keep-alive connection pool, sized for the embedding workers.
+    The SDK's own retries are off; callers retry with with_retries()."""
+    timeout = httpx.Timeout(OPENAI_EMBED_TIMEOUT_SECONDS, connect=OPENAI_CONNECT_TIMEOUT_SECONDS)
+    http_client = DefaultHttpxClient(
+        limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_CONNECTIONS,
+                            keepalive_expiry=OPENAI_KEEPALIVE_SECONDS),
+        timeout=timeout,
+    )
+    return OpenAI(api_key=OPENAI_API_KEY, http_client=http_client, timeout=timeout, max_retries=0)
+
+
+def backoff_delay(attempt: int, error: Exception) -> float:
+    """Seconds to wait before retry `attempt` (0-based): the API's Retry-After when it sent
+    one, else exponential backoff with +-50% jitter, capped at OPENAI_RETRY_MAX_SECONDS."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        try:
+            return min(OPENAI_RETRY_MAX_SECONDS, max(0.0, float(response.headers.get("retry-after"))))
+        except (TypeError, ValueError):
+            pass
+    return min(OPENAI_RETRY_MAX_SECONDS, OPENAI_RETRY_BASE_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def with_retries(description: str, call: Callable[[], T], max_retries: int = EMBED_MAX_RETRIES) -> T:
+    """Runs `call`, retrying transient OpenAI errors with backoff_delay()."""
+    for attempt in range(max_retries + 1):
+        try:
+            return call()
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff_delay(attempt, e)
+            print(f"Ingestion Service: {description} failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
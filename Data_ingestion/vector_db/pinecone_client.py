@@ -1,62 +1,133 @@
 # data_ingestion_service/vector_db/pinecone_client.py
-from typing import List, Dict, Tuple
-from pinecone import Pinecone, PodSpec
-from openai import OpenAI
+import hashlib
+from typing import List, Dict, Optional, Tuple
 import numpy as np # Used for embeddings
 
 # Import constants from config
-from config import OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_ENVIRONMENT, PINECONE_INDEX_NAME, EMBED_MODEL
+from config import EMBED_MODEL, VECTOR_STORE_BACKEND, PINECONE_INDEX_NAME, LOCAL_VECTOR_STORE_DIR
+from vector_db.store import VectorStore, LocalVectorStore, create_pinecone_store
+from vector_db.embedder import BatchEmbedder
+from vector_db.openai_client import create_client, with_retries
 
-# Instantiate OpenAI client for embeddings
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Instantiate OpenAI client for embeddings (pooled, shared with the batch embedder)
+client = create_client()
+batch_embedder = BatchEmbedder(client)
 
-# Pinecone Client Setup
-pinecone_client = None
-pinecone_index = None
+# Vector Store Setup (Pinecone or the local memory-mapped index, see config.VECTOR_STORE_BACKEND)
+vector_store: VectorStore = None
 
 try:
-    pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
-    pinecone_index = pinecone_client.Index(PINECONE_INDEX_NAME)
-    print(f"Ingestion Service: Connected to Pinecone index '{PINECONE_INDEX_NAME}'.")
+    if VECTOR_STORE_BACKEND == "local":
+        vector_store = LocalVectorStore(LOCAL_VECTOR_STORE_DIR)
+        print(f"Ingestion Service: Using local vector store at '{LOCAL_VECTOR_STORE_DIR}' ({len(vector_store)} vectors).")
+    else:
+        vector_store = create_pinecone_store()
+        print(f"Ingestion Service: Connected to Pinecone index '{PINECONE_INDEX_NAME}'.")
 except Exception as e:
-    print(f"Ingestion Service: Error connecting to Pinecone or initializing index: {e}")
+    print(f"Ingestion Service: Error initializing the '{VECTOR_STORE_BACKEND}' vector store: {e}")
     print("Please ensure PINECONE_API_KEY and PINECONE_ENVIRONMENT are correct, and the index exists or can be created.")
     exit(1)
 
 def embed_text(text: str) -> List[float]:
     """Generates embeddings using OpenAI API."""
     try:
-        res = client.embeddings.create(model=EMBED_MODEL, input=text)
+        res = with_retries("Embedding", lambda: client.embeddings.create(model=EMBED_MODEL, input=text))
         return res.data[0].embedding
     except Exception as e:
         print(f"Ingestion Service: Error generating OpenAI embedding: {e}")
         raise
 
-def upsert_vectors_to_pinecone(url: str, chunks: List[str]):
-    """Embeds text chunks and upserts them to Pinecone."""
-    if pinecone_index is None:
-        raise RuntimeError("Pinecone index not initialized. Cannot upsert vectors.")
+def chunk_hash(chunk: str) -> str:
+    """Content hash of a chunk; includes the model so switching models re-embeds everything."""
+    return hashlib.sha256(f"{EMBED_MODEL}\0{chunk}".encode("utf-8")).hexdigest()
 
-    # Delete old vectors for this URL
-    pinecone_index.delete(filter={"source": url})
-    print(f"Ingestion Service: Deleted old vectors for {url} from Pinecone.")
+def upsert_vectors(url: str, chunks: List[str], indexed: Optional[Dict[str, str]] = None) -> Tuple[Dict[str, str], int, int]:
+    """Brings the vectors for `url` in line with `chunks`, embedding only what changed.
 
-    vectors_to_upsert = []
-    batch_size = 100 # Pinecone recommended batch size
+    `indexed` is the page's current {vector_id: chunk_hash} map from the ingestion DB
+    ({} for a page that has never been indexed). Vector ids are derived from the chunk
+    hash, so unchanged chunks keep their vector and are not re-embedded, new or modified
+    chunks are embedded and upserted, and ids that no longer occur are deleted. Pages
+    indexed before chunk hashes were tracked (`indexed` None) have their old vectors
+    cleared by source first. If embedding or upserting fails, the vectors this call
+    already wrote are deleted again before the error propagates, so nothing is left
+    that the page's chunk map doesn't record.
+
+    Returns (new {vector_id: chunk_hash} map, vectors upserted, vectors deleted).
+    """
+    if vector_store is None:
+        raise RuntimeError("Vector store not initialized. Cannot upsert vectors.")
+
+    if indexed is None:
+        vector_store.delete_by_source(url)
+        print(f"Ingestion Service: Deleted old vectors for {url} from the vector store.")
+        indexed = {}
 
+    url_slug = url.replace('.', '_').replace('/', '_').replace(':', '_')
+    current: Dict[str, str] = {}
+    pending: List[Tuple[int, str]] = [] # (chunk index, vector id) still to embed
     for i, chunk in enumerate(chunks):
-        embedding = embed_text(chunk)
-        vector_id = f"{url.replace('.', '_').replace('/', '_').replace(':', '_')}_{i}"
-        vectors_to_upsert.append({
-            "id": vector_id,
-            "values": embedding,
-            "metadata": {"source": url, "chunk_index": i, "text": chunk}
-        })
-
-    if vectors_to_upsert:
-        for i in range(0, len(vectors_to_upsert), batch_size):
-            batch = vectors_to_upsert[i:i+batch_size]
-            pinecone_index.upsert(vectors=batch)
-            print(f"Ingestion Service: Upserted {len(batch)} vectors for {url} (batch {i//batch_size + 1}).")
-    else:
-        print(f"Ingestion Service: No vectors to upsert for {url}")
\ No newline at end of file
+        digest = chunk_hash(chunk)
+        vector_id = f"{url_slug}_{digest[:32]}"
+        if vector_id in current:
+            continue # Identical chunk text appears twice on the page; index it once
+        current[vector_id] = digest
+        if vector_id not in indexed:
+            pending.append((i, vector_id))
+
+    batch = []
+    batch_size = 100 # Pinecone recommended batch size
+    batches_upserted = 0
+    written: List[str] = []
+
+    def flush():
+        nonlocal batch, batches_upserted
+        vector_store.upsert(batch)
+        written.extend(record["id"] for record in batch)
+        batches_upserted += 1
+        print(f"Ingestion Service: Upserted {len(batch)} vectors for {url} (batch {batches_upserted}).")
+        batch = []
+
+    try:
+        # Embeddings arrive in chunk order, several chunks per request; flush every batch_size
+        for j, embedding in batch_embedder.embed([chunks[i] for i, _ in pending]):
+            i, vector_id = pending[j]
+            batch.append({
+                "id": vector_id,
+                "values": embedding,
+                "metadata": {"source": url, "chunk_index": i, "text": chunks[i]}
+            })
+            if len(batch) == batch_size:
+                flush()
+        if batch:
+            flush()
+    except Exception:
+        if written: # New ids only (pending skips indexed ones), so the page's previous vectors stay intact
+            vector_store.delete(written)
+            print(f"Ingestion Service: Removed {len(written)} vectors of the failed update of {url}.")
+        raise
+
+    stale = [vector_id for vector_id in indexed if vector_id not in current]
+    if stale:
+        vector_store.delete(stale)
+    print(f"Ingestion Service: {url}: {len(pending)} chunks embedded, "
+          f"{len(current) - len(pending)} unchanged, {len(stale)} vectors deleted.")
+    return current, len(pending), len(stale)
+
+def delete_page_vectors(url: str):
+    """Removes every vector of a page that disappeared or is no longer indexable."""
+    if vector_store is None:
+        raise RuntimeError("Vector store not initialized. Cannot delete vectors.")
+    vector_store.delete_by_source(url)
+    print(f"Ingestion Service: Deleted all vectors for {url} from the vector store.")
+
+def set_content_version(version: str):
+    """Publishes the content version that chatbot replicas key their answer cache on."""
+    if vector_store is None:
+        raise RuntimeError("Vector store not initialized. Cannot set content version.")
+    vector_store.set_content_version(version)
+    print(f"Ingestion Service: Content version set to {version}.")
+
+def publish_snapshot():
+    """Makes this cycle's writes visible to readers (a new generation for the local backend)."""
+    vector_store.snapshot()